@@ -3,30 +3,122 @@ DynamoDB operations for Shorlabs projects and deployments.
 """
 import os
 import re
+import json
 import time
+import base64
 import uuid
 import random
 import string
+import threading
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
 
 import boto3
-from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.conditions import Attr, ConditionBase, Key
 
 # Table names
 TABLE_NAME = os.environ.get("DYNAMODB_TABLE", "shorlabs-projects")
 SERVICES_TABLE_NAME = os.environ.get("SERVICES_TABLE", "shorlabs-services")
 DEPLOYMENTS_TABLE_NAME = os.environ.get("DEPLOYMENTS_TABLE", "shorlabs-deployments")
 DOMAINS_TABLE_NAME = os.environ.get("DOMAINS_TABLE", "shorlabs-domains")
+ROUTES_TABLE_NAME = os.environ.get("ROUTES_TABLE", "shorlabs-routes")
 
 # Shorlabs domain for custom URLs
 SHORLABS_DOMAIN = os.environ.get("SHORLABS_DOMAIN", "shorlabs.com")
 
+# GSI on the services table used for O(1) subdomain -> service resolution
+SUBDOMAIN_INDEX_NAME = "subdomain-index"
+
+# GSI on the domains table used to load every custom domain of an org at once
+DOMAINS_ORG_INDEX_NAME = "organization_id-index"
+
+# GSI on the deployments table used for O(1) deploy_id -> deployment resolution
+DEPLOY_ID_INDEX_NAME = "deploy-id-index"
+
+# GSI on the deployments table: deployments by start hour (started_hour = "YYYY-MM-DDTHH"),
+# ordered by started_at, so usage aggregation can range-query a window fleet-wide
+DEPLOY_STARTED_INDEX_NAME = "started-hour-index"
+
 # DynamoDB client
 dynamodb = boto3.resource("dynamodb")
 
 
+# ─────────────────────────────────────────────────────────────
+# TABLE REGISTRY
+# ─────────────────────────────────────────────────────────────
+
+# Table handles are verified (DescribeTable) or created once per process and
+# reused afterwards, so data-access calls go straight to the real request.
+_tables: dict = {}
+_tables_lock = threading.Lock()
+_describe_table_calls: dict = {}
+
+
+def _get_table(table_name: str, create_fn):
+    """
+    Return the cached Table handle for table_name.
+
+    On first use, checks the table exists with one DescribeTable call and
+    creates it via create_fn if it does not.
+    """
+    table = _tables.get(table_name)
+    if table is not None:
+        return table
+
+    with _tables_lock:
+        table = _tables.get(table_name)
+        if table is not None:
+            return table
+
+        _describe_table_calls[table_name] = _describe_table_calls.get(table_name, 0) + 1
+        try:
+            table = dynamodb.Table(table_name)
+            table.load()
+        except dynamodb.meta.client.exceptions.ResourceNotFoundException:
+            table = create_fn()
+
+        _tables[table_name] = table
+        return table
+
+
+def get_table_registry_stats() -> dict:
+    """DescribeTable calls per table since process start (expected: ≤1 each)."""
+    return {
+        "cached_tables": sorted(_tables.keys()),
+        "describe_table_calls": dict(_describe_table_calls),
+    }
+
+
+def bootstrap_tables() -> dict:
+    """
+    Verify or create every table this API uses.
+
+    Run once per container from the FastAPI lifespan hook, or manually with
+    `python -m api.db.dynamodb`. Afterwards all table accessors are cache hits.
+    """
+    get_or_create_table()  # Projects table
+    get_or_create_services_table()  # Services table
+    get_or_create_domains_table()  # Custom domains table
+    get_or_create_routes_table()  # Host → origin routes (read by Lambda@Edge)
+    get_or_create_deployments_table()  # Deployments table
+    get_or_create_org_usage_table()  # Org usage metrics
+    get_github_connections_table()  # GitHub App connections
+    return get_table_registry_stats()
+
+
+def _query_all(table, **query_kwargs) -> list:
+    """Run a Query and follow LastEvaluatedKey until every page is read."""
+    items = []
+    while True:
+        response = table.query(**query_kwargs)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return items
+        query_kwargs["ExclusiveStartKey"] = last_key
+
+
 def get_or_create_table():
     """
     Backwards-compatible helper for the *projects* table.
@@ -34,13 +126,11 @@ def get_or_create_table():
     NOTE: Deployments now live in a separate table. For deployments, use
     get_or_create_deployments_table instead.
     """
-    try:
-        table = dynamodb.Table(TABLE_NAME)
-        table.load()
-        return table
-    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
-        pass
+    return _get_table(TABLE_NAME, _create_projects_table)
+
 
+def _create_projects_table():
+    """Create the projects table (called once, from the table registry)."""
     print(f"📦 Creating DynamoDB table: {TABLE_NAME}")
     table = dynamodb.create_table(
         TableName=TABLE_NAME,
@@ -77,14 +167,13 @@ def get_or_create_domains_table():
       - PK: domain (HASH), lowercase domain name
       - SK: "META" (RANGE), fixed value for single item per domain
       - GSI project_id-index: list domains by project_id
+      - GSI organization_id-index: list all domains of an organization
     """
-    try:
-        table = dynamodb.Table(DOMAINS_TABLE_NAME)
-        table.load()
-        return table
-    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
-        pass
+    return _get_table(DOMAINS_TABLE_NAME, _create_domains_table)
 
+
+def _create_domains_table():
+    """Create the custom domains table (called once, from the table registry)."""
     print(f"📦 Creating DynamoDB domains table: {DOMAINS_TABLE_NAME}")
     table = dynamodb.create_table(
         TableName=DOMAINS_TABLE_NAME,
@@ -96,6 +185,7 @@ def get_or_create_domains_table():
             {"AttributeName": "domain", "AttributeType": "S"},
             {"AttributeName": "SK", "AttributeType": "S"},
             {"AttributeName": "project_id", "AttributeType": "S"},
+            {"AttributeName": "organization_id", "AttributeType": "S"},
         ],
         GlobalSecondaryIndexes=[
             {
@@ -105,6 +195,13 @@ def get_or_create_domains_table():
                 ],
                 "Projection": {"ProjectionType": "ALL"},
             },
+            {
+                "IndexName": DOMAINS_ORG_INDEX_NAME,
+                "KeySchema": [
+                    {"AttributeName": "organization_id", "KeyType": "HASH"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
         ],
         BillingMode="PAY_PER_REQUEST",
     )
@@ -113,6 +210,37 @@ def get_or_create_domains_table():
     return table
 
 
+def get_or_create_routes_table():
+    """
+    Get or create the host -> origin routing table read by Lambda@Edge.
+
+    Schema:
+      - PK: host (HASH), lowercase hostname ("app.shorlabs.com", "www.example.com")
+
+    Items are a materialized projection of services + ACTIVE custom domains,
+    written by the deploy, domain and delete paths (see ROUTING TABLE OPERATIONS).
+    """
+    return _get_table(ROUTES_TABLE_NAME, _create_routes_table)
+
+
+def _create_routes_table():
+    """Create the routes table (called once, from the table registry)."""
+    print(f"📦 Creating DynamoDB routes table: {ROUTES_TABLE_NAME}")
+    table = dynamodb.create_table(
+        TableName=ROUTES_TABLE_NAME,
+        KeySchema=[
+            {"AttributeName": "host", "KeyType": "HASH"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "host", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    print(f"✅ Created DynamoDB table: {ROUTES_TABLE_NAME}")
+    return table
+
+
 def get_or_create_deployments_table():
     """
     Get or create the dedicated deployments table.
@@ -120,14 +248,14 @@ def get_or_create_deployments_table():
     Schema:
       - PK: project_id (HASH)
       - SK: sort key, e.g. "DEPLOY#<ts>#<deploy_id>"
+      - GSI deploy-id-index: lookup by deploy_id
+      - GSI started-hour-index: deployments by started_hour, sorted by started_at
     """
-    try:
-        table = dynamodb.Table(DEPLOYMENTS_TABLE_NAME)
-        table.load()
-        return table
-    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
-        pass
+    return _get_table(DEPLOYMENTS_TABLE_NAME, _create_deployments_table)
 
+
+def _create_deployments_table():
+    """Create the deployments table (called once, from the table registry)."""
     print(f"📦 Creating DynamoDB deployments table: {DEPLOYMENTS_TABLE_NAME}")
     table = dynamodb.create_table(
         TableName=DEPLOYMENTS_TABLE_NAME,
@@ -138,10 +266,38 @@ def get_or_create_deployments_table():
         AttributeDefinitions=[
             {"AttributeName": "project_id", "AttributeType": "S"},
             {"AttributeName": "SK", "AttributeType": "S"},
+            {"AttributeName": "deploy_id", "AttributeType": "S"},
+            {"AttributeName": "started_hour", "AttributeType": "S"},
+            {"AttributeName": "started_at", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": DEPLOY_ID_INDEX_NAME,
+                "KeySchema": [
+                    {"AttributeName": "deploy_id", "KeyType": "HASH"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
+            {
+                "IndexName": DEPLOY_STARTED_INDEX_NAME,
+                "KeySchema": [
+                    {"AttributeName": "started_hour", "KeyType": "HASH"},
+                    {"AttributeName": "started_at", "KeyType": "RANGE"},
+                ],
+                "Projection": {
+                    "ProjectionType": "INCLUDE",
+                    "NonKeyAttributes": ["deploy_id", "finished_at", "status"],
+                },
+            },
         ],
         BillingMode="PAY_PER_REQUEST",
     )
     table.wait_until_exists()
+    # expires_at is only written when DEPLOYMENT_RETENTION_DAYS is set
+    dynamodb.meta.client.update_time_to_live(
+        TableName=DEPLOYMENTS_TABLE_NAME,
+        TimeToLiveSpecification={"Enabled": True, "AttributeName": DEPLOYMENT_TTL_ATTRIBUTE},
+    )
     print(f"✅ Created DynamoDB deployments table: {DEPLOYMENTS_TABLE_NAME}")
     return table
 
@@ -154,14 +310,13 @@ def get_or_create_services_table():
       - PK: ORG#{org_id} (HASH)
       - SK: PROJECT#{project_id}#SERVICE#{service_id} (RANGE)
       - GSI service-id-index: lookup by service_id
+      - GSI subdomain-index: lookup by subdomain (sparse; databases have none)
     """
-    try:
-        table = dynamodb.Table(SERVICES_TABLE_NAME)
-        table.load()
-        return table
-    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
-        pass
+    return _get_table(SERVICES_TABLE_NAME, _create_services_table)
+
 
+def _create_services_table():
+    """Create the services table (called once, from the table registry)."""
     print(f"📦 Creating DynamoDB services table: {SERVICES_TABLE_NAME}")
     table = dynamodb.create_table(
         TableName=SERVICES_TABLE_NAME,
@@ -173,6 +328,7 @@ def get_or_create_services_table():
             {"AttributeName": "PK", "AttributeType": "S"},
             {"AttributeName": "SK", "AttributeType": "S"},
             {"AttributeName": "service_id", "AttributeType": "S"},
+            {"AttributeName": "subdomain", "AttributeType": "S"},
         ],
         GlobalSecondaryIndexes=[
             {
@@ -182,6 +338,13 @@ def get_or_create_services_table():
                 ],
                 "Projection": {"ProjectionType": "ALL"},
             },
+            {
+                "IndexName": SUBDOMAIN_INDEX_NAME,
+                "KeySchema": [
+                    {"AttributeName": "subdomain", "KeyType": "HASH"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            },
         ],
         BillingMode="PAY_PER_REQUEST",
     )
@@ -271,13 +434,12 @@ def get_project_by_subdomain(subdomain: str) -> Optional[dict]:
     """
     table = get_or_create_services_table()
 
-    # Scan for services with matching subdomain
-    # Note: In production with many services, use a GSI on subdomain
-    response = table.scan(
-        FilterExpression="subdomain = :sd",
-        ExpressionAttributeValues={
-            ":sd": subdomain,
-        },
+    # subdomain-index is maintained by DynamoDB on every create_service /
+    # update_service write, so this is a single keyed Query (no table scan).
+    response = table.query(
+        IndexName=SUBDOMAIN_INDEX_NAME,
+        KeyConditionExpression=Key("subdomain").eq(subdomain),
+        Limit=1,
     )
     items = response.get("Items", [])
     return items[0] if items else None
@@ -356,11 +518,11 @@ def list_projects(org_id: str) -> list:
     """
     table = get_or_create_table()
 
-    response = table.query(
+    return _query_all(
+        table,
         KeyConditionExpression=Key("PK").eq(f"ORG#{org_id}")
         & Key("SK").begins_with("PROJECT#"),
     )
-    return response.get("Items", [])
 
 
 def update_project(project_id: str, updates: dict) -> Optional[dict]:
@@ -404,8 +566,9 @@ def delete_project(project_id: str) -> bool:
     services = list_services(project_id)
     for svc in services:
         sid = svc["service_id"]
-        # Delete domains for the service
+        # Delete routes and domains for the service
         svc_domains = list_project_domains(sid)
+        delete_service_routes(svc, svc_domains)
         if svc_domains:
             domains_table = get_or_create_domains_table()
             with domains_table.batch_writer() as batch:
@@ -419,6 +582,7 @@ def delete_project(project_id: str) -> bool:
                     batch.delete_item(Key={"project_id": d["project_id"], "SK": d["SK"]})
         # Delete the service item from services table
         services_table.delete_item(Key={"PK": svc["PK"], "SK": svc["SK"]})
+        delete_warm_target(svc.get("organization_id", ""), sid)
 
     # Delete the project container itself
     projects_table.delete_item(Key={"PK": project["PK"], "SK": project["SK"]})
@@ -513,6 +677,11 @@ def create_service(
             item["cpu"] = cpu
 
     table.put_item(Item=item)
+
+    if service_type != "database":
+        # Subdomain answers 503 "not ready" until the first deploy sets an origin
+        put_service_route(subdomain_host(subdomain), item, host_kind="subdomain")
+
     return item
 
 
@@ -570,11 +739,51 @@ def get_service_by_key(org_id: str, project_id: str, service_id: str) -> Optiona
 
 
 def update_service(service_id: str, updates: dict) -> Optional[dict]:
-    """Update a service."""
+    """
+    Update a service, resolving its key via service-id-index.
+
+    Prefer update_service_by_key when org/project ids are already known —
+    it skips the (eventually consistent) GSI read.
+    """
     service = get_service(service_id)
     if not service:
         return None
 
+    return _update_service_item(service["PK"], service["SK"], updates)
+
+
+def update_service_by_key(
+    org_id: str,
+    project_id: str,
+    service_id: str,
+    updates: dict,
+    condition: Optional[ConditionBase] = None,
+) -> Optional[dict]:
+    """
+    Update a service by primary key (no read-before-write).
+
+    Args:
+        org_id: Organization that owns the service
+        project_id: Parent project container
+        service_id: The service to update
+        updates: Attributes to SET (updated_at is added automatically)
+        condition: Optional extra condition, e.g. Attr("status").ne("DELETING")
+
+    Returns the updated item, or None if the service does not exist or the
+    condition failed. The update never creates a new item.
+    """
+    return _update_service_item(
+        f"ORG#{org_id}", f"PROJECT#{project_id}#SERVICE#{service_id}", updates, condition,
+    )
+
+
+def _update_service_item(
+    pk: str,
+    sk: str,
+    updates: dict,
+    condition: Optional[ConditionBase] = None,
+) -> Optional[dict]:
+    """SET updates on an existing service item; None if it is gone or the condition fails."""
     table = get_or_create_services_table()
     updates["updated_at"] = datetime.utcnow().isoformat()
 
@@ -582,13 +791,21 @@ def update_service(service_id: str, updates: dict) -> Optional[dict]:
     expr_names = {f"#{k}": k for k in updates.keys()}
     expr_values = {f":{k}": v for k, v in updates.items()}
 
-    response = table.update_item(
-        Key={"PK": service["PK"], "SK": service["SK"]},
-        UpdateExpression=update_expr,
-        ExpressionAttributeNames=expr_names,
-        ExpressionAttributeValues=expr_values,
-        ReturnValues="ALL_NEW",
-    )
+    condition_expr = Attr("SK").exists()
+    if condition is not None:
+        condition_expr = condition_expr & condition
+
+    try:
+        response = table.update_item(
+            Key={"PK": pk, "SK": sk},
+            UpdateExpression=update_expr,
+            ConditionExpression=condition_expr,
+            ExpressionAttributeNames=expr_names,
+            ExpressionAttributeValues=expr_values,
+            ReturnValues="ALL_NEW",
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return None
     return response.get("Attributes")
 
 
@@ -605,6 +822,7 @@ def delete_service(service_id: str) -> bool:
 
     # Delete domains
     domains = list_project_domains(service_id)
+    delete_service_routes(service, domains)
     if domains:
         domains_table = get_or_create_domains_table()
         with domains_table.batch_writer() as batch:
@@ -628,6 +846,7 @@ def delete_service(service_id: str) -> bool:
 
     # Delete the service item
     services_table.delete_item(Key={"PK": service["PK"], "SK": service["SK"]})
+    delete_warm_target(service.get("organization_id", ""), service_id)
     return True
 
 
@@ -640,10 +859,10 @@ def list_all_org_services(org_id: str, service_type: str = None) -> list:
     and usage aggregation where you need every service regardless of project.
     """
     table = get_or_create_services_table()
-    response = table.query(
+    items = _query_all(
+        table,
         KeyConditionExpression=Key("PK").eq(f"ORG#{org_id}"),
     )
-    items = response.get("Items", [])
     if service_type:
         items = [i for i in items if i.get("service_type") == service_type]
     return items
@@ -678,13 +897,55 @@ def get_project_with_services(project_id: str, org_id: str = None) -> Optional[d
     }
 
 
+def load_org_snapshot(org_id: str) -> dict:
+    """
+    Load everything the org dashboard needs in three paginated queries.
+
+    - projects table, ORG#{org_id} partition: project containers + throttle state
+    - services table, ORG#{org_id} partition: every service in the org
+    - domains table, organization_id-index: every custom domain in the org
+
+    Returns:
+        {
+            "projects": [...],
+            "services_by_project": {project_id: [service, ...]},
+            "domains_by_service": {service_id: [domain, ...]},
+            "throttle_state": {...} | None,
+        }
+    """
+    org_items = _query_all(
+        get_or_create_table(),
+        KeyConditionExpression=Key("PK").eq(f"ORG#{org_id}"),
+        ConsistentRead=True,
+    )
+    projects = [i for i in org_items if i["SK"].startswith("PROJECT#")]
+    throttle_state = next((i for i in org_items if i["SK"] == "THROTTLE_STATE"), None)
+
+    services_by_project = {}
+    for svc in list_all_org_services(org_id):
+        services_by_project.setdefault(svc["project_id"], []).append(svc)
+
+    domains_by_service = {}
+    for d in list_org_domains(org_id):
+        # Domain items store the service_id in project_id
+        domains_by_service.setdefault(d["project_id"], []).append(d)
+
+    return {
+        "projects": projects,
+        "services_by_project": services_by_project,
+        "domains_by_service": domains_by_service,
+        "throttle_state": throttle_state,
+    }
+
+
 # ─────────────────────────────────────────────────────────────
 # CUSTOM DOMAIN OPERATIONS
 # ─────────────────────────────────────────────────────────────
 
 # Custom domains are stored in the dedicated shorlabs-domains table:
 #   PK = domain (lowercase), SK = "META"
-# O(1) lookup for Lambda@Edge routing via GetItem.
+# Lambda@Edge does not read this table; ACTIVE domains are projected into
+# the shorlabs-routes table (see ROUTING TABLE OPERATIONS).
 
 # Import CloudFront routing endpoint for CNAME target default
 CLOUDFRONT_ROUTING_ENDPOINT = os.environ.get(
@@ -700,12 +961,12 @@ def add_custom_domain(
     org_id: str,
     project_id: str,
     domain: str,
-    function_url: Optional[str] = None,
 ) -> dict:
     """
     Add a custom domain mapping for a project.
 
-    Creates an item in the shorlabs-domains table for fast edge lookups.
+    Creates an item in the shorlabs-domains table. The domain is not routable
+    until it goes ACTIVE and a routing item is written (see put_service_route).
     """
     table = get_or_create_domains_table()
     now = datetime.utcnow().isoformat()
@@ -716,7 +977,6 @@ def add_custom_domain(
         "SK": DOMAIN_ITEM_SK,
         "project_id": project_id,
         "organization_id": org_id,
-        "function_url": function_url,
         "status": "PENDING_VERIFICATION",
         "tenant_id": None,
         "created_at": now,
@@ -775,22 +1035,213 @@ def list_project_domains(project_id: str) -> list:
     return response.get("Items", [])
 
 
-def get_project_by_custom_domain(domain: str) -> Optional[dict]:
+def list_org_domains(org_id: str) -> list:
     """
-    Look up a project by custom domain for Lambda@Edge routing.
+    List all custom domain items for an organization.
 
-    Returns minimal data needed for routing (function_url, status).
+    Uses organization_id-index GSI on the domains table.
     """
     table = get_or_create_domains_table()
-    response = table.get_item(
-        Key={"domain": domain.lower(), "SK": DOMAIN_ITEM_SK},
-        ProjectionExpression="function_url, #st, project_id",
-        ExpressionAttributeNames={"#st": "status"},
+    return _query_all(
+        table,
+        IndexName=DOMAINS_ORG_INDEX_NAME,
+        KeyConditionExpression=Key("organization_id").eq(org_id),
     )
-    item = response.get("Item")
-    if item and item.get("status") == "ACTIVE":
-        return item
-    return None
+
+
+# ─────────────────────────────────────────────────────────────
+# ROUTING TABLE OPERATIONS
+# ─────────────────────────────────────────────────────────────
+
+# The shorlabs-routes table holds one item per routable host, already in the
+# shape Lambda@Edge needs to build a CloudFront custom origin:
+#   host, origin_kind ("lambda" | "alb"), origin_domain, read_timeout,
+#   keepalive_timeout, preserve_host, status ("ACTIVE" | "PENDING")
+# The router does a single GetItem per host; nothing is derived at the edge.
+
+ROUTE_STATUS_ACTIVE = "ACTIVE"
+ROUTE_STATUS_PENDING = "PENDING"
+
+# CloudFront origin settings per origin kind
+_ORIGIN_SETTINGS = {
+    # Lambda Function URLs need Host rewritten to the function URL domain
+    "lambda": {"read_timeout": 30, "keepalive_timeout": 5, "preserve_host": False},
+    # ALB uses host-based listener rules, so the original Host is kept
+    "alb": {"read_timeout": 60, "keepalive_timeout": 60, "preserve_host": True},
+}
+
+
+def subdomain_host(subdomain: str) -> str:
+    """Full hostname for a Shorlabs subdomain."""
+    return f"{subdomain}.{SHORLABS_DOMAIN}".lower()
+
+
+def build_route_item(host: str, service: dict, host_kind: str) -> dict:
+    """
+    Build the routing item for a host served by a service.
+
+    The status is PENDING until the service has an origin (function URL
+    for web-apps, ALB DNS name for web-services).
+    """
+    if service.get("service_type") == "web-service":
+        origin_kind = "alb"
+        origin_domain = service.get("alb_dns_name")
+    else:
+        origin_kind = "lambda"
+        function_url = service.get("function_url") or ""
+        origin_domain = function_url.replace("https://", "").replace("http://", "").rstrip("/")
+
+    item = {
+        "host": host.lower(),
+        "host_kind": host_kind,
+        "service_id": service.get("service_id"),
+        "project_id": service.get("project_id"),
+        "organization_id": service.get("organization_id"),
+        "origin_kind": origin_kind,
+        "status": ROUTE_STATUS_ACTIVE if origin_domain else ROUTE_STATUS_PENDING,
+        "updated_at": datetime.utcnow().isoformat(),
+        **_ORIGIN_SETTINGS[origin_kind],
+    }
+    if origin_domain:
+        item["origin_domain"] = origin_domain
+    return item
+
+
+# Route change log: one item in the routes table (host "#changes") with an
+# attribute per recently written or deleted host, holding the time of the
+# change in epoch ms. The router routes a host from its snapshot only if the
+# host has not changed since the snapshot was compiled, so deleted and moved
+# hosts stop being served from memory within seconds. Entries older than
+# ROUTE_CHANGES_RETENTION_SECONDS are pruned by the snapshot publisher and,
+# so the item stays far below DynamoDB's 400 KB item limit even without the
+# publisher, by about one in ROUTE_CHANGES_PRUNE_EVERY writes; the router
+# ignores snapshots older than the retention.
+ROUTE_CHANGES_HOST = "#changes"
+ROUTE_CHANGES_RETENTION_SECONDS = 3600
+ROUTE_CHANGES_PRUNE_BATCH = 100
+ROUTE_CHANGES_PRUNE_EVERY = 20
+
+
+def record_route_changes(hosts: list) -> None:
+    """
+    Stamp hosts in the route change log.
+
+    Called before their routing items are written or deleted: a snapshot
+    compiled in between then still sees the stamp as newer than itself.
+    Failures are logged, not raised: the route write itself goes ahead, and
+    the router stops trusting a snapshot once it is older than
+    ROUTE_SNAPSHOT_MAX_AGE anyway.
+    """
+    hosts = sorted({h.lower() for h in hosts})
+    if not hosts:
+        return
+    now_ms = int(time.time() * 1000)
+    try:
+        table = get_or_create_routes_table()
+        table.update_item(
+            Key={"host": ROUTE_CHANGES_HOST},
+            UpdateExpression="SET " + ", ".join(f"#h{i} = :now" for i in range(len(hosts))),
+            ExpressionAttributeNames={f"#h{i}": host for i, host in enumerate(hosts)},
+            ExpressionAttributeValues={":now": now_ms},
+        )
+    except Exception as e:
+        print(f"⚠️ Failed to record route changes for {', '.join(hosts)}: {e}")
+        return
+
+    if random.randrange(ROUTE_CHANGES_PRUNE_EVERY) == 0:
+        try:
+            prune_route_changes(now_ms - ROUTE_CHANGES_RETENTION_SECONDS * 1000)
+        except Exception as e:
+            print(f"⚠️ Failed to prune route change log: {e}")
+
+
+def prune_route_changes(older_than_ms: int) -> int:
+    """
+    Drop change log entries stamped before older_than_ms. Returns how many were removed.
+
+    Each removal is conditional on the entry being unchanged, so a host
+    stamped again meanwhile keeps its entry (that batch is retried next run).
+    """
+    table = get_or_create_routes_table()
+    item = table.get_item(Key={"host": ROUTE_CHANGES_HOST}, ConsistentRead=True).get("Item") or {}
+    expired = [(host, stamp) for host, stamp in item.items() if host != "host" and int(stamp) < older_than_ms]
+
+    removed = 0
+    for start in range(0, len(expired), ROUTE_CHANGES_PRUNE_BATCH):
+        batch = expired[start:start + ROUTE_CHANGES_PRUNE_BATCH]
+        try:
+            table.update_item(
+                Key={"host": ROUTE_CHANGES_HOST},
+                UpdateExpression="REMOVE " + ", ".join(f"#h{i}" for i in range(len(batch))),
+                ConditionExpression=" AND ".join(f"#h{i} = :v{i}" for i in range(len(batch))),
+                ExpressionAttributeNames={f"#h{i}": host for i, (host, _) in enumerate(batch)},
+                ExpressionAttributeValues={f":v{i}": stamp for i, (_, stamp) in enumerate(batch)},
+            )
+            removed += len(batch)
+        except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+            continue
+    return removed
+
+
+def put_service_route(host: str, service: dict, host_kind: str) -> dict:
+    """Write (or overwrite) the routing item for a host."""
+    table = get_or_create_routes_table()
+    item = build_route_item(host, service, host_kind)
+    record_route_changes([item["host"]])
+    table.put_item(Item=item)
+    return item
+
+
+def get_route(host: str) -> Optional[dict]:
+    """Get the routing item for a host. O(1) via GetItem."""
+    table = get_or_create_routes_table()
+    response = table.get_item(Key={"host": host.lower()})
+    return response.get("Item")
+
+
+def delete_route(host: str) -> bool:
+    """Delete the routing item for a host."""
+    table = get_or_create_routes_table()
+    record_route_changes([host])
+    table.delete_item(Key={"host": host.lower()})
+    return True
+
+
+def sync_service_routes(service: dict, domains: list = None) -> list:
+    """
+    Rewrite every routing item for a service from its current origin.
+
+    Covers the Shorlabs subdomain plus all ACTIVE custom domains. Call after
+    anything that changes the service's function_url / alb_dns_name.
+    """
+    if domains is None:
+        domains = list_project_domains(service["service_id"])
+
+    items = []
+    if service.get("subdomain"):
+        items.append(put_service_route(subdomain_host(service["subdomain"]), service, "subdomain"))
+    for d in domains:
+        if d.get("status") == "ACTIVE":
+            items.append(put_service_route(d["domain"], service, "custom_domain"))
+    return items
+
+
+def delete_service_routes(service: dict, domains: list = None) -> None:
+    """Remove the subdomain and custom domain routing items for a service."""
+    if domains is None:
+        domains = list_project_domains(service["service_id"])
+
+    hosts = [d["domain"] for d in domains]
+    if service.get("subdomain"):
+        hosts.append(subdomain_host(service["subdomain"]))
+    if not hosts:
+        return
+
+    table = get_or_create_routes_table()
+    record_route_changes(hosts)
+    with table.batch_writer() as batch:
+        for host in hosts:
+            batch.delete_item(Key={"host": host.lower()})
 
 
 # ─────────────────────────────────────────────────────────────
@@ -798,18 +1249,46 @@ def get_project_by_custom_domain(domain: str) -> Optional[dict]:
 # ─────────────────────────────────────────────────────────────
 
 
+# Optional TTL-based expiry of deployment records. When set, a deployment gets
+# an expires_at (epoch seconds) once a newer one has gone live (or, if it
+# failed, once it finishes), and DynamoDB TTL deletes it afterwards. The
+# deployment serving traffic never expires, even while a newer one is running.
+DEPLOYMENT_RETENTION_DAYS = int(os.environ.get("DEPLOYMENT_RETENTION_DAYS", "0"))
+DEPLOYMENT_TTL_ATTRIBUTE = "expires_at"
+
+# Stages of an event-driven deployment (EVENT_DRIVEN_BUILDS): the record
+# waits for the build, then the CodeBuild state-change event claims it for
+# the post-build stage. A claim older than the lease (the API Lambda's
+# timeout) is presumed dead and may be taken over by a replayed event.
+DEPLOY_STAGE_AWAITING_BUILD = "AWAITING_BUILD"
+DEPLOY_STAGE_POST_BUILD = "POST_BUILD"
+DEPLOY_STAGE_DONE = "DONE"
+DEPLOY_STAGE_LEASE_SECONDS = int(os.environ.get("DEPLOY_STAGE_LEASE_SECONDS", "900"))
+
+
 def create_deployment(
     project_id: str,
-    build_id: str,
+    build_id: Optional[str],
     commit_sha: Optional[str] = None,
     commit_message: Optional[str] = None,
     commit_author_name: Optional[str] = None,
     commit_author_username: Optional[str] = None,
     branch: Optional[str] = None,
+    deploy_id: Optional[str] = None,
+    resume: Optional[dict] = None,
 ) -> dict:
-    """Create a new deployment record in the deployments table."""
+    """
+    Create a new deployment record in the deployments table.
+
+    deploy_id may be assigned by the caller: it travels in the deploy
+    message, so a redelivered message finds this record and resumes from
+    its step checkpoints (see checkpoint_deployment_step). build_id is set
+    once the build starts. resume marks an event-driven deployment: the
+    record waits at stage AWAITING_BUILD with the deploy settings the
+    post-build stage needs (see claim_deployment_stage).
+    """
     table = get_or_create_deployments_table()
-    deploy_id = generate_deploy_id()
+    deploy_id = deploy_id or generate_deploy_id()
     now = datetime.utcnow().isoformat()
     timestamp = int(time.time())
 
@@ -821,9 +1300,11 @@ def create_deployment(
         "status": "IN_PROGRESS",
         "logs_url": None,
         "started_at": now,
+        "started_hour": deployment_started_hour(now),
         "finished_at": None,
+        "steps": {},
+        "step_timings_ms": {},
     }
-
     # Add Git metadata if present (webhook-triggered deploys)
     if commit_sha:
         item["commit_sha"] = commit_sha
@@ -835,58 +1316,305 @@ def create_deployment(
         item["commit_author_username"] = commit_author_username
     if branch:
         item["branch"] = branch
+    if resume:
+        item["stage"] = DEPLOY_STAGE_AWAITING_BUILD
+        item["resume"] = resume
 
     table.put_item(Item=item)
     return item
 
 
+def _expire_superseded_deployments(table, project_id: str, sk: str) -> None:
+    """
+    Stamp expires_at on every older deployment of the service not stamped yet.
+
+    Called once the deployment at sk has gone live: the one it replaces only
+    stops serving traffic now. Also catches failed deployments older than sk.
+    """
+    expires_at = int(time.time()) + DEPLOYMENT_RETENTION_DAYS * 86400
+    older = _query_all(
+        table,
+        KeyConditionExpression=Key("project_id").eq(project_id) & Key("SK").between("DEPLOY#", sk),
+        FilterExpression=Attr(DEPLOYMENT_TTL_ATTRIBUTE).not_exists(),
+        ProjectionExpression="project_id, SK",
+    )
+    for previous in older:
+        if previous["SK"] == sk:
+            continue
+        table.update_item(
+            Key={"project_id": previous["project_id"], "SK": previous["SK"]},
+            UpdateExpression="SET #ttl = :ttl",
+            ExpressionAttributeNames={"#ttl": DEPLOYMENT_TTL_ATTRIBUTE},
+            ExpressionAttributeValues={":ttl": expires_at},
+        )
+
+
+def deployment_started_hour(started_at: str) -> str:
+    """Hour bucket ("YYYY-MM-DDTHH") of an ISO started_at, the started-hour-index partition."""
+    return started_at[:13]
+
+
+def list_deployments_started_between(window_start: datetime, window_end: datetime) -> list:
+    """
+    All deployments (fleet-wide) whose started_at is in [window_start, window_end).
+
+    One range query per hour bucket on started-hour-index, so an hourly
+    window is a single query regardless of fleet size. Items carry the
+    index projection: project_id (service_id), SK, deploy_id, started_at,
+    finished_at and status.
+    """
+    table = get_or_create_deployments_table()
+    start_iso = window_start.isoformat()
+    end_iso = window_end.isoformat()
+
+    items = []
+    hour = window_start.replace(minute=0, second=0, microsecond=0)
+    while hour < window_end:
+        items.extend(_query_all(
+            table,
+            IndexName=DEPLOY_STARTED_INDEX_NAME,
+            KeyConditionExpression=Key("started_hour").eq(deployment_started_hour(hour.isoformat()))
+            & Key("started_at").between(start_iso, end_iso),
+        ))
+        hour += timedelta(hours=1)
+    # BETWEEN is inclusive; the window end belongs to the next window
+    return [i for i in items if i["started_at"] < end_iso]
+
+
 def list_deployments(project_id: str) -> list:
-    """List all deployments for a project (newest first)."""
+    """List all deployments for a project (newest first), following every page."""
     table = get_or_create_deployments_table()
-    response = table.query(
+    return _query_all(
+        table,
         KeyConditionExpression=Key("project_id").eq(project_id)
         & Key("SK").begins_with("DEPLOY#"),
         ScanIndexForward=False,  # Newest first
     )
-    return response.get("Items", [])
+
+
+def _encode_cursor(last_key: dict) -> str:
+    """Opaque pagination cursor from a LastEvaluatedKey."""
+    return base64.urlsafe_b64encode(json.dumps(last_key).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> dict:
+    """Inverse of _encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(key, dict):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def list_deployments_page(project_id: str, limit: int = 20, cursor: Optional[str] = None) -> dict:
+    """
+    List one page of deployments for a project (newest first).
+
+    Args:
+        project_id: The project ID (service_id)
+        limit: Maximum deployments to return
+        cursor: Opaque cursor from a previous page's next_cursor
+
+    Returns:
+        {"deployments": [...], "next_cursor": str | None}
+
+    Raises:
+        ValueError: If the cursor is malformed or belongs to another project
+    """
+    table = get_or_create_deployments_table()
+    query_kwargs = {
+        "KeyConditionExpression": Key("project_id").eq(project_id)
+        & Key("SK").begins_with("DEPLOY#"),
+        "ScanIndexForward": False,  # Newest first
+        "Limit": limit,
+    }
+    if cursor:
+        start_key = _decode_cursor(cursor)
+        if start_key.get("project_id") != project_id:
+            raise ValueError("Invalid cursor")
+        query_kwargs["ExclusiveStartKey"] = start_key
+
+    response = table.query(**query_kwargs)
+    last_key = response.get("LastEvaluatedKey")
+    return {
+        "deployments": response.get("Items", []),
+        "next_cursor": _encode_cursor(last_key) if last_key else None,
+    }
 
 
 def get_deployment(project_id: str, deploy_id: str) -> Optional[dict]:
     """
     Get a specific deployment by ID.
-    
+
+    Uses the deploy-id-index GSI (single Query, independent of history size).
+
     Args:
-        project_id: The project ID
+        project_id: The project ID (service_id) the deployment must belong to
         deploy_id: The deployment ID (e.g., "deploy_abc123")
-        
+
     Returns:
         Deployment dict if found, None otherwise
     """
-    deployments = list_deployments(project_id)
-    return next((d for d in deployments if d["deploy_id"] == deploy_id), None)
+    table = get_or_create_deployments_table()
+    response = table.query(
+        IndexName=DEPLOY_ID_INDEX_NAME,
+        KeyConditionExpression=Key("deploy_id").eq(deploy_id),
+        Limit=1,
+    )
+    items = response.get("Items", [])
+    if not items or items[0].get("project_id") != project_id:
+        return None
+    return items[0]
 
 
-def update_deployment(project_id: str, deploy_id: str, updates: dict) -> Optional[dict]:
-    """Update a deployment."""
+def get_deployment_consistent(project_id: str, deploy_id: str, sk: Optional[str] = None) -> Optional[dict]:
+    """
+    Get a deployment with a strongly consistent read on the table itself.
+
+    deploy-id-index is eventually consistent, so a record written moments
+    ago (or its latest stage) may not be visible there yet. With sk this is
+    a single GetItem; without it, the service's deployment partition is
+    queried (builds started before SHORLABS_DEPLOY_SK was passed).
+    """
     table = get_or_create_deployments_table()
+    if sk:
+        item = table.get_item(Key={"project_id": project_id, "SK": sk}, ConsistentRead=True).get("Item")
+        return item if item and item.get("deploy_id") == deploy_id else None
+
+    items = _query_all(
+        table,
+        KeyConditionExpression=Key("project_id").eq(project_id) & Key("SK").begins_with("DEPLOY#"),
+        FilterExpression=Attr("deploy_id").eq(deploy_id),
+        ConsistentRead=True,
+    )
+    return items[0] if items else None
 
-    # Find the deployment (by deploy_id within the project's deployments)
-    deployments = list_deployments(project_id)
-    deployment = next((d for d in deployments if d.get("deploy_id") == deploy_id), None)
-    if not deployment:
-        return None
+
+def update_deployment(
+    project_id: str,
+    deploy_id: str,
+    updates: dict,
+    sk: Optional[str] = None,
+) -> Optional[dict]:
+    """
+    Update a deployment.
+
+    Pass sk (the record's SK, returned by create_deployment) to update by
+    primary key directly; otherwise the key is resolved via deploy-id-index.
+    Returns None if the deployment does not exist.
+
+    With DEPLOYMENT_RETENTION_DAYS set, a status change to SUCCEEDED expires
+    the deployments it supersedes and one to FAILED expires the deployment
+    itself (it never served traffic).
+    """
+    table = get_or_create_deployments_table()
+
+    if sk is None:
+        deployment = get_deployment(project_id, deploy_id)
+        if not deployment:
+            return None
+        sk = deployment["SK"]
+
+    status = updates.get("status")
+    if DEPLOYMENT_RETENTION_DAYS > 0 and status == "FAILED":
+        updates = {**updates, DEPLOYMENT_TTL_ATTRIBUTE: int(time.time()) + DEPLOYMENT_RETENTION_DAYS * 86400}
 
     update_expr = "SET " + ", ".join(f"#{k} = :{k}" for k in updates.keys())
     expr_names = {f"#{k}": k for k in updates.keys()}
     expr_values = {f":{k}": v for k, v in updates.items()}
 
-    response = table.update_item(
-        Key={"project_id": deployment["project_id"], "SK": deployment["SK"]},
+    try:
+        response = table.update_item(
+            Key={"project_id": project_id, "SK": sk},
+            UpdateExpression=update_expr,
+            ConditionExpression="attribute_exists(SK)",
+            ExpressionAttributeNames=expr_names,
+            ExpressionAttributeValues=expr_values,
+            ReturnValues="ALL_NEW",
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return None
+
+    if DEPLOYMENT_RETENTION_DAYS > 0 and status == "SUCCEEDED":
+        try:
+            _expire_superseded_deployments(table, project_id, sk)
+        except Exception as e:
+            print(f"⚠️ Could not expire deployments superseded by {deploy_id}: {e}")
+    return response.get("Attributes")
+
+
+def checkpoint_deployment_step(
+    project_id: str,
+    sk: str,
+    step: str,
+    outputs: dict,
+    duration_ms: Optional[int] = None,
+    updates: Optional[dict] = None,
+) -> None:
+    """
+    Record a completed deploy step and its outputs on the deployment.
+
+    A retried deploy reads these back from the record's steps map and skips
+    the steps already done. duration_ms goes to the step_timings_ms map
+    (pre-build steps run concurrently, so their timings overlap). updates
+    are top-level attributes written in the same request (e.g. build_id
+    with the start_build step).
+    """
+    table = get_or_create_deployments_table()
+    updates = updates or {}
+    update_expr = "SET #steps.#step = :outputs, #last = :step"
+    expr_names = {"#steps": "steps", "#step": step, "#last": "last_step"}
+    expr_values = {":outputs": outputs, ":step": step}
+    if duration_ms is not None:
+        update_expr += ", #timings.#step = :duration"
+        expr_names["#timings"] = "step_timings_ms"
+        expr_values[":duration"] = duration_ms
+    for k, v in updates.items():
+        update_expr += f", #u_{k} = :u_{k}"
+        expr_names[f"#u_{k}"] = k
+        expr_values[f":u_{k}"] = v
+
+    table.update_item(
+        Key={"project_id": project_id, "SK": sk},
         UpdateExpression=update_expr,
         ExpressionAttributeNames=expr_names,
         ExpressionAttributeValues=expr_values,
-        ReturnValues="ALL_NEW",
     )
+
+
+def claim_deployment_stage(project_id: str, sk: str, expected: str, stage: str) -> Optional[dict]:
+    """
+    Move a deployment from stage `expected` to `stage` with a conditional write.
+
+    Build events are delivered at least once, so only the caller that wins
+    this write continues the deployment. A deployment already at `stage`
+    whose claim is older than DEPLOY_STAGE_LEASE_SECONDS can be claimed
+    again (its worker died mid-stage); the step checkpoints make that safe.
+
+    Returns:
+        The updated record, or None if it was not claimable (already
+        claimed, or not an event-driven deployment)
+    """
+    table = get_or_create_deployments_table()
+    now = int(time.time())
+    try:
+        response = table.update_item(
+            Key={"project_id": project_id, "SK": sk},
+            UpdateExpression="SET #stage = :stage, #claimed = :now",
+            ConditionExpression="#stage = :expected OR (#stage = :stage AND #claimed < :stale)",
+            ExpressionAttributeNames={"#stage": "stage", "#claimed": "stage_claimed_at"},
+            ExpressionAttributeValues={
+                ":stage": stage,
+                ":expected": expected,
+                ":now": now,
+                ":stale": now - DEPLOY_STAGE_LEASE_SECONDS,
+            },
+            ReturnValues="ALL_NEW",
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return None
     return response.get("Attributes")
 
 
@@ -904,15 +1632,14 @@ def get_or_create_org_usage_table():
     
     Key Schema:
         - organization_id (HASH/Partition Key): The billing entity
-        - period (RANGE/Sort Key): Billing period in YYYY-MM format
+        - period (RANGE/Sort Key): Billing period in YYYY-MM format, or
+          HOUR#/SVC#.../PLAN items (see USAGE ROLLUPS below)
     """
-    try:
-        table = dynamodb.Table(ORG_USAGE_TABLE_NAME)
-        table.load()
-        return table
-    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
-        pass
+    return _get_table(ORG_USAGE_TABLE_NAME, _create_org_usage_table)
+
 
+def _create_org_usage_table():
+    """Create the organization usage metrics table (called once, from the table registry)."""
     print(f"📦 Creating DynamoDB table: {ORG_USAGE_TABLE_NAME}")
     table = dynamodb.create_table(
         TableName=ORG_USAGE_TABLE_NAME,
@@ -1069,6 +1796,263 @@ def increment_org_usage(
         })
 
 
+# ─────────────────────────────────────────────────────────────
+# USAGE WINDOW TRACKER (sharded aggregation, stored in usage table)
+# ─────────────────────────────────────────────────────────────
+
+# One item per aggregation window under a reserved partition of the usage
+# table. Shard workers add themselves to completed_shards; the window is DONE
+# once every shard has reported.
+USAGE_WINDOW_TRACKER_ID = "SYSTEM#usage_aggregation"
+USAGE_WINDOW_RUNNING = "RUNNING"
+USAGE_WINDOW_DONE = "DONE"
+
+
+def _usage_window_key(window_key: str) -> dict:
+    return {"organization_id": USAGE_WINDOW_TRACKER_ID, "period": f"WINDOW#{window_key}"}
+
+
+def start_usage_window(window_key: str, shard_count: int) -> dict:
+    """
+    Record a sharded aggregation window (idempotent).
+
+    Returns the tracker item; if the window was already started, the
+    existing item (and its shard_count) wins.
+    """
+    table = get_usage_table()
+    now = datetime.utcnow().isoformat()
+    item = {
+        **_usage_window_key(window_key),
+        "window_key": window_key,
+        "shard_count": shard_count,
+        "status": USAGE_WINDOW_RUNNING,
+        "started_at": now,
+        "updated_at": now,
+    }
+    try:
+        table.put_item(Item=item, ConditionExpression="attribute_not_exists(period)")
+        return item
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        response = table.get_item(Key=_usage_window_key(window_key), ConsistentRead=True)
+        return response["Item"]
+
+
+def complete_usage_shard(window_key: str, shard: int) -> Optional[dict]:
+    """Mark one shard of a window as reported. Returns the tracker item, or None if unknown."""
+    table = get_usage_table()
+    try:
+        response = table.update_item(
+            Key=_usage_window_key(window_key),
+            UpdateExpression="ADD completed_shards :shard SET updated_at = :now",
+            ConditionExpression="attribute_exists(period)",
+            ExpressionAttributeValues={
+                ":shard": {Decimal(shard)},
+                ":now": datetime.utcnow().isoformat(),
+            },
+            ReturnValues="ALL_NEW",
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return None
+    return response.get("Attributes")
+
+
+def mark_usage_window_done(window_key: str) -> bool:
+    """Flip a window to DONE. Returns True only for the caller that made the transition."""
+    table = get_usage_table()
+    now = datetime.utcnow().isoformat()
+    try:
+        table.update_item(
+            Key=_usage_window_key(window_key),
+            UpdateExpression="SET #st = :done, completed_at = :now, updated_at = :now",
+            ConditionExpression="attribute_exists(period) AND #st <> :done",
+            ExpressionAttributeNames={"#st": "status"},
+            ExpressionAttributeValues={":done": USAGE_WINDOW_DONE, ":now": now},
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+
+def get_usage_window(window_key: str) -> Optional[dict]:
+    """Tracker item for a sharded aggregation window, or None if never started."""
+    table = get_usage_table()
+    response = table.get_item(Key=_usage_window_key(window_key), ConsistentRead=True)
+    return response.get("Item")
+
+
+# High-water mark: window_end of the last window whose usage was fully billed.
+# Runs process every window after it, so a failed or skipped run is caught up.
+USAGE_WATERMARK_PERIOD = "WATERMARK"
+
+
+def get_usage_watermark() -> Optional[str]:
+    """ISO window_end of the last completed aggregation window, or None."""
+    table = get_usage_table()
+    response = table.get_item(
+        Key={"organization_id": USAGE_WINDOW_TRACKER_ID, "period": USAGE_WATERMARK_PERIOD},
+        ConsistentRead=True,
+    )
+    item = response.get("Item")
+    return item.get("window_end") if item else None
+
+
+def advance_usage_watermark(window_end: str) -> bool:
+    """Move the watermark forward to window_end (never backwards). Returns True if it moved."""
+    table = get_usage_table()
+    try:
+        table.update_item(
+            Key={"organization_id": USAGE_WINDOW_TRACKER_ID, "period": USAGE_WATERMARK_PERIOD},
+            UpdateExpression="SET window_end = :we, updated_at = :now",
+            ConditionExpression="attribute_not_exists(window_end) OR window_end < :we",
+            ExpressionAttributeValues={":we": window_end, ":now": datetime.utcnow().isoformat()},
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+
+# ─────────────────────────────────────────────────────────────
+# USAGE ROLLUPS (hourly usage + plan snapshot, stored in usage table)
+# ─────────────────────────────────────────────────────────────
+
+# Hourly usage per org (period HOUR#YYYY-MM-DDTHH) and per service
+# (period SVC#<service_id>#HOUR#YYYY-MM-DDTHH), keyed by Autumn feature ID.
+# Each aggregation window is ADDed into its hour at most once: the window key
+# is kept in a string set and the update is conditional on it being absent.
+USAGE_ROLLUP_METRICS = ("invocations", "compute", "build_seconds", "vcpu_time", "memory_time")
+USAGE_ROLLUPS_SINCE_PERIOD = "ROLLUPS_SINCE"
+USAGE_PLAN_PERIOD = "PLAN"
+
+
+def usage_rollup_hour(ts: datetime) -> str:
+    """Hour bucket label (YYYY-MM-DDTHH, UTC) for a timestamp."""
+    return ts.strftime("%Y-%m-%dT%H")
+
+
+def _usage_rollup_prefix(service_id: Optional[str] = None) -> str:
+    return f"SVC#{service_id}#HOUR#" if service_id else "HOUR#"
+
+
+def add_usage_rollup(
+    org_id: str,
+    hour: str,
+    window_key: str,
+    usage: dict,
+    service_id: Optional[str] = None,
+) -> bool:
+    """
+    Add one window's usage into an hourly rollup (org-level, or per service).
+
+    Returns False if this window was already applied to the item.
+    """
+    metrics = [m for m in USAGE_ROLLUP_METRICS if usage.get(m)]
+    if not metrics:
+        return False
+
+    table = get_usage_table()
+    values = {f":{m}": Decimal(str(round(float(usage[m]), 6))) for m in metrics}
+    values.update({
+        ":wk": {window_key},
+        ":wkey": window_key,
+        ":hour": hour,
+        ":now": datetime.utcnow().isoformat(),
+    })
+    update_expr = (
+        "ADD " + ", ".join(f"{m} :{m}" for m in metrics) + ", windows :wk "
+        "SET #hour = :hour, updated_at = :now"
+    )
+    names = {"#hour": "hour"}
+    if service_id:
+        update_expr += ", service_id = :sid"
+        values[":sid"] = service_id
+
+    try:
+        table.update_item(
+            Key={"organization_id": org_id, "period": f"{_usage_rollup_prefix(service_id)}{hour}"},
+            UpdateExpression=update_expr,
+            ConditionExpression="attribute_not_exists(windows) OR NOT contains(windows, :wkey)",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+
+def list_usage_rollups(
+    org_id: str,
+    start_hour: str,
+    end_hour: str,
+    service_id: Optional[str] = None,
+) -> list:
+    """Hourly rollups for an org (or one of its services) with start_hour <= hour <= end_hour."""
+    table = get_usage_table()
+    prefix = _usage_rollup_prefix(service_id)
+    return _query_all(
+        table,
+        KeyConditionExpression=Key("organization_id").eq(org_id)
+        & Key("period").between(f"{prefix}{start_hour}", f"{prefix}{end_hour}"),
+    )
+
+
+def mark_usage_rollups_since(hour: str) -> bool:
+    """Record the first hour rollups were written for (set once, never moved)."""
+    table = get_usage_table()
+    try:
+        table.put_item(
+            Item={
+                "organization_id": USAGE_WINDOW_TRACKER_ID,
+                "period": USAGE_ROLLUPS_SINCE_PERIOD,
+                "hour": hour,
+                "created_at": datetime.utcnow().isoformat(),
+            },
+            ConditionExpression="attribute_not_exists(period)",
+        )
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+
+def get_usage_rollups_since() -> Optional[str]:
+    """First hour covered by rollups, or None if the aggregator has not written any."""
+    table = get_usage_table()
+    response = table.get_item(
+        Key={"organization_id": USAGE_WINDOW_TRACKER_ID, "period": USAGE_ROLLUPS_SINCE_PERIOD},
+    )
+    item = response.get("Item")
+    return item.get("hour") if item else None
+
+
+def get_usage_plan_snapshot(org_id: str) -> Optional[dict]:
+    """Last Autumn customer stored for an org: {"customer": dict, "fetched_at": iso} or None."""
+    table = get_usage_table()
+    response = table.get_item(Key={"organization_id": org_id, "period": USAGE_PLAN_PERIOD})
+    item = response.get("Item")
+    if not item:
+        return None
+    return {"customer": json.loads(item["customer"]), "fetched_at": item["fetched_at"]}
+
+
+def put_usage_plan_snapshot(org_id: str, customer: dict) -> str:
+    """Store the org's Autumn customer (plan, limits, balances). Returns fetched_at."""
+    table = get_usage_table()
+    fetched_at = datetime.utcnow().isoformat()
+    table.put_item(Item={
+        "organization_id": org_id,
+        "period": USAGE_PLAN_PERIOD,
+        # Stored as JSON: Autumn payloads carry floats, which DynamoDB rejects
+        "customer": json.dumps(customer),
+        "fetched_at": fetched_at,
+    })
+    return fetched_at
+
+
+def delete_usage_plan_snapshot(org_id: str) -> None:
+    """Drop the stored customer so the next usage read fetches the plan from Autumn."""
+    table = get_usage_table()
+    table.delete_item(Key={"organization_id": org_id, "period": USAGE_PLAN_PERIOD})
+
+
 # ─────────────────────────────────────────────────────────────
 # QUOTA THROTTLE STATE (stored in projects table)
 # ─────────────────────────────────────────────────────────────
@@ -1103,6 +2087,7 @@ def set_throttle_state(org_id: str, reason: str, throttled_functions: list) -> d
         "billing_period": period,
     }
     table.put_item(Item=item)
+    update_org_warm_targets(org_id, {"is_throttled": True})
     return item
 
 
@@ -1110,9 +2095,106 @@ def clear_throttle_state(org_id: str) -> bool:
     """Remove throttle state for an org (unthrottle)."""
     table = get_or_create_table()
     table.delete_item(Key={"PK": f"ORG#{org_id}", "SK": "THROTTLE_STATE"})
+    update_org_warm_targets(org_id, {"is_throttled": False})
     return True
 
 
+# ─────────────────────────────────────────────────────────────
+# WARM TARGETS (stored in projects table)
+# ─────────────────────────────────────────────────────────────
+
+# Every LIVE web-app the warmer may ping, kept in one partition so a warming
+# run is a single Query instead of a services scan plus per-org plan and
+# throttle lookups. Maintained on deploy (LIVE), service/project delete,
+# throttle state changes and Autumn plan webhooks; rebuilt from scratch by
+# migrations/rebuild_warm_targets.py, which also writes the META item.
+WARM_TARGETS_PK = "WARM_TARGETS"
+WARM_TARGETS_META_SK = "META"
+
+
+def _warm_target_sk(org_id: str, service_id: str) -> str:
+    return f"ORG#{org_id}#SERVICE#{service_id}"
+
+
+def build_warm_target(service: dict, *, function_name: Optional[str], is_paid: bool, is_throttled: bool) -> dict:
+    """Warm-target item for a LIVE web-app service."""
+    org_id = service["organization_id"]
+    return {
+        "PK": WARM_TARGETS_PK,
+        "SK": _warm_target_sk(org_id, service["service_id"]),
+        "service_id": service["service_id"],
+        "organization_id": org_id,
+        "name": service.get("name", "unknown"),
+        "function_url": service["function_url"],
+        "function_name": function_name,
+        "plan": "paid" if is_paid else "hobby",
+        "is_throttled": is_throttled,
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+
+
+def put_warm_target(service: dict, *, function_name: Optional[str], is_paid: bool, is_throttled: bool) -> dict:
+    """Add or refresh a service in the warm-target set."""
+    item = build_warm_target(service, function_name=function_name, is_paid=is_paid, is_throttled=is_throttled)
+    get_or_create_table().put_item(Item=item)
+    return item
+
+
+def delete_warm_target(org_id: str, service_id: str) -> None:
+    """Remove a service from the warm-target set (no-op if absent)."""
+    get_or_create_table().delete_item(Key={"PK": WARM_TARGETS_PK, "SK": _warm_target_sk(org_id, service_id)})
+
+
+def list_warm_targets() -> list:
+    """Every warm target (one Query on the WARM_TARGETS partition, META excluded)."""
+    table = get_or_create_table()
+    return _query_all(
+        table,
+        KeyConditionExpression=Key("PK").eq(WARM_TARGETS_PK) & Key("SK").begins_with("ORG#"),
+    )
+
+
+def update_org_warm_targets(org_id: str, updates: dict) -> int:
+    """Apply updates (e.g. plan, is_throttled) to all of an org's warm targets. Returns the count."""
+    table = get_or_create_table()
+    targets = _query_all(
+        table,
+        KeyConditionExpression=Key("PK").eq(WARM_TARGETS_PK) & Key("SK").begins_with(f"ORG#{org_id}#"),
+        ProjectionExpression="PK, SK",
+    )
+    updates = {**updates, "updated_at": datetime.utcnow().isoformat()}
+    for target in targets:
+        try:
+            table.update_item(
+                Key={"PK": target["PK"], "SK": target["SK"]},
+                UpdateExpression="SET " + ", ".join(f"#{k} = :{k}" for k in updates),
+                ConditionExpression=Attr("SK").exists(),
+                ExpressionAttributeNames={f"#{k}": k for k in updates},
+                ExpressionAttributeValues={f":{k}": v for k, v in updates.items()},
+            )
+        except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+            continue  # Deleted concurrently
+    return len(targets)
+
+
+def get_warm_targets_meta() -> Optional[dict]:
+    """META item written by the last full rebuild, or None if the set was never built."""
+    response = get_or_create_table().get_item(Key={"PK": WARM_TARGETS_PK, "SK": WARM_TARGETS_META_SK})
+    return response.get("Item")
+
+
+def mark_warm_targets_built(count: int) -> dict:
+    """Record a full rebuild; the warmer trusts the set only once this exists."""
+    item = {
+        "PK": WARM_TARGETS_PK,
+        "SK": WARM_TARGETS_META_SK,
+        "target_count": count,
+        "built_at": datetime.utcnow().isoformat(),
+    }
+    get_or_create_table().put_item(Item=item)
+    return item
+
+
 # ─────────────────────────────────────────────────────────────
 # GITHUB CONNECTIONS TABLE (Organization-based)
 # ─────────────────────────────────────────────────────────────
@@ -1122,13 +2204,11 @@ GITHUB_CONNECTIONS_TABLE = "org-github-connections"
 
 def get_github_connections_table():
     """Get or create the github-connections DynamoDB table."""
-    try:
-        table = dynamodb.Table(GITHUB_CONNECTIONS_TABLE)
-        table.load()
-        return table
-    except dynamodb.meta.client.exceptions.ResourceNotFoundException:
-        pass
+    return _get_table(GITHUB_CONNECTIONS_TABLE, _create_github_connections_table)
 
+
+def _create_github_connections_table():
+    """Create the github-connections table (called once, from the table registry)."""
     print(f"📦 Creating DynamoDB table: {GITHUB_CONNECTIONS_TABLE}")
     table = dynamodb.create_table(
         TableName=GITHUB_CONNECTIONS_TABLE,
@@ -1272,3 +2352,8 @@ def delete_github_connection(org_id: str) -> bool:
     )
 
     return "Attributes" in response
+
+
+if __name__ == "__main__":
+    stats = bootstrap_tables()
+    print(f"✅ Tables ready: {', '.join(stats['cached_tables'])}")
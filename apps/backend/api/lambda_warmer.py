@@ -7,27 +7,52 @@ Only warms projects belonging to paid orgs (Pro/Plus plans).
 Two modes:
 1. Scheduled warming (every 5 min via EventBridge): pings all LIVE paid projects
 2. Post-deploy warming: pings a newly deployed function immediately (paid orgs only)
+
+Pings run on an asyncio engine in a dedicated background event loop:
+- shared httpx.AsyncClients, so connections (and TLS sessions) to each
+  function URL are kept alive across pings and across warming runs; hosts
+  are spread over several small pools because httpx's per-request pool
+  bookkeeping grows with the number of connections in one pool
+- a global semaphore bounds in-flight pings (WARM_CONCURRENCY), and each
+  pool has one of its own sized to its connections: a target's pings
+  reserve that many connections before any is sent, so they go out
+  simultaneously instead of queueing behind other hosts on the same pool
+- each ping has its own deadline (WARM_TIMEOUT_SECONDS) and the run as a
+  whole stops starting new pings after WARM_RUN_DEADLINE_SECONDS
+- a random start delay (WARM_JITTER_SECONDS) spreads pings out
+
+Scheduled runs ask api.warm_planner how many environments each function
+needs and send that many simultaneous pings (WARM_PLANNER_ENABLED).
 """
 
+import asyncio
 import os
+import random
+import threading
 import time
+import zlib
 from datetime import datetime
-from typing import Dict, List
-
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 
 import httpx
 
-from api.db.dynamodb import get_throttle_state
-from api.usage_aggregator import get_all_services
+from api.db.dynamodb import get_throttle_state, get_warm_targets_meta, list_warm_targets
+from api.services import autumn
+from api.usage_aggregator import _resolve_function_name, get_all_services
+from api.warm_planner import plan_warming
 
 
 # Configuration
 WARM_TIMEOUT_SECONDS = 10.0
-WARM_CONCURRENCY = 10
+WARM_CONCURRENCY = int(os.environ.get("WARM_CONCURRENCY", "200"))
+WARM_JITTER_SECONDS = float(os.environ.get("WARM_JITTER_SECONDS", "2.0"))
+WARM_RUN_DEADLINE_SECONDS = float(os.environ.get("WARM_RUN_DEADLINE_SECONDS", "240"))
+WARM_PLANNER_ENABLED = os.environ.get("WARM_PLANNER_ENABLED", "true").lower() in ("true", "1", "yes")
+WARM_CONNECTIONS_PER_CLIENT = 25
+WARM_KEEPALIVE_SECONDS = 300.0
 POST_DEPLOY_WARM_COUNT = 3
 POST_DEPLOY_WARM_DELAY = 1.0
-AUTUMN_BASE_URL = os.environ.get("AUTUMN_BASE_URL", "https://api.useautumn.com/v1")
 
 
 def _is_paid_org(org_id: str) -> bool:
@@ -37,29 +62,82 @@ def _is_paid_org(org_id: str) -> bool:
     Paid orgs have features.usd_credits.included_usage > 0.
     Returns False for Hobby orgs or if Autumn is unavailable.
     """
-    autumn_key = os.environ.get("AUTUMN_API_KEY")
-    if not autumn_key:
+    if not autumn.is_configured():
         return False
 
     try:
-        resp = httpx.get(
-            f"{AUTUMN_BASE_URL}/customers/{org_id}",
-            headers={"Authorization": f"Bearer {autumn_key}"},
-            timeout=10.0,
-        )
-        if resp.status_code >= 400:
-            return False
-        customer = resp.json()
-    except Exception:
+        customer = autumn.get_customer(org_id)
+    except autumn.AutumnError:
         return False
+    return autumn.is_paid_customer(customer)
+
 
-    features = customer.get("features") or {}
-    usd_credits = features.get("usd_credits") or {}
-    credits_included = usd_credits.get("included_usage")
-    return credits_included is not None and credits_included > 0
+# ─────────────────────────────────────────────────────────────
+# ASYNC PING ENGINE
+# ─────────────────────────────────────────────────────────────
 
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_pools: List[Tuple[httpx.AsyncClient, "_PingBudget"]] = []
 
-def _ping_function_url(function_url: str, timeout: float = WARM_TIMEOUT_SECONDS) -> dict:
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Background event loop shared by every warming run in this process.
+
+    Runs on its own daemon thread, so sync callers (worker threads, the
+    /events handler running inside FastAPI's loop) can all submit pings, and
+    the AsyncClient's pooled connections outlive a single run.
+    """
+    global _loop
+    if _loop is not None:
+        return _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="lambda-warmer", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def _run(coro):
+    """Run a coroutine on the warmer loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+def _get_pool(function_url: str) -> Tuple[httpx.AsyncClient, "_PingBudget"]:
+    """
+    Shared AsyncClient for a function URL and the budget of its connections
+    (created and used only on the warmer loop).
+
+    Each host always maps to the same client, so its kept-alive connection
+    is found again on the next ping. Every request sent on a client holds
+    one of its budget's slots, so slots acquired are connections free to use.
+    """
+    if not _pools:
+        for _ in range(max(1, -(-WARM_CONCURRENCY // WARM_CONNECTIONS_PER_CLIENT))):
+            _pools.append((
+                httpx.AsyncClient(
+                    timeout=WARM_TIMEOUT_SECONDS,
+                    follow_redirects=True,
+                    limits=httpx.Limits(
+                        max_connections=WARM_CONNECTIONS_PER_CLIENT,
+                        max_keepalive_connections=WARM_CONNECTIONS_PER_CLIENT,
+                        keepalive_expiry=WARM_KEEPALIVE_SECONDS,
+                    ),
+                ),
+                _PingBudget(WARM_CONNECTIONS_PER_CLIENT),
+            ))
+    host = urlsplit(function_url).netloc
+    return _pools[zlib.crc32(host.encode()) % len(_pools)]
+
+
+def _get_client(function_url: str) -> httpx.AsyncClient:
+    """Shared AsyncClient for a function URL (see _get_pool)."""
+    return _get_pool(function_url)[0]
+
+
+async def _ping_function_url(function_url: str, timeout: float = WARM_TIMEOUT_SECONDS) -> dict:
     """
     Send an HTTP GET to a Lambda function URL to warm it.
 
@@ -68,7 +146,7 @@ def _ping_function_url(function_url: str, timeout: float = WARM_TIMEOUT_SECONDS)
     """
     start = time.monotonic()
     try:
-        resp = httpx.get(function_url, timeout=timeout, follow_redirects=True)
+        resp = await asyncio.wait_for(_get_client(function_url).get(function_url), timeout)
         latency_ms = (time.monotonic() - start) * 1000
         return {
             "url": function_url,
@@ -82,17 +160,131 @@ def _ping_function_url(function_url: str, timeout: float = WARM_TIMEOUT_SECONDS)
             "url": function_url,
             "status_code": None,
             "latency_ms": round(latency_ms, 1),
-            "error": str(e),
+            "error": str(e) or type(e).__name__,
         }
 
 
+class _PingBudget:
+    """Semaphore whose holders take several slots at once (all of a target's pings)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._free = limit
+        self._changed = asyncio.Condition()
+
+    async def acquire(self, slots: int) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._free >= slots)
+            self._free -= slots
+
+    async def release(self, slots: int) -> None:
+        async with self._changed:
+            self._free += slots
+            self._changed.notify_all()
+
+
+async def _warm_targets(
+    targets: List[Dict],
+    *,
+    concurrency: int = WARM_CONCURRENCY,
+    jitter_seconds: float = WARM_JITTER_SECONDS,
+    run_deadline_seconds: float = WARM_RUN_DEADLINE_SECONDS,
+) -> List[Optional[dict]]:
+    """
+    Ping every target's function_url, at most `concurrency` pings at a time.
+
+    A target with 'pings' > 1 gets that many simultaneous pings, so each
+    lands on its own execution environment; the pings reserve as many
+    connections in the target's pool first, so none waits for another.
+
+    Returns one result per target, in order (the slowest ping's latency and
+    the first error, plus 'pings' and 'pings_ok'); None for targets skipped
+    because the run deadline passed before their turn.
+    """
+    budget = _PingBudget(concurrency)
+    deadline = time.monotonic() + run_deadline_seconds
+
+    async def warm(target: Dict) -> Optional[dict]:
+        connections = _get_pool(target["function_url"])[1]
+        pings = max(1, min(int(target.get("pings", 1)), budget.limit, connections.limit))
+        if jitter_seconds > 0:
+            await asyncio.sleep(random.uniform(0, jitter_seconds))
+        # Pool first, then the global budget: one order everywhere, no deadlock
+        await connections.acquire(pings)
+        try:
+            await budget.acquire(pings)
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                timeout = min(WARM_TIMEOUT_SECONDS, remaining)
+                results = await asyncio.gather(
+                    *(_ping_function_url(target["function_url"], timeout=timeout) for _ in range(pings))
+                )
+            finally:
+                await budget.release(pings)
+        finally:
+            await connections.release(pings)
+
+        errors = [r["error"] for r in results if r["error"]]
+        ok = [r for r in results if not r["error"]]
+        return {
+            "url": target["function_url"],
+            "status_code": ok[0]["status_code"] if ok else None,
+            "latency_ms": max(r["latency_ms"] for r in results),
+            "error": errors[0] if errors else None,
+            "pings": pings,
+            "pings_ok": len(ok),
+        }
+
+    return await asyncio.gather(*(warm(t) for t in targets))
+
+
+def _get_warm_targets() -> List[Dict]:
+    """
+    Paid, unthrottled warm targets from the maintained WARM_TARGETS set.
+
+    One Query; plan and throttle state are already on each item. Falls back
+    to the full scan until migrations/rebuild_warm_targets.py has built the set.
+
+    Returns:
+        List of dicts with 'service_id', 'function_name', 'function_url',
+        'organization_id', 'name'
+    """
+    if not get_warm_targets_meta():
+        print("   ⚠️ Warm-target set not built yet (run migrations/rebuild_warm_targets.py); scanning services")
+        return _get_live_service_urls()
+
+    result = []
+    skipped_hobby = 0
+    for target in list_warm_targets():
+        if target.get("plan") != "paid":
+            skipped_hobby += 1
+            continue
+        if target.get("is_throttled"):
+            continue
+        result.append({
+            "service_id": target.get("service_id"),
+            "function_name": target.get("function_name"),
+            "function_url": target["function_url"],
+            "organization_id": target.get("organization_id"),
+            "name": target.get("name", "unknown"),
+        })
+
+    if skipped_hobby:
+        print(f"   Skipped {skipped_hobby} Hobby service(s) (warming is a paid feature)")
+
+    return result
+
+
 def _get_live_service_urls() -> List[Dict]:
     """
     Scan DynamoDB for all LIVE web-app services on paid plans (Pro/Plus) with a function_url.
-    Skips Hobby orgs and throttled orgs.
+    Skips Hobby orgs and throttled orgs. Fallback for _get_warm_targets.
 
     Returns:
-        List of dicts with 'service_id', 'function_url', 'organization_id', 'name'
+        List of dicts with 'service_id', 'function_name', 'function_url',
+        'organization_id', 'name'
     """
     services = get_all_services()
     result = []
@@ -133,6 +325,7 @@ def _get_live_service_urls() -> List[Dict]:
 
         result.append({
             "service_id": svc.get("service_id"),
+            "function_name": _resolve_function_name(svc),
             "function_url": function_url,
             "organization_id": org_id,
             "name": svc.get("name", "unknown"),
@@ -155,45 +348,59 @@ def warm_all_lambdas() -> dict:
     """
     print(f"🔥 Starting Lambda warming at {datetime.utcnow().isoformat()}")
 
-    targets = _get_live_service_urls()
+    targets = _get_warm_targets()
     print(f"   Found {len(targets)} paid LIVE services to warm")
 
+    if targets and WARM_PLANNER_ENABLED:
+        try:
+            targets = plan_warming(targets)
+        except Exception as e:
+            # Fall back to one ping per function rather than skipping the run
+            print(f"   ⚠️ Warm planner failed, sending one ping per function: {e}")
+
     if not targets:
         print("   No services to warm")
         return {"warmed": 0, "failed": 0}
 
+    start = time.monotonic()
+    results = _run(_warm_targets(targets))
+    elapsed = time.monotonic() - start
+
     warmed = 0
     failed = 0
-    results = []
-
-    with ThreadPoolExecutor(max_workers=WARM_CONCURRENCY) as executor:
-        future_to_target = {
-            executor.submit(_ping_function_url, t["function_url"]): t
-            for t in targets
-        }
-
-        for future in as_completed(future_to_target):
-            target = future_to_target[future]
-            result = future.result()
-
-            if result["error"]:
-                failed += 1
-                print(f"   FAIL {target['name']}: {result['error']} ({result['latency_ms']}ms)")
-            else:
-                warmed += 1
-                print(f"   WARM {target['name']}: {result['status_code']} ({result['latency_ms']}ms)")
+    skipped = 0
+    pings = 0
+    latencies = []
+    for target, result in zip(targets, results):
+        if result is None:
+            skipped += 1
+            continue
+        pings += result["pings_ok"]
+        latencies.append(result["latency_ms"])
+        if result["error"]:
+            failed += 1
+            print(f"   FAIL {target['name']}: {result['error']} ({result['latency_ms']}ms)")
+        else:
+            warmed += 1
 
-            results.append(result)
+    avg_latency = sum(latencies) / len(latencies) if latencies else 0
+    if skipped:
+        print(f"   ⚠️ Run deadline reached; {skipped} service(s) not pinged this run")
 
-    avg_latency = (
-        sum(r["latency_ms"] for r in results) / len(results)
-        if results
-        else 0
+    print(
+        f"   Warming complete in {elapsed:.1f}s: {warmed} warmed ({pings} environments), "
+        f"{failed} failed, avg latency {avg_latency:.0f}ms"
     )
+    print(f"   Autumn: {autumn.get_autumn_stats()}")
 
-    print(f"   Warming complete: {warmed} warmed, {failed} failed, avg latency {avg_latency:.0f}ms")
-
-    return {"warmed": warmed, "failed": failed, "avg_latency_ms": round(avg_latency)}
+    return {
+        "warmed": warmed,
+        "failed": failed,
+        "skipped": skipped,
+        "environments": pings,
+        "avg_latency_ms": round(avg_latency),
+        "duration_seconds": round(elapsed, 2),
+    }
 
 
 def warm_single_function(function_url: str, org_id: str, count: int = POST_DEPLOY_WARM_COUNT) -> None:
@@ -212,12 +419,20 @@ def warm_single_function(function_url: str, org_id: str, count: int = POST_DEPLO
 
     print(f"🔥 Post-deploy warming: {function_url} ({count} pings)")
 
-    for i in range(count):
-        result = _ping_function_url(function_url)
-        if result["error"]:
-            print(f"   Ping {i + 1}/{count}: FAIL - {result['error']}")
-        else:
-            print(f"   Ping {i + 1}/{count}: {result['status_code']} ({result['latency_ms']}ms)")
+    async def ping_repeatedly():
+        connections = _get_pool(function_url)[1]
+        for i in range(count):
+            await connections.acquire(1)
+            try:
+                result = await _ping_function_url(function_url)
+            finally:
+                await connections.release(1)
+            if result["error"]:
+                print(f"   Ping {i + 1}/{count}: FAIL - {result['error']}")
+            else:
+                print(f"   Ping {i + 1}/{count}: {result['status_code']} ({result['latency_ms']}ms)")
+
+            if i < count - 1:
+                await asyncio.sleep(POST_DEPLOY_WARM_DELAY)
 
-        if i < count - 1:
-            time.sleep(POST_DEPLOY_WARM_DELAY)
+    _run(ping_repeatedly())
@@ -4,12 +4,15 @@ Shorlabs API - FastAPI application for backend deployment platform.
 This single Lambda handles:
 1. HTTP requests (via Mangum/Lambda Web Adapter)
 2. SQS deployment events (background tasks)
+3. CodeBuild build state-change events (post-build deploy stage)
 """
 import os
+import hmac
 import json
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from mangum import Mangum
 
@@ -31,15 +34,27 @@ ALLOWED_ORIGINS = [
 # Remove empty strings
 ALLOWED_ORIGINS = [o for o in ALLOWED_ORIGINS if o]
 
+# Lambda Web Adapter turns every response with this status, from any route,
+# into a failed invocation (AWS_LWA_ERROR_STATUS_CODES in the Dockerfile), so
+# Lambda's async retries and the on-failure destination apply to the event.
+# It must be a status no route returns: routes raise 4xx/500/502/503 (and
+# pass upstream statuses through), none of which may turn into a Lambda error.
+EVENT_RETRY_STATUS_CODE = 599
+
+# Shared secret the build-state EventBridge rule puts in every event it
+# delivers (schedule_build_events.sh). /events is reachable over HTTP too, so
+# a CodeBuild event without it is rejected instead of completing or failing a
+# deployment. Unset: no build event is accepted.
+BUILD_EVENTS_TOKEN = os.environ.get("BUILD_EVENTS_TOKEN", "")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
-    # Startup: ensure DynamoDB tables exist
-    from api.db.dynamodb import get_or_create_table, get_or_create_services_table, get_or_create_domains_table
-    get_or_create_table()  # Projects table
-    get_or_create_services_table()  # Services table
-    get_or_create_domains_table()  # Custom domains table
+    # Startup: verify/create DynamoDB tables once and cache their handles
+    from api.db.dynamodb import bootstrap_tables
+    stats = bootstrap_tables()
+    print(f"📦 DynamoDB tables ready: {stats['describe_table_calls']}")
     yield
     # Shutdown: nothing to do
 
@@ -89,8 +104,8 @@ _mangum_handler = Mangum(app, lifespan="off")
 
 def _handle_sqs_event(event: dict) -> dict:
     """
-    Handle SQS events for deployments, database provisioning, and database deletion.
-    Routes based on message_type field.
+    Handle SQS events for deployments, database provisioning, database deletion
+    and usage aggregation shards. Routes based on message_type field.
     """
     from api.routes.projects import _run_deployment_sync, _run_database_provision_sync, _run_database_delete_sync, _run_ecs_deployment_sync, _run_ecs_delete_sync
 
@@ -114,10 +129,13 @@ def _handle_sqs_event(event: dict) -> dict:
 
             # Resolve service_id (new key) with fallback to project_id (legacy in-flight messages)
             sid = body.get("service_id") or body.get("project_id")
-            if not sid:
+            if not sid and message_type != "usage_shard":
                 raise ValueError("Missing service_id in SQS message body")
 
-            if message_type == "database_provision":
+            if message_type == "usage_shard":
+                from api.usage_sharding import handle_usage_shard
+                handle_usage_shard(body)
+            elif message_type == "database_provision":
                 result = _run_database_provision_sync(
                     service_id=sid,
                     db_name=body.get("db_name", "shorlabs"),
@@ -159,6 +177,8 @@ def _handle_sqs_event(event: dict) -> dict:
                     branch=body.get("branch"),
                     org_id=body.get("org_id"),
                     instance_type=body.get("instance_type"),
+                    parent_project_id=body.get("parent_project_id"),
+                    deploy_id=body.get("deploy_id"),
                 )
             elif message_type == "ecs_delete":
                 _run_ecs_delete_sync(
@@ -182,6 +202,8 @@ def _handle_sqs_event(event: dict) -> dict:
                     commit_author_username=body.get("commit_author_username"),
                     branch=body.get("branch"),
                     org_id=body.get("org_id"),
+                    parent_project_id=body.get("parent_project_id"),
+                    deploy_id=body.get("deploy_id"),
                 )
 
             if handled_with_error:
@@ -224,10 +246,60 @@ def _is_eventbridge_event(event: dict) -> bool:
     return event.get("source") == "aws.events"
 
 
+def _is_codebuild_event(event: dict) -> bool:
+    """Check if the event is a CodeBuild state change delivered by EventBridge."""
+    if not isinstance(event, dict):
+        return False
+    return event.get("source") == "aws.codebuild"
+
+
+def _verify_build_event_token(event: dict) -> bool:
+    """Check the shared secret the EventBridge rule adds to build events."""
+    from deployer.aws.codebuild import BUILD_EVENT_TOKEN_FIELD
+    if not BUILD_EVENTS_TOKEN:
+        print("❌ BUILD_EVENTS_TOKEN not configured, rejecting build event")
+        return False
+    token = event.get(BUILD_EVENT_TOKEN_FIELD)
+    if not isinstance(token, str) or not hmac.compare_digest(
+        token.encode("utf-8"), BUILD_EVENTS_TOKEN.encode("utf-8")
+    ):
+        print("⚠️ Rejecting build event: missing or invalid token")
+        return False
+    return True
+
+
+def _handle_codebuild_event(event: dict):
+    """
+    Resume the deployment whose build just finished (EVENT_DRIVEN_BUILDS).
+
+    Events without the rule's token are answered 403 and not retried. A
+    failure is returned as EVENT_RETRY_STATUS_CODE so the invocation fails
+    and the event is retried, then sent to the DLQ (schedule_build_events.sh).
+    """
+    from api.routes.projects import handle_build_state_change
+    if not _verify_build_event_token(event):
+        return JSONResponse(
+            status_code=403,
+            content={"statusCode": 403, "body": "Invalid build event token"},
+        )
+    try:
+        result = handle_build_state_change(event)
+        return {"statusCode": 200, "body": f"Build event handled: {result}"}
+    except Exception as e:
+        print(f"❌ Build event handling failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return JSONResponse(
+            status_code=EVENT_RETRY_STATUS_CODE,
+            content={"statusCode": EVENT_RETRY_STATUS_CODE, "body": f"Build event failed: {str(e)}"},
+        )
+
+
 def _handle_eventbridge_event(event: dict) -> dict:
     """
     Handle EventBridge scheduled events.
-    Currently supports: usage metrics aggregation.
+    Currently supports: usage metrics aggregation, Lambda warming, route snapshot
+    publishing, sweeping deployments stuck waiting for their build.
     """
     detail = event.get("detail", {})
     action = detail.get("action")
@@ -236,7 +308,11 @@ def _handle_eventbridge_event(event: dict) -> dict:
     
     if action == "aggregate_usage":
         from api.usage_aggregator import aggregate_usage_metrics
+        from api.usage_sharding import USAGE_SHARD_COUNT, enqueue_usage_shards
         try:
+            if USAGE_SHARD_COUNT > 0:
+                result = enqueue_usage_shards()
+                return {"statusCode": 200, "body": f"Usage shards enqueued: {result}"}
             aggregate_usage_metrics()
             return {"statusCode": 200, "body": "Usage aggregation complete"}
         except Exception as e:
@@ -256,6 +332,28 @@ def _handle_eventbridge_event(event: dict) -> dict:
             traceback.print_exc()
             return {"statusCode": 500, "body": f"Warming failed: {str(e)}"}
 
+    if action == "publish_routes":
+        from api.route_snapshot import publish_route_snapshot
+        try:
+            result = publish_route_snapshot()
+            return {"statusCode": 200, "body": f"Route snapshot published: {result}"}
+        except Exception as e:
+            print(f"❌ Route snapshot publish failed: {e}")
+            import traceback
+            traceback.print_exc()
+            return {"statusCode": 500, "body": f"Route snapshot failed: {str(e)}"}
+
+    if action == "sweep_deployments":
+        from api.routes.projects import sweep_stuck_deployments
+        try:
+            result = sweep_stuck_deployments()
+            return {"statusCode": 200, "body": f"Deployment sweep complete: {result}"}
+        except Exception as e:
+            print(f"❌ Deployment sweep failed: {e}")
+            import traceback
+            traceback.print_exc()
+            return {"statusCode": 500, "body": f"Deployment sweep failed: {str(e)}"}
+
     print(f"⚠️ Unknown EventBridge action: {action}")
     return {"statusCode": 400, "body": f"Unknown action: {action}"}
 
@@ -299,11 +397,26 @@ async def handle_autumn_webhook(request: Request):
         return {"status": "ignored", "reason": "no_customer_id"}
 
     from api.quota_enforcer import unthrottle_org
-    from api.db.dynamodb import get_throttle_state
+    from api.db.dynamodb import delete_usage_plan_snapshot, get_throttle_state, update_org_warm_targets
+    from api.services import autumn
+    from api.services.autumn import invalidate_customer
+
+    # Plan or balance changed; don't serve this customer from the caches
+    invalidate_customer(customer_id)
+    delete_usage_plan_snapshot(customer_id)
 
     # customer.products.updated: scenario = new | upgrade | downgrade | renew | cancel | expired | past_due | scheduled
     if event_type == "customer.products.updated":
         scenario = data.get("scenario", "")
+
+        # Plan tier decides whether the warmer pings this org's functions
+        try:
+            is_paid = autumn.is_paid_customer(autumn.get_customer(customer_id))
+            updated = update_org_warm_targets(customer_id, {"plan": "paid" if is_paid else "hobby"})
+            print(f"Webhook: {updated} warm target(s) of {customer_id} now {'paid' if is_paid else 'hobby'}")
+        except Exception as e:
+            print(f"⚠️ Webhook: failed to update warm targets for {customer_id}: {e}")
+
         unthrottle_scenarios = ("new", "upgrade", "renew")  # customer gained or regained access
         if scenario in unthrottle_scenarios:
             state = get_throttle_state(customer_id)
@@ -338,6 +451,11 @@ async def handle_events(request: Request):
         if _is_eventbridge_event(event):
             print("📅 Routing to EventBridge handler (scheduled task)")
             return _handle_eventbridge_event(event)
+
+        # CodeBuild state changes resume event-driven deployments
+        if _is_codebuild_event(event):
+            print("🏁 Routing to CodeBuild handler (build state change)")
+            return _handle_codebuild_event(event)
         
         # Check if this is an SQS event
         if _is_sqs_event(event):
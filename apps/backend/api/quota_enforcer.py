@@ -8,11 +8,9 @@ Vercel/Railway/Render do (suspend/pause services on free tier limit).
 
 Functions are restored when the user upgrades or the billing period resets.
 """
-import os
 from typing import List, Optional
 
 import boto3
-import httpx
 
 from api.db.dynamodb import (
     list_all_org_services,
@@ -20,15 +18,11 @@ from api.db.dynamodb import (
     set_throttle_state,
     clear_throttle_state,
 )
+from api.services import autumn
 from deployer.aws.lambda_service import get_lambda_function_name
 
 lambda_client = boto3.client("lambda")
 
-AUTUMN_BASE_URL = os.environ.get(
-    "AUTUMN_BASE_URL", "https://api.useautumn.com/v1"
-).rstrip("/")
-
-
 def _get_org_lambda_functions(org_id: str) -> List[str]:
     """Get all Lambda function names for an org's LIVE web-app services."""
     services = list_all_org_services(org_id, service_type="web-app")
@@ -118,31 +112,19 @@ def check_and_enforce_quota(org_id: str) -> Optional[str]:
         "already_throttled" if was already throttled
         "unthrottled" if org was restored (upgraded or period reset)
     """
-    autumn_key = os.environ.get("AUTUMN_API_KEY")
-    if not autumn_key:
+    if not autumn.is_configured():
         return None
 
     try:
-        resp = httpx.get(
-            f"{AUTUMN_BASE_URL}/customers/{org_id}",
-            headers={"Authorization": f"Bearer {autumn_key}"},
-            timeout=15.0,
-        )
-        if resp.status_code >= 400:
-            print(f"Autumn customer fetch failed for {org_id}: {resp.status_code}")
-            return None
-        customer = resp.json()
-    except Exception as e:
-        print(f"Autumn customer fetch exception for {org_id}: {e}")
+        customer = autumn.get_customer(org_id)
+    except autumn.AutumnError as e:
+        print(f"Autumn customer fetch failed for {org_id}: {e.status_code or e}")
         return None
 
     features = customer.get("features") or {}
 
     # Determine if this is a hobby org (no credit system = hobby)
-    # Same logic as projects.py:365-367
-    usd_credits = features.get("usd_credits") or {}
-    credits_included = usd_credits.get("included_usage")
-    is_paid = credits_included is not None and credits_included > 0
+    is_paid = autumn.is_paid_customer(customer)
 
     if is_paid:
         # Paid org — if it was previously throttled (just upgraded), unthrottle
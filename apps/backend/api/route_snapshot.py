@@ -0,0 +1,188 @@
+"""
+Route Snapshot Publisher
+
+Compiles every ACTIVE item in the shorlabs-routes table into one compact,
+versioned artifact that the Lambda@Edge router loads once per container.
+Hosts in the snapshot are routed without touching DynamoDB unless the route
+change log (see record_route_changes) shows them written or deleted after
+the snapshot's version; those hosts, and hosts created after the snapshot,
+fall back to the router's keyed GetItem.
+
+Artifact (gzipped JSON, keys sorted for binary search at the edge):
+    {
+      "format": 1,
+      "version": <generated_at in epoch ms, taken before the scan>,
+      "generated_at": <epoch seconds>,
+      "source": {"bucket": ..., "key": ..., "region": ...},
+      "fields": ["origin_kind", "origin_domain", ...],
+      "hosts": ["a.shorlabs.com", "b.example.com", ...],
+      "routes": [[...], [...], ...]     # parallel to hosts, ordered by "fields"
+    }
+
+Two entry points:
+1. Scheduled publish (EventBridge action "publish_routes"): upload to S3
+   and prune the route change log
+2. CLI: python -m api.route_snapshot --output routes_snapshot.json.gz
+   (used by deploy_router.sh when no S3 snapshot is configured)
+"""
+
+import argparse
+import gzip
+import json
+import os
+import time
+
+import boto3
+
+from api.db.dynamodb import (
+    ROUTE_CHANGES_RETENTION_SECONDS,
+    ROUTE_STATUS_ACTIVE,
+    get_or_create_routes_table,
+    prune_route_changes,
+)
+
+
+# Configuration
+ROUTE_SNAPSHOT_BUCKET = os.environ.get("ROUTE_SNAPSHOT_BUCKET", "")
+ROUTE_SNAPSHOT_KEY = os.environ.get("ROUTE_SNAPSHOT_KEY", "router/routes_snapshot.json.gz")
+ROUTE_SNAPSHOT_REGION = "us-east-1"  # Same region the router reads DynamoDB from
+SNAPSHOT_FORMAT = 1
+
+# Per-host values the router needs to build a CloudFront custom origin
+SNAPSHOT_FIELDS = ["origin_kind", "origin_domain", "read_timeout", "keepalive_timeout", "preserve_host"]
+
+
+def _scan_active_routes() -> list:
+    """Paginated scan of all ACTIVE routing items."""
+    table = get_or_create_routes_table()
+    items = []
+    last_key = None
+
+    while True:
+        scan_kwargs = {
+            "FilterExpression": "#st = :active AND attribute_exists(origin_domain)",
+            "ExpressionAttributeNames": {"#st": "status"},
+            "ExpressionAttributeValues": {":active": ROUTE_STATUS_ACTIVE},
+            "ProjectionExpression": "host, " + ", ".join(SNAPSHOT_FIELDS),
+        }
+        if last_key:
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+        response = table.scan(**scan_kwargs)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+
+    return items
+
+
+def _route_row(item: dict) -> list:
+    """Encode one routing item as a row ordered by SNAPSHOT_FIELDS (Decimals → int)."""
+    return [
+        item.get("origin_kind"),
+        item.get("origin_domain"),
+        int(item.get("read_timeout", 30)),
+        int(item.get("keepalive_timeout", 5)),
+        bool(item.get("preserve_host", False)),
+    ]
+
+
+def compile_route_snapshot(items: list = None) -> dict:
+    """
+    Build the snapshot document from routing items.
+
+    Args:
+        items: Routing items to compile. Defaults to a scan of ACTIVE routes.
+    """
+    # Taken before the scan: a route written during the scan is stamped in
+    # the change log after this version, so the router re-reads it
+    generated_at = time.time()
+    if items is None:
+        items = _scan_active_routes()
+
+    rows = sorted(((item["host"].lower(), _route_row(item)) for item in items), key=lambda r: r[0])
+
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "version": int(generated_at * 1000),
+        "generated_at": generated_at,
+        "source": {
+            "bucket": ROUTE_SNAPSHOT_BUCKET,
+            "key": ROUTE_SNAPSHOT_KEY,
+            "region": ROUTE_SNAPSHOT_REGION,
+        },
+        "fields": SNAPSHOT_FIELDS,
+        "hosts": [host for host, _ in rows],
+        "routes": [row for _, row in rows],
+    }
+
+
+def serialize_route_snapshot(snapshot: dict) -> bytes:
+    """Compact JSON, gzipped. The router decompresses and parses it once per container."""
+    body = json.dumps(snapshot, separators=(",", ":")).encode("utf-8")
+    return gzip.compress(body, compresslevel=6)
+
+
+def publish_route_snapshot() -> dict:
+    """
+    Compile the routes table and upload the snapshot to S3.
+
+    Called by the EventBridge "publish_routes" action. The router re-fetches
+    the object from the location embedded in the snapshot it was bundled with.
+    Change log entries older than ROUTE_CHANGES_RETENTION_SECONDS are pruned;
+    the router never trusts a snapshot that old.
+    """
+    start = time.time()
+    snapshot = compile_route_snapshot()
+    payload = serialize_route_snapshot(snapshot)
+
+    summary = {
+        "version": snapshot["version"],
+        "hosts": len(snapshot["hosts"]),
+        "bytes": len(payload),
+    }
+
+    try:
+        summary["changes_pruned"] = prune_route_changes(int((start - ROUTE_CHANGES_RETENTION_SECONDS) * 1000))
+    except Exception as e:
+        print(f"⚠️ Route change log prune failed: {e}")
+
+    if not ROUTE_SNAPSHOT_BUCKET:
+        print("⚠️ ROUTE_SNAPSHOT_BUCKET not set, skipping route snapshot upload")
+        summary["uploaded"] = False
+        return summary
+
+    s3 = boto3.client("s3", region_name=ROUTE_SNAPSHOT_REGION)
+    s3.put_object(
+        Bucket=ROUTE_SNAPSHOT_BUCKET,
+        Key=ROUTE_SNAPSHOT_KEY,
+        Body=payload,
+        ContentType="application/json",
+        ContentEncoding="gzip",
+        Metadata={"snapshot-version": str(snapshot["version"])},
+    )
+
+    summary["uploaded"] = True
+    summary["duration_s"] = round(time.time() - start, 2)
+    print(
+        f"🗺️ Route snapshot v{summary['version']} published: "
+        f"{summary['hosts']} hosts, {summary['bytes']} bytes → s3://{ROUTE_SNAPSHOT_BUCKET}/{ROUTE_SNAPSHOT_KEY}"
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the routes table into a router snapshot")
+    parser.add_argument("--output", required=True, help="Path to write the gzipped snapshot to")
+    args = parser.parse_args()
+
+    snapshot = compile_route_snapshot()
+    payload = serialize_route_snapshot(snapshot)
+    with open(args.output, "wb") as f:
+        f.write(payload)
+    print(f"✅ Wrote route snapshot v{snapshot['version']}: {len(snapshot['hosts'])} hosts, {len(payload)} bytes")
+
+
+if __name__ == "__main__":
+    main()
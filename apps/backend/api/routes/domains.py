@@ -18,6 +18,8 @@ from api.db.dynamodb import (
     update_domain,
     delete_domain_item,
     list_project_domains,
+    put_service_route,
+    delete_route,
     CNAME_TARGET,
 )
 from api.services.domain_service import (
@@ -64,7 +66,7 @@ async def add_domain(
     The user needs to add a single CNAME record — no separate SSL step needed.
     """
     # Auth: resolve service (project_id may be a service_id)
-    service = _resolve_domain_service(org_id, project_id)
+    _resolve_domain_service(org_id, project_id)
 
     domain = request.domain.lower().strip()
 
@@ -79,12 +81,11 @@ async def add_domain(
             raise HTTPException(status_code=409, detail="Domain already added to this project")
         raise HTTPException(status_code=409, detail="Domain is already in use by another project")
 
-    # Create domain item — store service_id so deployment propagation works
+    # Create domain item — store service_id so route sync on deploy/delete finds it
     domain_item = add_custom_domain(
         org_id=org_id,
         project_id=project_id,
         domain=domain,
-        function_url=service.get("function_url"),
     )
 
     # Build DNS instructions
@@ -179,7 +180,6 @@ async def verify_domain(
         update_domain(domain, {
             "status": "PROVISIONING",
             "tenant_id": tenant_result["tenant_id"],
-            "function_url": service.get("function_url"),
         })
         tenant_id = tenant_result["tenant_id"]
 
@@ -189,10 +189,8 @@ async def verify_domain(
     setup_result = complete_domain_setup(tenant_id, domain)
 
     if setup_result["success"] and setup_result["domain_status"] == "active":
-        update_domain(domain, {
-            "status": "ACTIVE",
-            "function_url": service.get("function_url"),
-        })
+        update_domain(domain, {"status": "ACTIVE"})
+        put_service_route(domain, service, host_kind="custom_domain")
         return {
             "domain": domain,
             "dns_verified": True,
@@ -274,10 +272,8 @@ async def check_domain_status(
         setup_result = complete_domain_setup(tenant_id, domain)
 
         if setup_result["success"] and setup_result["domain_status"] == "active":
-            update_domain(domain, {
-                "status": "ACTIVE",
-                "function_url": service.get("function_url"),
-            })
+            update_domain(domain, {"status": "ACTIVE"})
+            put_service_route(domain, service, host_kind="custom_domain")
             return {
                 "domain": domain,
                 "status": "ACTIVE",
@@ -363,7 +359,8 @@ async def remove_domain(
     if tenant_id:
         delete_domain_tenant(tenant_id)
 
-    # Delete DynamoDB item
+    # Stop routing before removing the domain item
+    delete_route(domain)
     delete_domain_item(domain)
 
     return {
@@ -3,10 +3,13 @@ Projects API routes - CRUD operations for projects and services.
 """
 import os
 import json
+import time
+import asyncio
 import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import boto3
 from fastapi import APIRouter, Depends, HTTPException, Query
@@ -19,7 +22,6 @@ from api.db.dynamodb import (
     create_project,
     get_project,
     get_project_by_key,
-    list_projects,
     update_project,
     delete_project,
     create_service,
@@ -27,20 +29,44 @@ from api.db.dynamodb import (
     get_service_by_key,
     list_services,
     update_service,
+    update_service_by_key,
     delete_service,
     get_project_with_services,
     create_deployment,
-    list_deployments,
+    generate_deploy_id,
+    get_deployment,
+    get_deployment_consistent,
+    list_deployments_page,
+    list_deployments_started_between,
     update_deployment,
+    checkpoint_deployment_step,
+    claim_deployment_stage,
+    DEPLOY_STAGE_AWAITING_BUILD,
+    DEPLOY_STAGE_POST_BUILD,
+    DEPLOY_STAGE_DONE,
+    sync_service_routes,
+    load_org_snapshot,
 )
 
 # Import from deployer package
-from deployer import deploy_project, delete_project_resources, extract_project_name
+from deployer import deploy_project, start_project_build, deploy_built_project, delete_project_resources, extract_project_name
 from deployer import provision_database, delete_database_resources
-from deployer import deploy_ecs_project, delete_ecs_resources
+from deployer import deploy_ecs_project, start_ecs_build, deploy_built_ecs_project, delete_ecs_resources
 from deployer.aws import (
     get_lambda_logs,
     get_ecs_logs,
+    parse_build_state_event,
+    build_state_change_event,
+    emit_build_event_when_done,
+)
+from deployer.aws.codebuild import BUILD_TERMINAL_STATUSES, get_build_status
+from deployer.steps import (
+    DeploySteps,
+    DEPLOY_STEPS,
+    STEP_ECR_REPOSITORY,
+    STEP_START_BUILD,
+    STEP_BUILD,
+    complete_build,
 )
 from api.services.secrets import put_env_vars, get_env_vars_for_service
 from deployer.aws.rds import get_cluster_secret, get_cluster_security_group_ids, get_security_group_rules, modify_aurora_cluster_scaling, _normalize_serverless_v2_capacity
@@ -62,6 +88,37 @@ router = APIRouter(prefix="/api/projects", tags=["projects"])
 
 AUTUMN_BASE_URL = os.environ.get("AUTUMN_BASE_URL", "https://api.useautumn.com/v1").rstrip("/")
 
+# Per-service reads for GET /{project_id} (deployments, domains, env vars)
+# run concurrently on a bounded pool per request with an overall deadline.
+# Each request gets its own pool, so reads stuck past one request's deadline
+# can't starve the next requests.
+DETAIL_FETCH_CONCURRENCY = int(os.environ.get("DETAIL_FETCH_CONCURRENCY", "16"))
+DETAIL_FETCH_DEADLINE_SECONDS = float(os.environ.get("DETAIL_FETCH_DEADLINE_SECONDS", "8"))
+
+# Recent deployments embedded per service in GET /{project_id};
+# older history is paged through GET /{project_id}/deployments
+DETAIL_DEPLOYMENTS_LIMIT = int(os.environ.get("DETAIL_DEPLOYMENTS_LIMIT", "10"))
+
+# Event-driven builds: the deploy worker starts the CodeBuild build and
+# returns instead of polling it; the build's state-change event (EventBridge
+# rule → /events, see schedule_build_events.sh) runs the post-build stage.
+# Off by default until the rule exists in the account.
+EVENT_DRIVEN_BUILDS = os.environ.get("EVENT_DRIVEN_BUILDS", "false").lower() in ("true", "1", "yes")
+
+# Build-only variables that route a build's state-change event back to its deployment
+BUILD_ENV_SERVICE_ID = "SHORLABS_SERVICE_ID"
+BUILD_ENV_DEPLOY_ID = "SHORLABS_DEPLOY_ID"
+# The record's sort key, so the event handler reads it by primary key
+BUILD_ENV_DEPLOY_SK = "SHORLABS_DEPLOY_SK"
+
+# A deployment still AWAITING_BUILD this long after it started lost its
+# build event (the rule's retries and DLQ were exhausted, or the worker died
+# before starting the build). CodeBuild's default build timeout is 60
+# minutes, so by then the build is terminal; sweep_stuck_deployments
+# re-polls it, or fails the deployment if no build was started.
+STUCK_DEPLOYMENT_AFTER_SECONDS = int(os.environ.get("STUCK_DEPLOYMENT_AFTER_SECONDS", "4500"))
+STUCK_DEPLOYMENT_LOOKBACK_HOURS = int(os.environ.get("STUCK_DEPLOYMENT_LOOKBACK_HOURS", "24"))
+
 
 
 
@@ -150,6 +207,186 @@ class ProjectResponse(BaseModel):
 # ─────────────────────────────────────────────────────────────
 
 
+def _service_updater(
+    service_id: str,
+    org_id: Optional[str] = None,
+    parent_project_id: Optional[str] = None,
+    service: Optional[dict] = None,
+):
+    """
+    Return update(updates) bound to the service's primary key.
+
+    Deploy workers update the service on every phase change; with the keys
+    known up front each update is a single UpdateItem. Messages queued before
+    parent_project_id was added resolve the key once here instead of on
+    every update.
+    """
+    if not (org_id and parent_project_id):
+        service = service or get_service(service_id)
+        if not service:
+            return lambda updates: update_service(service_id, updates)
+        org_id = service["organization_id"]
+        parent_project_id = service["project_id"]
+
+    def update(updates: dict) -> Optional[dict]:
+        return update_service_by_key(org_id, parent_project_id, service_id, updates)
+
+    return update
+
+
+def _finish_deployment_record(service_id: str, deployment: Optional[dict], status: str) -> None:
+    """Mark a deployment record SUCCEEDED/FAILED (and DONE, if event-driven)."""
+    if not deployment:
+        return
+    updates = {
+        "status": status,
+        "finished_at": datetime.utcnow().isoformat(),
+    }
+    if deployment.get("stage"):
+        updates["stage"] = DEPLOY_STAGE_DONE
+    update_deployment(service_id, deployment["deploy_id"], updates, sk=deployment["SK"])
+
+
+def _complete_lambda_deployment(service_id: str, deployment: Optional[dict], set_service, result: dict) -> None:
+    """Post-deploy bookkeeping for a Lambda service once its function is updated."""
+    function_url = result["function_url"]
+    function_name = result.get("function_name")  # Get the actual Lambda function name
+
+    # Update deployment as successful
+    _finish_deployment_record(service_id, deployment, "SUCCEEDED")
+
+    # Update service as complete, including the function_name for usage tracking
+    live_service = set_service({
+        "status": "LIVE",
+        "function_url": function_url,
+        "function_name": function_name,  # Store for usage aggregation
+    })
+
+    # Point the subdomain and ACTIVE custom domains at the new function URL
+    # Lambda@Edge reads origins from the routes table, so it must stay in sync
+    try:
+        if live_service:
+            routes = sync_service_routes(live_service)
+            print(f"  ↳ Updated {len(routes)} route(s) to {function_url}")
+    except Exception as route_err:
+        print(f"⚠️ Failed to update routes: {route_err}")
+
+    # If the org is throttled, immediately throttle this new function too
+    if live_service:
+        org_id = live_service.get("organization_id")
+
+        # Post-deploy warming: pre-warm the new Lambda (paid plans only)
+        if org_id:
+            try:
+                from api.lambda_warmer import warm_single_function
+                warm_single_function(function_url, org_id=org_id, count=3)
+            except Exception as warm_err:
+                print(f"⚠️ Post-deploy warming failed (non-fatal): {warm_err}")
+
+        if org_id:
+            from api.db.dynamodb import get_throttle_state, put_warm_target
+            from deployer.aws.lambda_service import get_lambda_function_name
+            full_fn = get_lambda_function_name(function_name) if function_name else None
+            throttle_state = get_throttle_state(org_id)
+            is_throttled = bool(throttle_state and throttle_state.get("is_throttled"))
+            if is_throttled:
+                try:
+                    if full_fn:
+                        boto3.client("lambda").put_function_concurrency(
+                            FunctionName=full_fn,
+                            ReservedConcurrentExecutions=0,
+                        )
+                        print(f"🚫 New deploy throttled: {full_fn} (org {org_id} is throttled)")
+                except Exception as throttle_err:
+                    print(f"⚠️ Failed to throttle new deploy: {throttle_err}")
+
+            # Keep the warmer's target set current (it no longer scans services)
+            try:
+                from api.lambda_warmer import _is_paid_org
+                put_warm_target(
+                    live_service,
+                    function_name=full_fn,
+                    is_paid=_is_paid_org(org_id),
+                    is_throttled=is_throttled,
+                )
+            except Exception as warm_target_err:
+                print(f"⚠️ Failed to update warm target: {warm_target_err}")
+
+    print(f"✅ Deployment complete: {function_url}")
+
+
+def _fail_lambda_deployment(service_id: str, deployment: Optional[dict], set_service, error: Exception) -> None:
+    """Mark the deployment and the service FAILED."""
+    # Update deployment as failed if it was created
+    _finish_deployment_record(service_id, deployment, "FAILED")
+    set_service({"status": "FAILED"})
+    print(f"❌ Deployment failed: {error}")
+    traceback.print_exc()
+
+
+def _await_build_event(build_id: str, build_env: dict) -> None:
+    """
+    Leave the deploy parked until its CodeBuild state-change event arrives.
+
+    On AWS the EventBridge rule delivers it to /events; locally a watcher
+    thread stands in for the rule and calls the same handler.
+    """
+    if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+        print(f"⏸️ Build {build_id} running; deploy resumes on its state-change event")
+        return
+    emit_build_event_when_done(build_id, build_env, handle_build_state_change)
+    print(f"⏸️ Local: watching build {build_id}; deploy resumes on its state-change event")
+
+
+def _open_deployment(
+    service_id: str,
+    deploy_id: str,
+    commit_info: dict,
+    resume: Optional[dict] = None,
+) -> Optional[dict]:
+    """
+    The deployment record for this deploy message.
+
+    Created on first delivery; on redelivery (the worker timed out or
+    crashed) the existing record is returned with its step checkpoints, so
+    the deploy resumes instead of starting over.
+
+    Returns:
+        The record, or None if the deployment already finished
+    """
+    deployment = get_deployment(service_id, deploy_id)
+    if deployment:
+        if deployment.get("status") != "IN_PROGRESS":
+            print(f"⏭️ Deployment {deploy_id} already {deployment.get('status')}, nothing to resume")
+            return None
+        done = [step for step in DEPLOY_STEPS if step in (deployment.get("steps") or {})]
+        print(f"🔁 Resuming deployment {deploy_id}; completed steps: {', '.join(done) or 'none'}")
+        return deployment
+
+    deployment = create_deployment(service_id, None, **commit_info, deploy_id=deploy_id, resume=resume)
+    print(f"📝 Deployment record created: {deploy_id}")
+    return deployment
+
+
+def _step_checkpointer(service_id: str, deployment: dict):
+    """Return on_checkpoint(step, outputs, duration_ms) persisting steps on the deployment record."""
+    def on_checkpoint(step: str, outputs: dict, duration_ms: int) -> None:
+        updates = None
+        if step == STEP_START_BUILD:
+            # The build id is also top-level: build logs are looked up by it.
+            # build_started_at - started_at is the time-to-build-start.
+            updates = {"build_id": outputs["build_id"], "build_started_at": datetime.utcnow().isoformat()}
+        elif step == STEP_BUILD and outputs.get("build_cache"):
+            # Top-level too, so cache hit rates can be compared across deploys
+            updates = {"build_cache": outputs["build_cache"]}
+        checkpoint_deployment_step(
+            service_id, deployment["SK"], step, outputs, duration_ms=duration_ms, updates=updates
+        )
+        print(f"💾 Checkpoint {deployment['deploy_id']}: {step} ({duration_ms} ms) {outputs or ''}")
+
+    return on_checkpoint
+
+
 def _run_deployment_sync(
     service_id: str,
     github_url: str,
@@ -166,31 +403,53 @@ def _run_deployment_sync(
     commit_author_username: Optional[str] = None,
     branch: Optional[str] = None,
     org_id: Optional[str] = None,
+    parent_project_id: Optional[str] = None,
+    deploy_id: Optional[str] = None,
 ):
-    """Synchronous deployment function - runs in thread pool using new deployer."""
-    from datetime import datetime
+    """
+    Synchronous deployment function - runs in thread pool using new deployer.
 
+    Each deploy step is checkpointed on the deployment record; a redelivered
+    message (same deploy_id) resumes after the last completed step. With
+    EVENT_DRIVEN_BUILDS this only runs the pre-build stage and returns once
+    the build is started; handle_build_state_change finishes the deploy.
+    """
     deployment = None
-    build_id_holder = [None]  # Use list to allow mutation in nested function
-
-    def on_build_start(build_id: str):
-        """Callback called when build starts - creates deployment record immediately."""
-        nonlocal deployment
-        build_id_holder[0] = build_id
-        deployment = create_deployment(
-            service_id, build_id,
-            commit_sha=commit_sha,
-            commit_message=commit_message,
-            commit_author_name=commit_author_name,
-            commit_author_username=commit_author_username,
-            branch=branch,
-        )
-        print(f"📝 Deployment record created: {deployment['deploy_id']} (build: {build_id})")
+    set_service = _service_updater(service_id, org_id, parent_project_id)
+    # Messages queued before deploy ids were assigned at enqueue get a fresh one.
+    # It is also passed into the build so its state-change event finds this record.
+    deploy_id = deploy_id or generate_deploy_id()
+    build_env = {BUILD_ENV_SERVICE_ID: service_id, BUILD_ENV_DEPLOY_ID: deploy_id}
 
     def on_status_change(status: str):
-        update_service(service_id, {"status": status})
+        set_service({"status": status})
 
     try:
+        # Settings the post-build stage needs when it runs from the build event;
+        # env vars are re-read from the service there (they may be secrets)
+        resume = None
+        if EVENT_DRIVEN_BUILDS:
+            resume = {
+                "target": "lambda",
+                "memory": memory,
+                "timeout": timeout,
+                "ephemeral_storage": ephemeral_storage,
+                "org_id": org_id,
+                "parent_project_id": parent_project_id,
+            }
+        deployment = _open_deployment(service_id, deploy_id, {
+            "commit_sha": commit_sha,
+            "commit_message": commit_message,
+            "commit_author_name": commit_author_name,
+            "commit_author_username": commit_author_username,
+            "branch": branch,
+        }, resume=resume)
+        if not deployment:
+            return
+        build_env[BUILD_ENV_DEPLOY_SK] = deployment["SK"]
+        checkpoints = deployment.get("steps") or {}
+        on_checkpoint = _step_checkpointer(service_id, deployment)
+
         # Determine CodeBuild compute type based on org plan:
         #   Hobby/Free → BUILD_GENERAL1_SMALL
         #   Paid (Pro/Plus) → BUILD_GENERAL1_LARGE
@@ -203,6 +462,25 @@ def _run_deployment_sync(
             else:
                 print(f"⚡ Paid plan detected — using {codebuild_compute_type} compute")
 
+        if deployment.get("stage"):
+            build_started = STEP_START_BUILD in checkpoints
+            build = start_project_build(
+                github_url=github_url,
+                github_token=github_token,
+                root_directory=root_directory,
+                start_command=start_command,
+                env_vars=env_vars,
+                on_status_change=on_status_change,
+                project_id=service_id,
+                codebuild_compute_type=codebuild_compute_type,
+                build_env=build_env,
+                steps=DeploySteps(checkpoints, on_checkpoint),
+            )
+            if not build_started:
+                on_status_change("BUILDING")
+                _await_build_event(build["build_id"], build_env)
+            return
+
         # Use the new deploy_project from deployer with callback
         # Pass project_id to ensure unique Lambda function per deployment
         result = deploy_project(
@@ -214,86 +492,175 @@ def _run_deployment_sync(
             memory=memory,
             timeout=timeout,
             ephemeral_storage=ephemeral_storage,
-            on_build_start=on_build_start,
             on_status_change=on_status_change,
             project_id=service_id,
             codebuild_compute_type=codebuild_compute_type,
+            build_env=build_env,
+            checkpoints=checkpoints,
+            on_checkpoint=on_checkpoint,
         )
-        
-        function_url = result["function_url"]
-        function_name = result.get("function_name")  # Get the actual Lambda function name
-        
-        # Update deployment as successful
-        if deployment:
-            update_deployment(service_id, deployment["deploy_id"], {
-                "status": "SUCCEEDED",
-                "finished_at": datetime.utcnow().isoformat(),
-            })
-        
-        # Update service as complete, including the function_name for usage tracking
-        update_service(service_id, {
-            "status": "LIVE",
-            "function_url": function_url,
-            "function_name": function_name,  # Store for usage aggregation
-        })
+        _complete_lambda_deployment(service_id, deployment, set_service, result)
 
-        # Propagate new function_url to all custom domain items
-        # Lambda@Edge reads function_url from DOMAIN items, so they must stay in sync
-        try:
-            from api.db.dynamodb import list_project_domains, update_domain
-            custom_domains = list_project_domains(service_id)
-            for domain_item in custom_domains:
-                if domain_item.get("status") in ("ACTIVE", "PROVISIONING"):
-                    update_domain(domain_item["domain"], {
-                        "function_url": function_url,
-                    })
-                    print(f"  ↳ Updated domain {domain_item['domain']} function_url")
-        except Exception as domain_err:
-            print(f"⚠️ Failed to propagate function_url to domains: {domain_err}")
-
-        # If the org is throttled, immediately throttle this new function too
-        service_data = get_service(service_id)
-        if service_data:
-            org_id = service_data.get("organization_id")
-
-            # Post-deploy warming: pre-warm the new Lambda (paid plans only)
-            if org_id:
-                try:
-                    from api.lambda_warmer import warm_single_function
-                    warm_single_function(function_url, org_id=org_id, count=3)
-                except Exception as warm_err:
-                    print(f"⚠️ Post-deploy warming failed (non-fatal): {warm_err}")
-
-            if org_id:
-                from api.db.dynamodb import get_throttle_state
-                throttle_state = get_throttle_state(org_id)
-                if throttle_state and throttle_state.get("is_throttled"):
-                    try:
-                        from deployer.aws.lambda_service import get_lambda_function_name
-                        full_fn = get_lambda_function_name(function_name) if function_name else None
-                        if full_fn:
-                            boto3.client("lambda").put_function_concurrency(
-                                FunctionName=full_fn,
-                                ReservedConcurrentExecutions=0,
-                            )
-                            print(f"🚫 New deploy throttled: {full_fn} (org {org_id} is throttled)")
-                    except Exception as throttle_err:
-                        print(f"⚠️ Failed to throttle new deploy: {throttle_err}")
-
-        print(f"✅ Deployment complete: {function_url}")
+    except Exception as e:
+        _fail_lambda_deployment(service_id, deployment, set_service, e)
+
+
+def _resume_lambda_deployment(service_id: str, deployment: dict, build_status: str) -> None:
+    """Post-build stage of an event-driven Lambda deployment."""
+    resume = deployment["resume"]
+    svc = get_service(service_id)
+    set_service = _service_updater(service_id, resume.get("org_id"), resume.get("parent_project_id"), service=svc)
+    steps = DeploySteps(deployment.get("steps"), _step_checkpointer(service_id, deployment))
+    started = steps.outputs[STEP_START_BUILD]
+    ecr_repo_uri = steps.outputs[STEP_ECR_REPOSITORY]["ecr_repo_uri"]
+
+    try:
+        if not svc:
+            raise Exception("Service was deleted while building")
+        complete_build(steps, started["build_id"], ecr_repo_uri, build_status=build_status)
+
+        result = deploy_built_project(
+            function_name=started["function_name"],
+            ecr_repo_uri=ecr_repo_uri,
+            env_vars=get_env_vars_for_service(svc),
+            memory=int(resume["memory"]),
+            timeout=int(resume["timeout"]),
+            ephemeral_storage=int(resume["ephemeral_storage"]),
+            on_status_change=lambda status: set_service({"status": status}),
+            steps=steps,
+        )
+        _complete_lambda_deployment(service_id, deployment, set_service, result)
 
     except Exception as e:
-        # Update deployment as failed if it was created
-        if deployment:
-            update_deployment(service_id, deployment["deploy_id"], {
-                "status": "FAILED",
-                "finished_at": datetime.utcnow().isoformat(),
-            })
-        
-        update_service(service_id, {"status": "FAILED"})
-        print(f"❌ Deployment failed: {e}")
-        import traceback
-        traceback.print_exc()
+        if not svc:
+            _finish_deployment_record(service_id, deployment, "FAILED")
+            print(f"❌ Deployment failed: {e}")
+            return
+        _fail_lambda_deployment(service_id, deployment, set_service, e)
+
+
+def handle_build_state_change(event: dict) -> dict:
+    """
+    Post-build entry point: resume a deployment from its CodeBuild state-change event.
+
+    The build carries SHORLABS_SERVICE_ID / SHORLABS_DEPLOY_ID in its
+    environment (and SHORLABS_DEPLOY_SK, the record's sort key, so the record
+    is read by primary key with a consistent read); the deployment record
+    waiting at AWAITING_BUILD holds the deploy settings and the pre-build
+    step checkpoints. The stage claim makes redelivered events no-ops.
+    Raises if the record is missing or the build is not checkpointed yet,
+    so the event is retried.
+    """
+    build = parse_build_state_event(event)
+    if not build:
+        print("⚠️ Ignoring event: not a CodeBuild state change for our project")
+        return {"status": "ignored", "reason": "not_a_build_event"}
+
+    build_id, status = build["build_id"], build["status"]
+    if status not in BUILD_TERMINAL_STATUSES:
+        return {"status": "ignored", "reason": f"build_{str(status).lower()}"}
+
+    service_id = build["env"].get(BUILD_ENV_SERVICE_ID)
+    deploy_id = build["env"].get(BUILD_ENV_DEPLOY_ID)
+    if not (service_id and deploy_id):
+        print(f"⚠️ Ignoring build {build_id}: no deployment in its environment")
+        return {"status": "ignored", "reason": "untracked_build"}
+
+    print(f"🏁 Build {build_id} {status} (service {service_id}, deploy {deploy_id})")
+    deployment = get_deployment_consistent(service_id, deploy_id, sk=build["env"].get(BUILD_ENV_DEPLOY_SK))
+    if not deployment:
+        raise LookupError(f"Deployment {deploy_id} for service {service_id} not found")
+    if STEP_START_BUILD not in (deployment.get("steps") or {}):
+        raise LookupError(f"Deployment {deploy_id} has not checkpointed its build yet")
+
+    deployment = claim_deployment_stage(
+        service_id, deployment["SK"], DEPLOY_STAGE_AWAITING_BUILD, DEPLOY_STAGE_POST_BUILD,
+    )
+    if not deployment:
+        print(f"⏭️ Deployment {deploy_id} already resumed (or not event-driven), skipping")
+        return {"status": "ignored", "reason": "already_claimed"}
+
+    if deployment["resume"].get("target") == "ecs":
+        _resume_ecs_deployment(service_id, deployment, status)
+    else:
+        _resume_lambda_deployment(service_id, deployment, status)
+    return {"status": "ok", "deploy_id": deploy_id, "build_status": status}
+
+
+def _fail_stuck_deployment(service_id: str, deployment: dict, reason: str) -> bool:
+    """Fail an AWAITING_BUILD deployment that has no build to wait for. Returns whether it was claimed."""
+    deployment = claim_deployment_stage(
+        service_id, deployment["SK"], DEPLOY_STAGE_AWAITING_BUILD, DEPLOY_STAGE_POST_BUILD,
+    )
+    if not deployment:
+        return False
+    _finish_deployment_record(service_id, deployment, "FAILED")
+
+    # Only the newest deployment decides the service status; an older stuck
+    # one must not flip a service that has since been redeployed
+    latest = list_deployments_page(service_id, limit=1)["deployments"]
+    if latest and latest[0]["SK"] == deployment["SK"]:
+        resume = deployment.get("resume") or {}
+        _service_updater(service_id, resume.get("org_id"), resume.get("parent_project_id"))({"status": "FAILED"})
+    print(f"❌ Deployment {deployment['deploy_id']} failed by sweeper: {reason}")
+    return True
+
+
+def sweep_stuck_deployments() -> dict:
+    """
+    Resume or fail event-driven deployments whose build event never arrived.
+
+    Runs on a schedule (action "sweep_deployments", see
+    schedule_build_events.sh). Candidates are deployments started within
+    the last STUCK_DEPLOYMENT_LOOKBACK_HOURS but more than
+    STUCK_DEPLOYMENT_AFTER_SECONDS ago and still IN_PROGRESS; each is
+    re-read consistently and, if still AWAITING_BUILD, its build is polled:
+    a terminal build is replayed through handle_build_state_change, a
+    deployment that never started its build is failed.
+    """
+    now = datetime.utcnow()
+    candidates = list_deployments_started_between(
+        now - timedelta(hours=STUCK_DEPLOYMENT_LOOKBACK_HOURS),
+        now - timedelta(seconds=STUCK_DEPLOYMENT_AFTER_SECONDS),
+    )
+    stats = {"checked": 0, "resumed": 0, "failed": 0, "running": 0}
+
+    for candidate in candidates:
+        if candidate.get("status") != "IN_PROGRESS":
+            continue
+        service_id = candidate["project_id"]
+        deployment = get_deployment_consistent(service_id, candidate["deploy_id"], sk=candidate["SK"])
+        if not deployment or deployment.get("stage") != DEPLOY_STAGE_AWAITING_BUILD:
+            continue
+        stats["checked"] += 1
+
+        try:
+            started = (deployment.get("steps") or {}).get(STEP_START_BUILD)
+            if not started:
+                if _fail_stuck_deployment(service_id, deployment, "build was never started"):
+                    stats["failed"] += 1
+                continue
+
+            build_id = started["build_id"]
+            status = get_build_status(build_id)["status"]
+            if status not in BUILD_TERMINAL_STATUSES:
+                print(f"⏳ Deployment {deployment['deploy_id']}: build {build_id} still {status}")
+                stats["running"] += 1
+                continue
+
+            print(f"🧹 Replaying lost build event: {build_id} {status} (deploy {deployment['deploy_id']})")
+            result = handle_build_state_change(build_state_change_event(build_id, status, {
+                BUILD_ENV_SERVICE_ID: service_id,
+                BUILD_ENV_DEPLOY_ID: deployment["deploy_id"],
+                BUILD_ENV_DEPLOY_SK: deployment["SK"],
+            }))
+            if result.get("status") == "ok":
+                stats["resumed"] += 1
+        except Exception as e:
+            print(f"⚠️ Sweeper could not settle deployment {deployment['deploy_id']}: {e}")
+
+    print(f"🧹 Deployment sweep: {stats}")
+    return stats
 
 
 def send_deployment_to_sqs(
@@ -312,6 +679,7 @@ def send_deployment_to_sqs(
     commit_author_username: Optional[str] = None,
     branch: Optional[str] = None,
     org_id: Optional[str] = None,
+    parent_project_id: Optional[str] = None,
     # Legacy compat: callers may still pass project_id= keyword
     project_id: Optional[str] = None,
 ):
@@ -330,6 +698,8 @@ def send_deployment_to_sqs(
     sid = service_id or project_id
     if not sid:
         raise ValueError("service_id is required")
+    # Assigned here so a redelivered message resumes the same deployment
+    deploy_id = generate_deploy_id()
 
     # Check if running on Lambda
     if not os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
@@ -341,7 +711,8 @@ def send_deployment_to_sqs(
                 commit_sha=commit_sha, commit_message=commit_message,
                 commit_author_name=commit_author_name,
                 commit_author_username=commit_author_username, branch=branch,
-                org_id=org_id,
+                org_id=org_id, parent_project_id=parent_project_id,
+                deploy_id=deploy_id,
             )
         thread = threading.Thread(target=run_in_thread)
         thread.start()
@@ -362,7 +733,8 @@ def send_deployment_to_sqs(
                 commit_sha=commit_sha, commit_message=commit_message,
                 commit_author_name=commit_author_name,
                 commit_author_username=commit_author_username, branch=branch,
-                org_id=org_id,
+                org_id=org_id, parent_project_id=parent_project_id,
+                deploy_id=deploy_id,
             )
         thread = threading.Thread(target=run_in_thread)
         thread.start()
@@ -384,6 +756,8 @@ def send_deployment_to_sqs(
         "commit_author_username": commit_author_username,
         "branch": branch,
         "org_id": org_id,
+        "parent_project_id": parent_project_id,
+        "deploy_id": deploy_id,
     }
     
     response = sqs_client.send_message(
@@ -563,6 +937,60 @@ def send_database_delete_to_sqs(service_id: str):
 # ─────────────────────────────────────────────────────────────
 
 
+def _complete_ecs_deployment(service_id: str, deployment: Optional[dict], set_service, result: dict) -> None:
+    """Post-deploy bookkeeping for an ECS service once its tasks are stable."""
+    _finish_deployment_record(service_id, deployment, "SUCCEEDED")
+
+    live_service = set_service({
+        "status": "LIVE",
+        "service_url": result["service_url"],
+        "alb_dns_name": result.get("alb_dns_name"),
+        "function_name": result.get("function_name"),
+        "ecs_service_name": result.get("ecs_service_name"),
+        "task_definition_arn": result.get("task_definition_arn"),
+        "target_group_arn": result.get("target_group_arn"),
+        "listener_rule_arn": result.get("listener_rule_arn"),
+    })
+
+    # Point the subdomain and ACTIVE custom domains at the ALB
+    try:
+        if live_service:
+            routes = sync_service_routes(live_service)
+            print(f"  ↳ Updated {len(routes)} route(s) to {result.get('alb_dns_name')}")
+    except Exception as route_err:
+        print(f"⚠️ Failed to update routes: {route_err}")
+
+    print(f"✅ ECS deployment complete: {result['service_url']}")
+
+
+def _fail_ecs_deployment(
+    service_id: str,
+    deployment: Optional[dict],
+    set_service,
+    error: Exception,
+    function_name: str,
+    github_url: str,
+    org_id: Optional[str],
+) -> None:
+    """Mark the deployment and the service FAILED and clean up partial ECS resources."""
+    _finish_deployment_record(service_id, deployment, "FAILED")
+    set_service({"status": "FAILED"})
+    print(f"❌ ECS deployment failed: {error}")
+    traceback.print_exc()
+
+    # Best-effort cleanup of partially created AWS resources to prevent
+    # orphaned EC2 instances, ASGs, target groups, etc. from billing.
+    print("🧹 Cleaning up orphaned resources from failed deployment...")
+    try:
+        delete_ecs_resources(
+            github_url=github_url,
+            function_name=function_name,
+            org_id=org_id,
+        )
+    except Exception as cleanup_err:
+        print(f"⚠️ Cleanup failed (manual intervention may be needed): {cleanup_err}")
+
+
 def _run_ecs_deployment_sync(
     service_id: str,
     github_url: str,
@@ -579,28 +1007,24 @@ def _run_ecs_deployment_sync(
     branch: Optional[str] = None,
     org_id: Optional[str] = None,
     instance_type: Optional[str] = None,
+    parent_project_id: Optional[str] = None,
+    deploy_id: Optional[str] = None,
 ):
-    """Synchronous ECS deployment function - runs in thread pool or via SQS."""
-    from datetime import datetime
+    """
+    Synchronous ECS deployment function - runs in thread pool or via SQS.
 
+    Checkpointed and resumable like _run_deployment_sync; with
+    EVENT_DRIVEN_BUILDS this only runs the pre-build stage.
+    """
     deployment = None
-    build_id_holder = [None]
-
-    def on_build_start(build_id: str):
-        nonlocal deployment
-        build_id_holder[0] = build_id
-        deployment = create_deployment(
-            service_id, build_id,
-            commit_sha=commit_sha,
-            commit_message=commit_message,
-            commit_author_name=commit_author_name,
-            commit_author_username=commit_author_username,
-            branch=branch,
-        )
-        print(f"📝 ECS deployment record created: {deployment['deploy_id']} (build: {build_id})")
+    # The subdomain lives on the service record, so the key comes along with it
+    svc = get_service(service_id)
+    set_service = _service_updater(service_id, org_id, parent_project_id, service=svc)
+    deploy_id = deploy_id or generate_deploy_id()
+    build_env = {BUILD_ENV_SERVICE_ID: service_id, BUILD_ENV_DEPLOY_ID: deploy_id}
 
     def on_status_change(status: str):
-        update_service(service_id, {"status": status})
+        set_service({"status": status})
 
     try:
         codebuild_compute_type = "BUILD_GENERAL1_LARGE"
@@ -609,10 +1033,54 @@ def _run_ecs_deployment_sync(
             if not _is_paid_org(org_id):
                 codebuild_compute_type = "BUILD_GENERAL1_SMALL"
 
-        # Get subdomain from the service record
-        svc = get_service(service_id)
         subdomain = svc.get("subdomain") if svc else None
 
+        resume = None
+        if EVENT_DRIVEN_BUILDS:
+            if not org_id:
+                raise ValueError("org_id is required for ECS EC2 deployment")
+            resume = {
+                "target": "ecs",
+                "github_url": github_url,
+                "cpu": cpu,
+                "memory": memory,
+                "instance_type": instance_type,
+                "subdomain": subdomain,
+                "org_id": org_id,
+                "parent_project_id": parent_project_id,
+            }
+        deployment = _open_deployment(service_id, deploy_id, {
+            "commit_sha": commit_sha,
+            "commit_message": commit_message,
+            "commit_author_name": commit_author_name,
+            "commit_author_username": commit_author_username,
+            "branch": branch,
+        }, resume=resume)
+        if not deployment:
+            return
+        build_env[BUILD_ENV_DEPLOY_SK] = deployment["SK"]
+        checkpoints = deployment.get("steps") or {}
+        on_checkpoint = _step_checkpointer(service_id, deployment)
+
+        if deployment.get("stage"):
+            build_started = STEP_START_BUILD in checkpoints
+            build = start_ecs_build(
+                github_url=github_url,
+                github_token=github_token,
+                root_directory=root_directory,
+                start_command=start_command,
+                env_vars=env_vars,
+                on_status_change=on_status_change,
+                project_id=service_id,
+                codebuild_compute_type=codebuild_compute_type,
+                build_env=build_env,
+                steps=DeploySteps(checkpoints, on_checkpoint),
+            )
+            if not build_started:
+                on_status_change("BUILDING")
+                _await_build_event(build["build_id"], build_env)
+            return
+
         result = deploy_ecs_project(
             github_url=github_url,
             github_token=github_token,
@@ -621,57 +1089,61 @@ def _run_ecs_deployment_sync(
             env_vars=env_vars,
             cpu=cpu,
             memory=memory,
-            on_build_start=on_build_start,
             on_status_change=on_status_change,
             project_id=service_id,
             codebuild_compute_type=codebuild_compute_type,
             subdomain=subdomain,
             org_id=org_id,
             instance_type=instance_type,
+            build_env=build_env,
+            checkpoints=checkpoints,
+            on_checkpoint=on_checkpoint,
         )
+        _complete_ecs_deployment(service_id, deployment, set_service, result)
 
-        if deployment:
-            update_deployment(service_id, deployment["deploy_id"], {
-                "status": "SUCCEEDED",
-                "finished_at": datetime.utcnow().isoformat(),
-            })
+    except Exception as e:
+        # Derive project_name the same way the orchestrator does
+        cleanup_function_name = f"{extract_project_name(github_url)}-{service_id[:8]}"
+        _fail_ecs_deployment(service_id, deployment, set_service, e, cleanup_function_name, github_url, org_id)
 
-        update_service(service_id, {
-            "status": "LIVE",
-            "service_url": result["service_url"],
-            "alb_dns_name": result.get("alb_dns_name"),
-            "function_name": result.get("function_name"),
-            "ecs_service_name": result.get("ecs_service_name"),
-            "task_definition_arn": result.get("task_definition_arn"),
-            "target_group_arn": result.get("target_group_arn"),
-            "listener_rule_arn": result.get("listener_rule_arn"),
-        })
 
-        print(f"✅ ECS deployment complete: {result['service_url']}")
+def _resume_ecs_deployment(service_id: str, deployment: dict, build_status: str) -> None:
+    """Post-build stage of an event-driven ECS deployment."""
+    resume = deployment["resume"]
+    svc = get_service(service_id)
+    set_service = _service_updater(service_id, resume.get("org_id"), resume.get("parent_project_id"), service=svc)
+    steps = DeploySteps(deployment.get("steps"), _step_checkpointer(service_id, deployment))
+    started = steps.outputs[STEP_START_BUILD]
+    ecr_repo_uri = steps.outputs[STEP_ECR_REPOSITORY]["ecr_repo_uri"]
 
-    except Exception as e:
-        if deployment:
-            update_deployment(service_id, deployment["deploy_id"], {
-                "status": "FAILED",
-                "finished_at": datetime.utcnow().isoformat(),
-            })
-        update_service(service_id, {"status": "FAILED"})
-        print(f"❌ ECS deployment failed: {e}")
-        traceback.print_exc()
+    try:
+        if not svc:
+            raise Exception("Service was deleted while building")
+        complete_build(steps, started["build_id"], ecr_repo_uri, build_status=build_status)
+
+        result = deploy_built_ecs_project(
+            function_name=started["function_name"],
+            ecr_repo_uri=ecr_repo_uri,
+            env_vars=get_env_vars_for_service(svc),
+            cpu=int(resume["cpu"]),
+            memory=int(resume["memory"]),
+            on_status_change=lambda status: set_service({"status": status}),
+            subdomain=resume.get("subdomain"),
+            org_id=resume["org_id"],
+            instance_type=resume.get("instance_type"),
+            steps=steps,
+        )
+        _complete_ecs_deployment(service_id, deployment, set_service, result)
 
-        # Best-effort cleanup of partially created AWS resources to prevent
-        # orphaned EC2 instances, ASGs, target groups, etc. from billing.
-        print("🧹 Cleaning up orphaned resources from failed deployment...")
-        try:
-            # Derive project_name the same way the orchestrator does
-            cleanup_function_name = f"{extract_project_name(github_url)}-{service_id[:8]}"
-            delete_ecs_resources(
-                github_url=github_url,
-                function_name=cleanup_function_name,
-                org_id=org_id,
-            )
-        except Exception as cleanup_err:
-            print(f"⚠️ Cleanup failed (manual intervention may be needed): {cleanup_err}")
+    except Exception as e:
+        if not svc:
+            _finish_deployment_record(service_id, deployment, "FAILED")
+            print(f"❌ ECS deployment failed: {e}")
+            return
+        _fail_ecs_deployment(
+            service_id, deployment, set_service, e,
+            started["function_name"], resume.get("github_url", ""), resume.get("org_id"),
+        )
 
 
 def send_ecs_deployment_to_sqs(
@@ -690,10 +1162,14 @@ def send_ecs_deployment_to_sqs(
     branch: Optional[str] = None,
     org_id: Optional[str] = None,
     instance_type: Optional[str] = None,
+    parent_project_id: Optional[str] = None,
 ):
     """Send ECS deployment task to SQS queue for background processing."""
     import time
 
+    # Assigned here so a redelivered message resumes the same deployment
+    deploy_id = generate_deploy_id()
+
     if not os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
         def run_in_thread():
             _run_ecs_deployment_sync(
@@ -703,6 +1179,7 @@ def send_ecs_deployment_to_sqs(
                 commit_author_name=commit_author_name,
                 commit_author_username=commit_author_username, branch=branch,
                 org_id=org_id, instance_type=instance_type,
+                parent_project_id=parent_project_id, deploy_id=deploy_id,
             )
         thread = threading.Thread(target=run_in_thread)
         thread.start()
@@ -720,6 +1197,7 @@ def send_ecs_deployment_to_sqs(
                 commit_author_name=commit_author_name,
                 commit_author_username=commit_author_username, branch=branch,
                 org_id=org_id, instance_type=instance_type,
+                parent_project_id=parent_project_id, deploy_id=deploy_id,
             )
         thread = threading.Thread(target=run_in_thread)
         thread.start()
@@ -742,6 +1220,8 @@ def send_ecs_deployment_to_sqs(
         "branch": branch,
         "org_id": org_id,
         "instance_type": instance_type,
+        "parent_project_id": parent_project_id,
+        "deploy_id": deploy_id,
     }
 
     response = sqs_client.send_message(
@@ -881,7 +1361,7 @@ async def create_new_project(
 
     if request.env_vars:
         arn = put_env_vars(request.organization_id, project["project_id"], service["service_id"], request.env_vars)
-        update_service(service["service_id"], {"secret_arn": arn})
+        update_service_by_key(request.organization_id, project["project_id"], service["service_id"], {"secret_arn": arn})
 
     # 3. Start deployment via SQS queue
     send_deployment_to_sqs(
@@ -896,6 +1376,7 @@ async def create_new_project(
         ephemeral_storage,
         **commit_info,
         org_id=request.organization_id,
+        parent_project_id=project["project_id"],
     )
     
     return {
@@ -1038,7 +1519,7 @@ async def create_web_service_project(
 
     if request.env_vars:
         arn = put_env_vars(request.organization_id, project["project_id"], service["service_id"], request.env_vars)
-        update_service(service["service_id"], {"secret_arn": arn})
+        update_service_by_key(request.organization_id, project["project_id"], service["service_id"], {"secret_arn": arn})
 
     # 3. Start ECS deployment via SQS
     send_ecs_deployment_to_sqs(
@@ -1052,6 +1533,7 @@ async def create_web_service_project(
         memory,
         **commit_info,
         org_id=request.organization_id,
+        parent_project_id=project["project_id"],
     )
 
     return {
@@ -1133,7 +1615,7 @@ async def add_service_to_project(
         )
         if request.env_vars:
             arn = put_env_vars(org_id, project_id, service["service_id"], request.env_vars)
-            update_service(service["service_id"], {"secret_arn": arn})
+            update_service_by_key(org_id, project_id, service["service_id"], {"secret_arn": arn})
         send_ecs_deployment_to_sqs(
             service["service_id"],
             github_url,
@@ -1145,6 +1627,7 @@ async def add_service_to_project(
             memory,
             **commit_info,
             org_id=org_id,
+            parent_project_id=project_id,
         )
     else:
         from api.routes.github import get_or_refresh_token, fetch_latest_commit
@@ -1173,7 +1656,7 @@ async def add_service_to_project(
         )
         if request.env_vars:
             arn = put_env_vars(org_id, project_id, service["service_id"], request.env_vars)
-            update_service(service["service_id"], {"secret_arn": arn})
+            update_service_by_key(org_id, project_id, service["service_id"], {"secret_arn": arn})
         send_deployment_to_sqs(
             service["service_id"],
             github_url,
@@ -1186,6 +1669,7 @@ async def add_service_to_project(
             request.ephemeral_storage or 512,
             **commit_info,
             org_id=org_id,
+            parent_project_id=project_id,
         )
 
     return {
@@ -1203,17 +1687,16 @@ async def get_projects(
     org_id: str = Query(...),
 ):
     """List all projects for the organization, each with its services."""
-    projects = list_projects(org_id)
-
-    # Check org-level throttle state (single lookup for all projects)
-    from api.db.dynamodb import get_throttle_state, list_project_domains
-    throttle_state = get_throttle_state(org_id)
+    # One snapshot of the org (projects, services, domains, throttle state)
+    # instead of a services query per project and a domains query per service
+    snapshot = load_org_snapshot(org_id)
+    throttle_state = snapshot["throttle_state"]
     is_throttled = bool(throttle_state and throttle_state.get("is_throttled"))
 
     result = []
-    for p in projects:
+    for p in snapshot["projects"]:
         pid = p["project_id"]
-        services = list_services(pid, org_id=org_id)
+        services = snapshot["services_by_project"].get(pid, [])
 
         services_summary = []
         for svc in services:
@@ -1224,14 +1707,18 @@ async def get_projects(
                 "status": svc["status"],
             }
             svc_type = svc.get("service_type", "web-app")
+            svc_domains = snapshot["domains_by_service"].get(svc["service_id"], [])
+            active_domain = next(
+                (d["domain"] for d in svc_domains if d.get("status") == "ACTIVE"),
+                None,
+            )
             if svc_type == "database":
-                pass  # handled below
+                svc_data.update({
+                    "db_endpoint": svc.get("db_endpoint"),
+                    "db_port": svc.get("db_port"),
+                    "db_name": svc.get("db_name"),
+                })
             elif svc_type == "web-service":
-                svc_domains = list_project_domains(svc["service_id"])
-                active_domain = next(
-                    (d["domain"] for d in svc_domains if d.get("status") == "ACTIVE"),
-                    None,
-                )
                 svc_data.update({
                     "subdomain": svc.get("subdomain"),
                     "custom_url": svc.get("custom_url"),
@@ -1240,11 +1727,6 @@ async def get_projects(
                     "github_repo": svc.get("github_repo"),
                 })
             else:
-                svc_domains = list_project_domains(svc["service_id"])
-                active_domain = next(
-                    (d["domain"] for d in svc_domains if d.get("status") == "ACTIVE"),
-                    None,
-                )
                 svc_data.update({
                     "subdomain": svc.get("subdomain"),
                     "custom_url": svc.get("custom_url"),
@@ -1252,12 +1734,6 @@ async def get_projects(
                     "active_custom_domain": active_domain,
                     "github_repo": svc.get("github_repo"),
                 })
-            if svc_type == "database":
-                svc_data.update({
-                    "db_endpoint": svc.get("db_endpoint"),
-                    "db_port": svc.get("db_port"),
-                    "db_name": svc.get("db_name"),
-                })
             services_summary.append(svc_data)
 
         project_data = {
@@ -1290,12 +1766,33 @@ async def get_project_details(
         raise HTTPException(status_code=404, detail="Project not found")
 
     from api.db.dynamodb import get_throttle_state, list_project_domains
-    throttle_state = get_throttle_state(org_id)
+    deadline = time.monotonic() + DETAIL_FETCH_DEADLINE_SECONDS
+
+    # Throttle state and the service list are independent
+    base, base_failed = await _fetch_concurrently({
+        "throttle_state": lambda: get_throttle_state(org_id),
+        "services": lambda: list_services(project_id, org_id=org_id),
+    }, deadline)
+    if "services" in base_failed:
+        raise HTTPException(status_code=503, detail="Timed out loading project services")
+
+    throttle_state = base.get("throttle_state")
     is_throttled = bool(throttle_state and throttle_state.get("is_throttled"))
+    services = base["services"]
 
-    # Get all services for this project
-    services = list_services(project_id, org_id=org_id)
+    # Fan out every per-service read at once: latency tracks the slowest call
+    calls = {}
+    for svc in services:
+        if svc.get("service_type", "web-app") == "database":
+            continue
+        sid = svc["service_id"]
+        calls[(sid, "env_vars")] = lambda svc=svc: get_env_vars_for_service(svc)
+        calls[(sid, "deployments")] = lambda sid=sid: list_deployments_page(sid, limit=DETAIL_DEPLOYMENTS_LIMIT)
+        calls[(sid, "custom_domains")] = lambda sid=sid: list_project_domains(sid)
+    fetched, failed = await _fetch_concurrently(calls, deadline)
 
+    # env_vars is None (not {}) when its read didn't finish: the dashboard
+    # saves the full set, and saving {} would delete every variable
     services_response = []
     for svc in services:
         sid = svc["service_id"]
@@ -1323,7 +1820,10 @@ async def get_project_details(
             })
             svc_response["deployments"] = []
             svc_response["custom_domains"] = []
-        elif svc_type == "web-service":
+            services_response.append(svc_response)
+            continue
+
+        if svc_type == "web-service":
             svc_response.update({
                 "github_url": svc.get("github_url"),
                 "github_repo": svc.get("github_repo"),
@@ -1331,42 +1831,13 @@ async def get_project_details(
                 "subdomain": svc.get("subdomain"),
                 "custom_url": svc.get("custom_url"),
                 "ecr_repo": svc.get("ecr_repo"),
-                "env_vars": get_env_vars_for_service(svc),
+                "env_vars": fetched.get((sid, "env_vars")),
                 "start_command": svc.get("start_command", ""),
                 "root_directory": svc.get("root_directory", "./"),
                 "cpu": svc.get("cpu", 2048),
                 "memory": svc.get("memory", 1024),
                 "ecs_service_name": svc.get("ecs_service_name"),
             })
-
-            deployments = list_deployments(sid)
-            custom_domains = list_project_domains(sid)
-
-            svc_response["deployments"] = [
-                {
-                    "deploy_id": d["deploy_id"],
-                    "build_id": d["build_id"],
-                    "status": d["status"],
-                    "started_at": d["started_at"],
-                    "finished_at": d.get("finished_at"),
-                    "commit_sha": d.get("commit_sha"),
-                    "commit_message": d.get("commit_message"),
-                    "commit_author_name": d.get("commit_author_name"),
-                    "commit_author_username": d.get("commit_author_username"),
-                    "branch": d.get("branch"),
-                }
-                for d in deployments
-            ]
-            svc_response["custom_domains"] = [
-                {
-                    "domain": d.get("domain"),
-                    "status": d.get("status"),
-                    "is_active": d.get("status") == "ACTIVE",
-                    "tenant_id": d.get("tenant_id"),
-                    "created_at": d.get("created_at"),
-                }
-                for d in custom_domains
-            ]
         else:
             svc_response.update({
                 "github_url": svc.get("github_url"),
@@ -1375,7 +1846,7 @@ async def get_project_details(
                 "subdomain": svc.get("subdomain"),
                 "custom_url": svc.get("custom_url"),
                 "ecr_repo": svc.get("ecr_repo"),
-                "env_vars": get_env_vars_for_service(svc),
+                "env_vars": fetched.get((sid, "env_vars")),
                 "start_command": svc.get("start_command", ""),
                 "root_directory": svc.get("root_directory", "./"),
                 "memory": svc.get("memory", 1024),
@@ -1384,34 +1855,26 @@ async def get_project_details(
                 "is_throttled": is_throttled,
             })
 
-            deployments = list_deployments(sid)
-            custom_domains = list_project_domains(sid)
-
-            svc_response["deployments"] = [
-                {
-                    "deploy_id": d["deploy_id"],
-                    "build_id": d["build_id"],
-                    "status": d["status"],
-                    "started_at": d["started_at"],
-                    "finished_at": d.get("finished_at"),
-                    "commit_sha": d.get("commit_sha"),
-                    "commit_message": d.get("commit_message"),
-                    "commit_author_name": d.get("commit_author_name"),
-                    "commit_author_username": d.get("commit_author_username"),
-                    "branch": d.get("branch"),
-                }
-                for d in deployments
-            ]
-            svc_response["custom_domains"] = [
-                {
-                    "domain": d.get("domain"),
-                    "status": d.get("status"),
-                    "is_active": d.get("status") == "ACTIVE",
-                    "tenant_id": d.get("tenant_id"),
-                    "created_at": d.get("created_at"),
-                }
-                for d in custom_domains
-            ]
+        deployments_page = fetched.get((sid, "deployments"), {})
+        svc_response["deployments"] = [
+            _format_deployment(d) for d in deployments_page.get("deployments", [])
+        ]
+        svc_response["deployments_next_cursor"] = deployments_page.get("next_cursor")
+        svc_response["custom_domains"] = [
+            {
+                "domain": d.get("domain"),
+                "status": d.get("status"),
+                "is_active": d.get("status") == "ACTIVE",
+                "tenant_id": d.get("tenant_id"),
+                "created_at": d.get("created_at"),
+            }
+            for d in fetched.get((sid, "custom_domains"), [])
+        ]
+
+        # Fields that are empty (or None) because their read failed or timed out
+        unavailable = [field for (failed_sid, field) in failed if failed_sid == sid]
+        if unavailable:
+            svc_response["unavailable_fields"] = unavailable
 
         services_response.append(svc_response)
 
@@ -1426,9 +1889,68 @@ async def get_project_details(
             "is_throttled": is_throttled,
         },
         "services": services_response,
+        "partial": bool(failed or base_failed),
+    }
+
+
+def _format_deployment(d: dict) -> dict:
+    """Deployment fields returned to the dashboard."""
+    return {
+        "deploy_id": d["deploy_id"],
+        "build_id": d["build_id"],
+        "status": d["status"],
+        "started_at": d["started_at"],
+        "finished_at": d.get("finished_at"),
+        "build_started_at": d.get("build_started_at"),
+        "step_timings_ms": {step: int(ms) for step, ms in d.get("step_timings_ms", {}).items()},
+        "build_cache": {key: int(value) for key, value in d["build_cache"].items()} if d.get("build_cache") else None,
+        "commit_sha": d.get("commit_sha"),
+        "commit_message": d.get("commit_message"),
+        "commit_author_name": d.get("commit_author_name"),
+        "commit_author_username": d.get("commit_author_username"),
+        "branch": d.get("branch"),
     }
 
 
+async def _fetch_concurrently(calls: dict, deadline: float) -> tuple[dict, list]:
+    """
+    Run {key: fn} on a pool of this call's own until the monotonic deadline.
+
+    Returns (results, failed_keys). Calls that raise or are still running at
+    the deadline are reported in failed_keys; callers decide per field
+    whether an empty value is safe to show.
+    """
+    if not calls:
+        return {}, []
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(
+        max_workers=min(DETAIL_FETCH_CONCURRENCY, len(calls)),
+        thread_name_prefix="project-detail",
+    )
+    futures = {loop.run_in_executor(executor, fn): key for key, fn in calls.items()}
+    done, pending = await asyncio.wait(
+        futures.keys(),
+        timeout=max(0.0, deadline - time.monotonic()),
+    )
+    # Don't wait for stragglers; reads not yet started are dropped, running
+    # ones finish on their own threads and take the pool with them
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results, failed = {}, []
+    for future, key in futures.items():
+        if future in done and future.exception() is None:
+            results[key] = future.result()
+            continue
+        failed.append(key)
+        if future in done:
+            print(f"⚠️ Project detail read failed {key}: {future.exception()}")
+        else:
+            print(f"⚠️ Project detail read timed out {key}")
+            future.cancel()  # Stop waiting; the worker thread finishes on its own
+    return results, failed
+
+
 def _resolve_service(org_id: str, project_id: str, service_id: str = None, service_type: str = None) -> dict:
     """Resolve a service from project_id and optional service_id.
 
@@ -1471,6 +1993,31 @@ async def get_project_status(
     }
 
 
+@router.get("/{project_id}/deployments")
+async def get_project_deployments(
+    project_id: str,
+    user_id: str = Depends(get_current_user_id),
+    org_id: str = Query(...),
+    service_id: Optional[str] = Query(None),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+):
+    """List a service's deployments (newest first), one page at a time."""
+    svc = _resolve_service(org_id, project_id, service_id)
+
+    try:
+        page = list_deployments_page(svc["service_id"], limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "project_id": project_id,
+        "service_id": svc["service_id"],
+        "deployments": [_format_deployment(d) for d in page["deployments"]],
+        "next_cursor": page["next_cursor"],
+    }
+
+
 @router.get("/{project_id}/connection")
 async def get_database_connection(
     project_id: str,
@@ -2122,7 +2669,7 @@ async def update_project_env_vars(
     sid = svc["service_id"]
 
     arn = put_env_vars(org_id, project_id, sid, request.env_vars)
-    update_service(sid, {"secret_arn": arn})
+    update_service_by_key(org_id, project_id, sid, {"secret_arn": arn})
 
     return {
         "project_id": project_id,
@@ -2203,7 +2750,7 @@ async def update_project_fields(
                     detail=f"Failed to apply scaling to cluster: {str(e)}",
                 )
 
-    updated = update_service(svc["service_id"], updates)
+    updated = update_service_by_key(org_id, project_id, svc["service_id"], updates)
 
     return {
         "project_id": project_id,
@@ -2236,7 +2783,7 @@ async def redeploy_project(
     sid = svc["service_id"]
     svc_type = svc.get("service_type", "web-app")
 
-    update_service(sid, {"status": "PENDING"})
+    update_service_by_key(org_id, project_id, sid, {"status": "PENDING"})
 
     github_token = await get_or_refresh_token(org_id, user_id)
 
@@ -2262,6 +2809,7 @@ async def redeploy_project(
             memory,
             **commit_info,
             org_id=org_id,
+            parent_project_id=project_id,
         )
     else:
         memory = int(svc.get("memory", 1024))
@@ -2279,6 +2827,7 @@ async def redeploy_project(
             ephemeral_storage,
             **commit_info,
             org_id=org_id,
+            parent_project_id=project_id,
         )
 
     return {
@@ -2300,13 +2849,14 @@ def _delete_single_service(svc: dict):
     """Shared helper: delete one service and its AWS resources."""
     sid = svc["service_id"]
     svc_type = svc.get("service_type", "web-app")
+    service_key = (svc["organization_id"], svc["project_id"], sid)
 
     if svc_type == "database":
-        update_service(sid, {"status": "DELETING"})
+        update_service_by_key(*service_key, {"status": "DELETING"})
         send_database_delete_to_sqs(sid)
         return "async"
     elif svc_type == "web-service":
-        update_service(sid, {"status": "DELETING"})
+        update_service_by_key(*service_key, {"status": "DELETING"})
         send_ecs_delete_to_sqs(sid, org_id=svc.get("organization_id"))
         return "async"
     else:
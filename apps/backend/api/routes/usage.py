@@ -1,45 +1,145 @@
 """
 Usage API routes - Organization usage metrics and billing information.
+
+Usage counters come from the hourly rollups the usage aggregator writes to
+the org-usage-metrics table. Plan limits, credits and the billing period come
+from a stored Autumn customer snapshot that is refreshed in the background
+once it is older than USAGE_PLAN_REFRESH_SECONDS (stale-while-revalidate),
+so a dashboard load never waits on Autumn unless the org has no snapshot yet.
 """
 import os
 import calendar
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta
 from typing import Optional
 
-import httpx
 from fastapi import APIRouter, Depends, HTTPException, Query
 
 from api.auth import get_current_user_id
-from api.db.dynamodb import get_throttle_state
+from api.db.dynamodb import (
+    USAGE_ROLLUP_METRICS,
+    get_throttle_state,
+    get_usage_plan_snapshot,
+    get_usage_rollups_since,
+    get_usage_watermark,
+    list_usage_rollups,
+    put_usage_plan_snapshot,
+    usage_rollup_hour,
+)
+from api.services import autumn
 
 router = APIRouter(prefix="/api/projects", tags=["usage"])
 
-AUTUMN_BASE_URL = os.environ.get("AUTUMN_BASE_URL", "https://api.useautumn.com/v1").rstrip("/")
+USAGE_PLAN_REFRESH_SECONDS = int(os.environ.get("USAGE_PLAN_REFRESH_SECONDS", "300"))
+USAGE_TIMESERIES_MAX_DAYS = 93
+
+# Rollup metric (Autumn feature ID) -> response field
+USAGE_RESPONSE_FIELDS = {
+    "invocations": "requests",
+    "compute": "gbSeconds",
+    "vcpu_time": "vcpuSeconds",
+    "memory_time": "memGbSeconds",
+    "build_seconds": "buildSeconds",
+}
+
+_plan_refreshing = set()
+_plan_refreshing_lock = threading.Lock()
 
 
 def _fetch_autumn_customer(org_id: str) -> dict:
     """Fetch customer data from Autumn API."""
-    autumn_key = os.environ.get("AUTUMN_API_KEY")
-    if not autumn_key:
+    try:
+        return autumn.get_customer(org_id)
+    except autumn.AutumnNotConfigured:
         raise HTTPException(status_code=500, detail="AUTUMN_API_KEY not configured")
+    except autumn.AutumnError as e:
+        raise HTTPException(status_code=e.status_code or 502, detail=str(e))
 
-    url = f"{AUTUMN_BASE_URL}/customers/{org_id}"
-    try:
-        resp = httpx.get(
-            url,
-            headers={"Authorization": f"Bearer {autumn_key}"},
-            timeout=15.0,
-        )
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Failed to reach Autumn: {e}")
 
-    if resp.status_code >= 400:
-        raise HTTPException(status_code=resp.status_code, detail=f"Autumn error: {resp.text}")
+def _refresh_plan_snapshot(org_id: str) -> tuple[dict, str]:
+    """Fetch the customer from Autumn and store it. Returns (customer, fetched_at)."""
+    customer = _fetch_autumn_customer(org_id)
+    return customer, put_usage_plan_snapshot(org_id, customer)
+
+
+def _refresh_plan_snapshot_in_background(org_id: str) -> None:
+    """Refresh a stale snapshot off the request path (one refresh per org at a time)."""
+    with _plan_refreshing_lock:
+        if org_id in _plan_refreshing:
+            return
+        _plan_refreshing.add(org_id)
+
+    def run():
+        try:
+            _refresh_plan_snapshot(org_id)
+        except Exception as e:
+            detail = getattr(e, "detail", e)
+            print(f"⚠️ Plan snapshot refresh failed for {org_id}: {detail}")
+        finally:
+            with _plan_refreshing_lock:
+                _plan_refreshing.discard(org_id)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def _get_plan_customer(org_id: str) -> tuple[dict, str]:
+    """
+    Autumn customer for an org, stale-while-revalidate.
+
+    Serves the stored snapshot and refreshes it in the background when it is
+    older than USAGE_PLAN_REFRESH_SECONDS; only an org without a snapshot
+    waits on Autumn. Returns (customer, fetched_at).
+    """
+    snapshot = get_usage_plan_snapshot(org_id)
+    if not snapshot:
+        return _refresh_plan_snapshot(org_id)
+
+    age = datetime.utcnow() - datetime.fromisoformat(snapshot["fetched_at"])
+    if age.total_seconds() > USAGE_PLAN_REFRESH_SECONDS:
+        _refresh_plan_snapshot_in_background(org_id)
+    return snapshot["customer"], snapshot["fetched_at"]
+
+
+def _sum_rollups(items: list) -> dict:
+    """Sum rollup items per metric (Autumn feature IDs)."""
+    totals = {metric: 0.0 for metric in USAGE_ROLLUP_METRICS}
+    for item in items:
+        for metric in USAGE_ROLLUP_METRICS:
+            totals[metric] += float(item.get(metric, 0) or 0)
+    return totals
+
+
+def _local_period_usage(org_id: str, period_start: Optional[str]) -> Optional[dict]:
+    """
+    Org usage since period_start from the hourly rollups.
+
+    Returns None when the rollups don't cover the whole period yet (they
+    started after it began), so the caller falls back to Autumn's figures.
+    """
+    now = datetime.utcnow()
+    start = datetime.fromisoformat(period_start) if period_start else now.replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+    start_hour = usage_rollup_hour(start)
+
+    rollups_since = get_usage_rollups_since()
+    if not rollups_since or rollups_since > start_hour:
+        return None
 
-    data = resp.json()
-    if not isinstance(data, dict):
-        raise HTTPException(status_code=502, detail="Invalid Autumn response")
-    return data
+    return _sum_rollups(list_usage_rollups(org_id, start_hour, usage_rollup_hour(now)))
+
+
+def _parse_time(value: Optional[str], name: str) -> Optional[datetime]:
+    """Parse an ISO 8601 query param into a naive UTC datetime."""
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: expected ISO 8601")
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
 
 
 def _extract_billing_period(customer: dict, features: dict) -> tuple[Optional[str], Optional[str]]:
@@ -106,8 +206,12 @@ async def get_org_usage(
     Get organization usage for the current billing period.
     - Pro/Plus (credit system): returns dollar-based credit usage.
     - Hobby (raw features): returns raw invocation/compute counts.
+
+    Counters come from the local hourly rollups once they cover the whole
+    billing period (usageSource "rollups"); until then Autumn's figures from
+    the plan snapshot are used (usageSource "autumn").
     """
-    customer = _fetch_autumn_customer(org_id)
+    customer, plan_fetched_at = _get_plan_customer(org_id)
     features = customer.get("features") or {}
 
     inv = features.get("invocations") or {}
@@ -148,9 +252,25 @@ async def get_org_usage(
         current_compute = float(comp.get("usage", 0.0) or 0.0)
         included_compute = float(comp.get("included_usage", 0.0) or 0.0)
 
+    current_vcpu = float(vcpu.get("usage", 0) or 0)
+    current_mem = float(mem.get("usage", 0) or 0)
+    current_build = None
+
     # ── Billing period ────────────────────────────────────────────
     period_start, period_end = _extract_billing_period(customer, features)
 
+    # ── Local rollups (no Autumn round trip) ──────────────────────
+    local_usage = _local_period_usage(org_id, period_start)
+    if local_usage is not None:
+        current_invocations = int(local_usage["invocations"])
+        current_compute = local_usage["compute"]
+        current_vcpu = local_usage["vcpu_time"]
+        current_mem = local_usage["memory_time"]
+        current_build = round(local_usage["build_seconds"], 1)
+        last_updated = get_usage_watermark() or plan_fetched_at
+    else:
+        last_updated = plan_fetched_at
+
     # ── Throttle status ───────────────────────────────────────────
     throttle_state = get_throttle_state(org_id)
     is_throttled = bool(throttle_state and throttle_state.get("is_throttled"))
@@ -166,18 +286,77 @@ async def get_org_usage(
             "limit": included_compute if not has_credit_system else None,
         },
         "vcpuSeconds": {
-            "current": float(vcpu.get("usage", 0) or 0),
+            "current": current_vcpu,
             "limit": None,
         },
         "memGbSeconds": {
-            "current": float(mem.get("usage", 0) or 0),
+            "current": current_mem,
+            "limit": None,
+        },
+        "buildSeconds": {
+            "current": current_build,
             "limit": None,
         },
         "periodStart": period_start,
         "periodEnd": period_end,
-        "lastUpdated": datetime.utcnow().isoformat(),
+        "lastUpdated": last_updated,
+        "planUpdated": plan_fetched_at,
+        "usageSource": "rollups" if local_usage is not None else "autumn",
         "isThrottled": is_throttled,
         "throttleReason": throttle_state.get("reason") if is_throttled else None,
         "throttledAt": throttle_state.get("throttled_at") if is_throttled else None,
     }
 
+
+
+@router.get("/usage/timeseries")
+async def get_org_usage_timeseries(
+    user_id: str = Depends(get_current_user_id),
+    org_id: str = Query(...),
+    start: Optional[str] = Query(None, description="ISO 8601, defaults to 24h before end"),
+    end: Optional[str] = Query(None, description="ISO 8601, defaults to now"),
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+    service_id: Optional[str] = Query(None, description="Limit to one service"),
+):
+    """
+    Usage over time for charts, from the hourly rollups.
+
+    Returns one point per hour (or day) in [start, end], zero-filled, with
+    the same counters as GET /usage.
+    """
+    end_dt = _parse_time(end, "end") or datetime.utcnow()
+    start_dt = _parse_time(start, "start") or end_dt - timedelta(hours=24)
+    if start_dt > end_dt:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if end_dt - start_dt > timedelta(days=USAGE_TIMESERIES_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range too large (max {USAGE_TIMESERIES_MAX_DAYS} days)")
+
+    items = list_usage_rollups(org_id, usage_rollup_hour(start_dt), usage_rollup_hour(end_dt), service_id=service_id)
+
+    # Bucket label: YYYY-MM-DDTHH for hours, YYYY-MM-DD for days
+    label_len = 13 if granularity == "hour" else 10
+    step = timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+    by_bucket = {}
+    for item in items:
+        by_bucket.setdefault(item["hour"][:label_len], []).append(item)
+
+    points = []
+    bucket = start_dt.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        bucket = bucket.replace(hour=0)
+    while bucket <= end_dt:
+        label = bucket.isoformat()[:label_len]
+        totals = _sum_rollups(by_bucket.get(label, []))
+        point = {"timestamp": bucket.isoformat()}
+        for metric, field in USAGE_RESPONSE_FIELDS.items():
+            point[field] = int(totals[metric]) if metric == "invocations" else round(totals[metric], 2)
+        points.append(point)
+        bucket += step
+
+    return {
+        "granularity": granularity,
+        "start": start_dt.isoformat(),
+        "end": end_dt.isoformat(),
+        "serviceId": service_id,
+        "points": points,
+    }
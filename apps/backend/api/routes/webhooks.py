@@ -169,6 +169,7 @@ async def github_webhook(request: Request):
                 commit_author_username=commit_author_username,
                 branch=pushed_branch,
                 org_id=org_id,
+                parent_project_id=svc.get("project_id"),
             )
             print(f"[webhook] push {full_name}@{pushed_branch}: triggered ECS deploy for service_id={service_id}")
         else:
@@ -192,6 +193,7 @@ async def github_webhook(request: Request):
                 commit_author_username=commit_author_username,
                 branch=pushed_branch,
                 org_id=org_id,
+                parent_project_id=svc.get("project_id"),
             )
             print(f"[webhook] push {full_name}@{pushed_branch}: triggered Lambda deploy for service_id={service_id}")
         
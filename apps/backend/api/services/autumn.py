@@ -0,0 +1,308 @@
+"""
+Autumn billing API client.
+
+One process-wide pooled httpx.Client shared by the usage aggregator, Lambda
+warmer, quota enforcer and usage API, with:
+
+- Retries with full-jitter exponential backoff on transport errors, 429 and 5xx
+  (POST /track only when it carries an idempotency key)
+- A per-org customer cache with a short TTL; concurrent misses for the same
+  org share one in-flight request
+- Call counts and latency per operation (get_autumn_stats)
+
+A /track call invalidates the org's cached customer, so quota checks that
+follow a billing sync always see the new balances.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+
+# Configuration
+AUTUMN_BASE_URL = os.environ.get("AUTUMN_BASE_URL", "https://api.useautumn.com/v1").rstrip("/")
+AUTUMN_TIMEOUT_SECONDS = 15.0
+AUTUMN_POOL_SIZE = int(os.environ.get("AUTUMN_POOL_SIZE", "20"))
+AUTUMN_MAX_ATTEMPTS = 3
+AUTUMN_BACKOFF_BASE_SECONDS = 0.25
+AUTUMN_BACKOFF_MAX_SECONDS = 2.0
+AUTUMN_CUSTOMER_CACHE_TTL = float(os.environ.get("AUTUMN_CUSTOMER_CACHE_TTL", "60"))
+
+_RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class AutumnError(Exception):
+    """Autumn call failed. status_code is None when Autumn could not be reached."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AutumnNotConfigured(AutumnError):
+    """AUTUMN_API_KEY is not set."""
+
+
+def is_configured() -> bool:
+    return bool(os.environ.get("AUTUMN_API_KEY"))
+
+
+def is_paid_customer(customer: dict) -> bool:
+    """Paid orgs (Pro/Plus) have features.usd_credits.included_usage > 0."""
+    features = customer.get("features") or {}
+    usd_credits = features.get("usd_credits") or {}
+    credits_included = usd_credits.get("included_usage")
+    return credits_included is not None and credits_included > 0
+
+
+# ─────────────────────────────────────────────────────────────
+# METRICS
+# ─────────────────────────────────────────────────────────────
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _record(operation: str, latency_ms: float, ok: bool, retries: int = 0) -> None:
+    with _stats_lock:
+        op = _stats.setdefault(operation, {
+            "calls": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "max_ms": 0.0,
+        })
+        op["calls"] += 1
+        op["retries"] += retries
+        op["total_ms"] += latency_ms
+        op["max_ms"] = max(op["max_ms"], latency_ms)
+        if not ok:
+            op["errors"] += 1
+
+
+def _record_cache(outcome: str) -> None:
+    """outcome: "hits", "misses" or "coalesced" (waited on another thread's fetch)."""
+    with _stats_lock:
+        cache = _stats.setdefault("customer_cache", {"hits": 0, "misses": 0, "coalesced": 0})
+        cache[outcome] += 1
+
+
+def get_autumn_stats() -> dict:
+    """Per-operation call counts/latency and customer cache hit counts (for logs and ops)."""
+    with _stats_lock:
+        snapshot = {}
+        for name, op in _stats.items():
+            snapshot[name] = dict(op)
+            if "calls" in op:
+                snapshot[name]["avg_ms"] = round(op["total_ms"] / op["calls"], 1) if op["calls"] else 0.0
+                snapshot[name]["total_ms"] = round(op["total_ms"], 1)
+                snapshot[name]["max_ms"] = round(op["max_ms"], 1)
+        return snapshot
+
+
+def reset_autumn_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+# ─────────────────────────────────────────────────────────────
+# HTTP CLIENT
+# ─────────────────────────────────────────────────────────────
+
+_client: Optional[httpx.Client] = None
+_client_key: Optional[str] = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> httpx.Client:
+    """Process-wide pooled client (rebuilt only if AUTUMN_API_KEY changes)."""
+    global _client, _client_key
+    autumn_key = os.environ.get("AUTUMN_API_KEY")
+    if not autumn_key:
+        raise AutumnNotConfigured("AUTUMN_API_KEY not configured")
+
+    if _client is not None and _client_key == autumn_key:
+        return _client
+    with _client_lock:
+        if _client is None or _client_key != autumn_key:
+            _client = httpx.Client(
+                base_url=AUTUMN_BASE_URL,
+                headers={"Authorization": f"Bearer {autumn_key}"},
+                timeout=AUTUMN_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=AUTUMN_POOL_SIZE,
+                    max_keepalive_connections=AUTUMN_POOL_SIZE,
+                ),
+            )
+            _client_key = autumn_key
+        return _client
+
+
+def _backoff(attempt: int) -> float:
+    """Full jitter: uniform(0, min(max, base * 2^attempt))."""
+    return random.uniform(0, min(AUTUMN_BACKOFF_MAX_SECONDS, AUTUMN_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def _request(operation: str, method: str, path: str, retry: bool = True, **kwargs) -> httpx.Response:
+    """
+    Send one request through the pooled client, retrying transient failures.
+
+    Returns the final response (any status); raises AutumnError only when
+    Autumn could not be reached on any attempt.
+    """
+    client = _get_client()
+    start = time.monotonic()
+    attempts = AUTUMN_MAX_ATTEMPTS if retry else 1
+    last_error = None
+
+    for attempt in range(attempts):
+        if attempt:
+            time.sleep(_backoff(attempt - 1))
+        try:
+            resp = client.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            last_error = e
+            continue
+        if resp.status_code in _RETRYABLE_STATUS and attempt < attempts - 1:
+            continue
+        _record(operation, (time.monotonic() - start) * 1000, resp.status_code < 400, retries=attempt)
+        return resp
+
+    _record(operation, (time.monotonic() - start) * 1000, False, retries=attempts - 1)
+    raise AutumnError(f"Failed to reach Autumn: {last_error}")
+
+
+# ─────────────────────────────────────────────────────────────
+# CUSTOMERS (cached, coalesced)
+# ─────────────────────────────────────────────────────────────
+
+class _InFlight:
+    """A customer fetch other threads can wait on instead of issuing their own."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.customer = None
+        self.error = None
+
+
+_customer_cache = {}  # org_id -> (fetched_at, customer)
+_customer_inflight = {}  # org_id -> _InFlight
+_customer_lock = threading.Lock()
+
+
+def _fetch_customer(org_id: str) -> dict:
+    resp = _request("get_customer", "GET", f"/customers/{org_id}")
+    if resp.status_code >= 400:
+        raise AutumnError(f"Autumn error: {resp.text}", status_code=resp.status_code)
+    try:
+        customer = resp.json()
+    except ValueError:
+        customer = None
+    if not isinstance(customer, dict):
+        raise AutumnError("Invalid Autumn response")
+    return customer
+
+
+def get_customer(org_id: str, max_age: Optional[float] = None) -> dict:
+    """
+    Fetch an Autumn customer, served from the per-org cache when fresh.
+
+    Args:
+        org_id: Autumn customer ID (the organization)
+        max_age: Override the cache TTL in seconds (0 forces a fetch)
+
+    Raises:
+        AutumnNotConfigured: AUTUMN_API_KEY is not set
+        AutumnError: Autumn unreachable, returned an error, or invalid JSON
+            (failures are not cached)
+    """
+    ttl = AUTUMN_CUSTOMER_CACHE_TTL if max_age is None else max_age
+    now = time.monotonic()
+
+    with _customer_lock:
+        cached = _customer_cache.get(org_id)
+        if cached and now - cached[0] < ttl:
+            _record_cache("hits")
+            return cached[1]
+
+        inflight = _customer_inflight.get(org_id)
+        leader = inflight is None
+        if leader:
+            inflight = _InFlight()
+            _customer_inflight[org_id] = inflight
+            _record_cache("misses")
+        else:
+            _record_cache("coalesced")
+
+    if not leader:
+        inflight.done.wait((AUTUMN_TIMEOUT_SECONDS + AUTUMN_BACKOFF_MAX_SECONDS) * AUTUMN_MAX_ATTEMPTS)
+        if inflight.error:
+            raise inflight.error
+        if inflight.customer is None:
+            raise AutumnError("Timed out waiting for Autumn customer fetch")
+        return inflight.customer
+
+    try:
+        customer = _fetch_customer(org_id)
+        inflight.customer = customer
+        with _customer_lock:
+            _customer_cache[org_id] = (time.monotonic(), customer)
+        return customer
+    except Exception as e:
+        inflight.error = e
+        raise
+    finally:
+        with _customer_lock:
+            _customer_inflight.pop(org_id, None)
+        inflight.done.set()
+
+
+def invalidate_customer(org_id: str) -> None:
+    """Drop the cached customer (after usage is tracked or the plan changes)."""
+    with _customer_lock:
+        _customer_cache.pop(org_id, None)
+
+
+# ─────────────────────────────────────────────────────────────
+# USAGE
+# ─────────────────────────────────────────────────────────────
+
+def track(
+    customer_id: str,
+    feature_id: str,
+    value: float,
+    idempotency_key: Optional[str] = None,
+) -> bool:
+    """
+    Record usage with POST /track.
+
+    Returns True if Autumn has the usage (recorded now, or already recorded
+    under the same idempotency key), False if the caller should retry later.
+    Only idempotent requests are retried here.
+    """
+    payload = {
+        "customer_id": customer_id,
+        "feature_id": feature_id,
+        "value": value,
+    }
+    if idempotency_key:
+        # Use Autumn's idempotency key to avoid double-counting the same window.
+        payload["idempotency_key"] = idempotency_key
+
+    try:
+        resp = _request("track", "POST", "/track", retry=bool(idempotency_key), json=payload)
+    except AutumnError as e:
+        print(f"⚠️ Autumn track exception: {e}")
+        return False
+
+    if resp.status_code == 409:
+        # Duplicate idempotency key / already recorded – safe to ignore.
+        print(f"ℹ️ Autumn already has usage for org={customer_id} feature={feature_id}")
+        return True
+    if resp.status_code >= 400:
+        print(f"⚠️ Autumn track failed ({resp.status_code}): {resp.text}")
+        return False
+
+    invalidate_customer(customer_id)
+    print(f"💸 Autumn synced: org={customer_id} feature={feature_id} value={value}")
+    return True
@@ -9,17 +9,24 @@ This service runs hourly via EventBridge to:
 Autumn is the sole source of truth for usage and billing.
 """
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 
 import boto3
-import httpx
 from boto3.dynamodb.conditions import Key
 
 from api.db.dynamodb import (
-    get_or_create_table,
-    list_deployments,
+    add_usage_rollup,
+    advance_usage_watermark,
+    get_or_create_services_table,
+    get_usage_watermark,
+    list_deployments_started_between,
+    mark_usage_rollups_since,
+    usage_rollup_hour,
 )
+from api.services import autumn
 from deployer import extract_project_name
 from deployer.aws.lambda_service import get_lambda_function_name
 
@@ -27,7 +34,21 @@ from deployer.aws.lambda_service import get_lambda_function_name
 # CloudWatch client
 cloudwatch = boto3.client("cloudwatch")
 
-AUTUMN_BASE_URL = os.environ.get("AUTUMN_BASE_URL", "https://api.useautumn.com/v1").rstrip("/")
+# GetMetricData accepts at most 500 MetricDataQueries per call; each Lambda
+# function needs two (Invocations + Duration), so one call covers 250 functions.
+METRIC_DATA_MAX_QUERIES = 500
+LAMBDA_USAGE_METRICS = ("Invocations", "Duration")
+
+# Worker pool size for each pipeline stage (deployments queries, Autumn
+# /track calls, quota checks). Stages run one after another.
+USAGE_AGGREGATION_CONCURRENCY = int(os.environ.get("USAGE_AGGREGATION_CONCURRENCY", "16"))
+
+# Most pending windows one run will catch up (oldest first); the next run
+# continues from the watermark. Bounded so a long outage can't blow the Lambda timeout.
+USAGE_MAX_CATCHUP_WINDOWS = int(os.environ.get("USAGE_MAX_CATCHUP_WINDOWS", "24"))
+
+# Autumn feature IDs (must match the dashboard), in sync order
+USAGE_FEATURES = ("invocations", "compute", "build_seconds", "vcpu_time", "memory_time")
 
 
 def _get_aggregation_window_seconds() -> int:
@@ -63,156 +84,202 @@ def _autumn_track_usage(
     feature_id: str,
     value: float,
     idempotency_key: Optional[str] = None,
-) -> None:
+) -> bool:
     """
-    Record usage into Autumn using the documented /track endpoint.
+    Record usage into Autumn using the documented /track endpoint (shared pooled client).
+
+    Returns True if Autumn has the usage (recorded now or already, via the
+    idempotency key), False if it should be retried.
     """
-    autumn_key = os.environ.get("AUTUMN_API_KEY")
-    if not autumn_key:
+    if not autumn.is_configured():
         # Don't fail the whole job if billing env var isn't set.
         print("⚠️ AUTUMN_API_KEY not set; skipping Autumn sync.")
-        return
+        return True
 
-    url = f"{AUTUMN_BASE_URL}/track"
-    payload = {
-        "customer_id": customer_id,
-        "feature_id": feature_id,
-        "value": value,
-    }
-    if idempotency_key:
-        # Use Autumn's idempotency key to avoid double-counting the same window.
-        payload["idempotency_key"] = idempotency_key
+    return autumn.track(customer_id, feature_id, value, idempotency_key=idempotency_key)
 
-    try:
-        resp = httpx.post(
-            url,
-            headers={"Authorization": f"Bearer {autumn_key}"},
-            json=payload,
-            timeout=15.0,
-        )
-        if resp.status_code == 409:
-            # Duplicate idempotency key / already recorded – safe to ignore.
-            print(f"ℹ️ Autumn already has usage for org={customer_id} feature={feature_id}")
-        elif resp.status_code >= 400:
-            print(f"⚠️ Autumn track failed ({resp.status_code}): {resp.text}")
-        else:
-            print(f"💸 Autumn synced: org={customer_id} feature={feature_id} value={value}")
-    except Exception as e:
-        print(f"⚠️ Autumn track exception: {e}")
+
+def get_lambda_metric_sums(
+    function_names: List[str],
+    *,
+    window_seconds: int,
+    window_end: datetime,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Batched Sum of Invocations and Duration for many Lambda functions.
+
+    Single-window form of get_lambda_metric_sums_by_window.
+
+    Returns:
+        {function_name: {"Invocations": float, "Duration": float}}; functions
+        without datapoints (or whose batch failed) report 0.0.
+    """
+    return get_lambda_metric_sums_by_window(
+        function_names,
+        window_seconds=window_seconds,
+        window_ends=[window_end],
+    )[window_end]
 
 
-def get_cloudwatch_metric_sum(
-    function_name: str,
-    metric_name: str,
+def get_lambda_metric_data(
+    function_names: List[str],
+    metrics: Dict[str, str],
+    *,
+    period_seconds: int,
     start_time: datetime,
     end_time: datetime,
-    period_seconds: int,
-) -> float:
+    strict: bool = False,
+) -> Dict[str, Dict[str, List[Tuple[datetime, float]]]]:
     """
-    Get sum of a CloudWatch metric for a Lambda function over a time period.
-    
+    Batched CloudWatch datapoints for many Lambda functions.
+
+    Packs up to METRIC_DATA_MAX_QUERIES queries (one per function and
+    metric) into each GetMetricData call and follows NextToken.
+
     Args:
-        function_name: Lambda function name
-        metric_name: CloudWatch metric name (e.g., "Invocations", "Duration")
-        start_time: Start of time range
-        end_time: End of time range
-        period_seconds: CloudWatch period in seconds
-        
+        metrics: {metric_name: statistic}, e.g. {"Invocations": "Sum"}
+        strict: Raise if a batch fails instead of skipping its functions
+
     Returns:
-        Sum of metric values, or 0.0 if no data
+        {function_name: {metric_name: [(period_start, value), ...]}}; functions
+        without datapoints (or whose batch failed) get empty lists.
     """
-    try:
-        response = cloudwatch.get_metric_statistics(
-            Namespace="AWS/Lambda",
-            MetricName=metric_name,
-            Dimensions=[
-                {
-                    "Name": "FunctionName",
-                    "Value": function_name,
+    names = list(dict.fromkeys(function_names))
+    data = {name: {metric: [] for metric in metrics} for name in names}
+
+    # Query ids must start with a lowercase letter; map them back by index
+    queries = []
+    query_targets = {}
+    for i, name in enumerate(names):
+        for metric, stat in metrics.items():
+            query_id = f"f{i}_{metric.lower()}"
+            query_targets[query_id] = (name, metric)
+            queries.append({
+                "Id": query_id,
+                "MetricStat": {
+                    "Metric": {
+                        "Namespace": "AWS/Lambda",
+                        "MetricName": metric,
+                        "Dimensions": [{"Name": "FunctionName", "Value": name}],
+                    },
+                    "Period": period_seconds,
+                    "Stat": stat,
+                },
+            })
+
+    calls = 0
+    for offset in range(0, len(queries), METRIC_DATA_MAX_QUERIES):
+        batch = queries[offset:offset + METRIC_DATA_MAX_QUERIES]
+        next_token = None
+        try:
+            while True:
+                request = {
+                    "MetricDataQueries": batch,
+                    "StartTime": start_time,
+                    "EndTime": end_time,
                 }
-            ],
-            StartTime=start_time,
-            EndTime=end_time,
-            Period=period_seconds,
-            Statistics=["Sum"],
-        )
-        
-        datapoints = response.get("Datapoints", [])
-        if not datapoints:
-            return 0.0
-        
-        # Sum all datapoint values
-        total = sum(dp.get("Sum", 0.0) for dp in datapoints)
-        return float(total)
-        
-    except Exception as e:
-        print(f"Error fetching {metric_name} for {function_name}: {e}")
-        return 0.0
+                if next_token:
+                    request["NextToken"] = next_token
 
+                response = cloudwatch.get_metric_data(**request)
+                calls += 1
 
-def get_invocations(
-    function_name: str,
-    *,
-    window_seconds: int,
-    window_end: datetime,
-) -> int:
-    """Get number of invocations in the aggregation window."""
-    # Use the deterministic window_end passed from the aggregator so repeated
-    # runs for the same bucket look at exactly the same CloudWatch range.
-    end_time = window_end
-    start_time = end_time - timedelta(seconds=window_seconds)
-    
-    invocations = get_cloudwatch_metric_sum(
-        function_name,
-        "Invocations",
-        start_time,
-        end_time,
-        window_seconds,
+                for result in response.get("MetricDataResults", []):
+                    target = query_targets.get(result.get("Id"))
+                    if not target:
+                        continue
+                    name, metric = target
+                    # Each datapoint is stamped with its period start
+                    data[name][metric].extend(
+                        (timestamp, float(value))
+                        for timestamp, value in zip(result.get("Timestamps", []), result.get("Values", []))
+                    )
+
+                next_token = response.get("NextToken")
+                if not next_token:
+                    break
+        except Exception as e:
+            print(f"Error fetching metrics batch {offset // METRIC_DATA_MAX_QUERIES} ({len(batch)} queries): {e}")
+            if strict:
+                raise
+
+    print(
+        f"📡 Fetched {', '.join(metrics)} for {len(names)} functions "
+        f"in {calls} GetMetricData call(s)"
     )
-    return int(invocations)
+    return data
 
 
-def get_gb_seconds(
-    function_name: str,
-    memory_mb: int,
+def get_lambda_metric_sums_by_window(
+    function_names: List[str],
     *,
     window_seconds: int,
-    window_end: datetime,
-) -> float:
+    window_ends: List[datetime],
+    strict: bool = False,
+) -> Dict[datetime, Dict[str, Dict[str, float]]]:
     """
-    Calculate GB-Seconds for a function in the aggregation window.
-    
-    GB-Seconds = (Duration_ms / 1000) * (Memory_MB / 1024) / 1000
-    
-    Note: CloudWatch Duration is in milliseconds, Memory is in MB.
-    We convert to GB-Seconds for billing calculations.
+    Batched Sum of Invocations and Duration for many functions over many windows.
+
+    One query per function and metric spans every requested window (Period =
+    window_seconds), so catching up N windows for F functions costs about
+    F/250 CloudWatch calls, not N*2F.
+
+    Args:
+        strict: Raise if a batch fails instead of reporting its functions as 0.0
+            (used when a watermark would otherwise skip past missing data).
+
+    Returns:
+        {window_end: {function_name: {"Invocations": float, "Duration": float}}}
     """
-    # Use the deterministic window_end passed from the aggregator so repeated
-    # runs for the same bucket look at exactly the same CloudWatch range.
-    end_time = window_end
-    start_time = end_time - timedelta(seconds=window_seconds)
-    
-    # Get total duration in milliseconds
-    total_duration_ms = get_cloudwatch_metric_sum(
-        function_name,
-        "Duration",
-        start_time,
-        end_time,
-        window_seconds,
+    windows = sorted(set(window_ends))
+    names = list(dict.fromkeys(function_names))
+    sums = {
+        window_end: {name: {metric: 0.0 for metric in LAMBDA_USAGE_METRICS} for name in names}
+        for window_end in windows
+    }
+    if not windows:
+        return sums
+
+    data = get_lambda_metric_data(
+        names,
+        {metric: "Sum" for metric in LAMBDA_USAGE_METRICS},
+        period_seconds=window_seconds,
+        start_time=windows[0] - timedelta(seconds=window_seconds),
+        end_time=windows[-1],
+        strict=strict,
     )
-    
+    for name, by_metric in data.items():
+        for metric, points in by_metric.items():
+            for timestamp, value in points:
+                window_end = _window_bucket_end(timestamp, window_seconds) + timedelta(seconds=window_seconds)
+                if window_end in sums:
+                    sums[window_end][name][metric] += value
+    return sums
+
+
+def _duration_to_gb_seconds(total_duration_ms: float, memory_mb: int) -> float:
+    """Convert summed Duration (ms) at a memory size (MB) into GB-Seconds."""
     if total_duration_ms == 0:
         return 0.0
-    
-    # Convert to GB-Seconds
-    # Duration: ms → seconds (/ 1000)
-    # Memory: MB → GB (/ 1024)
-    # Result in GB-Seconds
-    duration_seconds = total_duration_ms / 1000.0
-    memory_gb = memory_mb / 1024.0
-    gb_seconds = duration_seconds * memory_gb
-    
-    return gb_seconds
+    return (total_duration_ms / 1000.0) * (memory_mb / 1024.0)
+
+
+def _resolve_function_name(svc: Dict) -> Optional[str]:
+    """
+    Full Lambda function name for a web-app service.
+
+    Prefers the stored function_name; falls back to deriving it from
+    github_url for services that don't have function_name stored.
+    """
+    stored_function_name = svc.get("function_name")
+    if stored_function_name:
+        # Apply shorlabs- prefix to get full Lambda function name
+        return get_lambda_function_name(stored_function_name)
+
+    project_name = extract_project_name(svc.get("github_url", ""))
+    if not project_name:
+        return None
+    return get_lambda_function_name(project_name)
 
 
 def _get_ecs_uptime_metrics(service: Dict, window_seconds: int) -> tuple:
@@ -230,62 +297,58 @@ def _get_ecs_uptime_metrics(service: Dict, window_seconds: int) -> tuple:
 
 
 def get_all_services() -> List[Dict]:
-    """Get all web-app and web-service items from DynamoDB."""
-    table = get_or_create_table()
-    
-    # Scan for service items only (not project containers)
-    # In production with many users, use pagination
-    response = table.scan(
-        FilterExpression="entity_type = :et AND service_type IN (:st1, :st2)",
-        ExpressionAttributeValues={
-            ":et": "service",
-            ":st1": "web-app",
-            ":st2": "web-service",
-        },
-    )
-    
-    return response.get("Items", [])
-
-
-def _get_build_seconds_for_service(
-    service_id: str,
+    """Get all web-app and web-service items from DynamoDB (paginated scan)."""
+    table = get_or_create_services_table()
+    items = []
+    last_key = None
+
+    while True:
+        scan_kwargs = {
+            "FilterExpression": "entity_type = :et AND service_type IN (:st1, :st2)",
+            "ExpressionAttributeValues": {
+                ":et": "service",
+                ":st1": "web-app",
+                ":st2": "web-service",
+            },
+        }
+        if last_key:
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+        response = table.scan(**scan_kwargs)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+
+    return items
+
+
+def get_build_seconds_by_service(
     *,
     window_seconds: int,
     window_end: datetime,
-) -> float:
+) -> Dict[str, float]:
     """
-    Calculate total build time in seconds for a service within the aggregation window.
+    Total build time in seconds per service within the aggregation window.
 
     We derive build time from deployment records:
-      - Each deployment has started_at / finished_at timestamps
-      - We include deployments whose started_at falls inside the window
+      - Deployments whose started_at falls inside the window come from one
+        range query on started-hour-index (fleet-wide, not per service)
       - Duration is (finished_at - started_at) in seconds (or until window_end if unfinished)
 
     This gives us per-service build time that we can aggregate per organization and
     send to Autumn as a separate "build_seconds" feature.
     """
-    deployments = list_deployments(service_id)
-    if not deployments:
-        return 0.0
-
     window_start = window_end - timedelta(seconds=window_seconds)
-    total_seconds = 0.0
-
-    for dep in deployments:
-        started_at = dep.get("started_at")
-        if not started_at:
-            continue
+    build_seconds: Dict[str, float] = {}
 
+    for dep in list_deployments_started_between(window_start, window_end):
         try:
-            start_dt = datetime.fromisoformat(started_at)
+            start_dt = datetime.fromisoformat(dep["started_at"])
         except Exception:
             # Ignore malformed timestamps
             continue
 
-        # Only count deployments that started within this window bucket
-        if not (window_start <= start_dt <= window_end):
-            continue
-
         finished_at = dep.get("finished_at")
         if finished_at:
             try:
@@ -298,219 +361,458 @@ def _get_build_seconds_for_service(
 
         # Guard against negative durations if timestamps are out of order
         duration_seconds = max(0.0, (end_dt - start_dt).total_seconds())
-        total_seconds += duration_seconds
+        # Deployment items store the service_id in project_id
+        service_id = dep.get("project_id")
+        build_seconds[service_id] = build_seconds.get(service_id, 0.0) + duration_seconds
 
-    return total_seconds
+    return build_seconds
 
 
-def aggregate_usage_metrics():
+def _run_stage(
+    name: str,
+    items: Dict,
+    fn: Callable,
+    max_workers: int = USAGE_AGGREGATION_CONCURRENCY,
+) -> Tuple[Dict, Dict]:
     """
-    Main aggregation function - called by EventBridge hourly.
-    
-    Fetches CloudWatch metrics for all projects and syncs to Autumn.
+    Run fn(key, item) for every entry on a bounded worker pool.
+
+    A failure only affects its own key. Returns (results, errors) keyed like
+    items and logs the stage duration.
     """
-    print(f"🔄 Starting usage metrics aggregation at {datetime.utcnow().isoformat()}")
-    
-    # Get all web-app services
-    services = get_all_services()
-    print(f"📊 Found {len(services)} services to aggregate")
-    
-    if not services:
-        print("✅ No services to aggregate")
-        return
-    
-    # Group services by organization_id (orgs are the billing entity)
+    start = time.time()
+    results = {}
+    errors = {}
+
+    if items:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+            futures = {executor.submit(fn, key, item): key for key, item in items.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    errors[key] = e
+                    print(f"  ❌ [{name}] {key}: {e}")
+
+    print(f"⏱️ Stage {name}: {len(results)} ok, {len(errors)} failed in {time.time() - start:.2f}s")
+    return results, errors
+
+
+def _service_usage(
+    svc: Dict,
+    *,
+    function_name: Optional[str],
+    metric_sums: Dict[str, Dict[str, float]],
+    build_seconds: float,
+    window_seconds: int,
+) -> Dict[str, float]:
+    """Usage for one LIVE service in the window, keyed by Autumn feature ID."""
+    usage = {feature: 0.0 for feature in USAGE_FEATURES}
+    service_type = svc.get("service_type", "web-app")
+
+    # Deployment/build time (seconds) from the windowed deployments query
+    usage["build_seconds"] = build_seconds
+
+    if service_type == "web-app":
+        # ── Lambda: CloudWatch metrics from the batched fetch ─────
+        sums = metric_sums.get(function_name, {})
+        usage["invocations"] = float(int(sums.get("Invocations", 0.0)))
+        usage["compute"] = _duration_to_gb_seconds(sums.get("Duration", 0.0), int(svc.get("memory", 1024)))
+
+        if usage["invocations"] > 0 or usage["compute"] > 0 or usage["build_seconds"] > 0:
+            print(
+                f"  📈 {function_name}: "
+                f"{int(usage['invocations'])} invocations, "
+                f"{usage['compute']:.2f} GB-s, "
+                f"{usage['build_seconds']:.1f} build-s"
+            )
+
+    elif service_type == "web-service":
+        # ── ECS: wall-clock uptime billing ────────────────────────
+        usage["vcpu_time"], usage["memory_time"] = _get_ecs_uptime_metrics(svc, window_seconds)
+
+        if usage["vcpu_time"] > 0 or usage["memory_time"] > 0 or usage["build_seconds"] > 0:
+            svc_name = svc.get("function_name") or svc.get("name", "unknown")
+            print(
+                f"  📈 ECS {svc_name}: "
+                f"{usage['vcpu_time']:.0f} vCPU-s, "
+                f"{usage['memory_time']:.2f} mem-GB-s, "
+                f"{usage['build_seconds']:.1f} build-s"
+            )
+
+    return usage
+
+
+def group_services_by_org(services: List[Dict]) -> Dict[str, List[Dict]]:
+    """Group service items by organization_id (orgs are the billing entity)."""
     orgs_services: Dict[str, List[Dict]] = {}
     for svc in services:
         org_id = svc.get("organization_id")
         if not org_id:
             continue
-        if org_id not in orgs_services:
-            orgs_services[org_id] = []
-        orgs_services[org_id].append(svc)
-    
-    print(f"🏢 Aggregating for {len(orgs_services)} organizations")
-    
-    # Period label for logging only
-    period = datetime.utcnow().strftime("%Y-%m")
+        orgs_services.setdefault(org_id, []).append(svc)
+    return orgs_services
+
+
+def current_usage_window() -> Tuple[int, datetime]:
+    """(window_seconds, window_end) for the bucket that just closed."""
     window_seconds = _get_aggregation_window_seconds()
-    window_end = _window_bucket_end(datetime.utcnow(), window_seconds)
-    window_key = window_end.strftime("%Y%m%dT%H%M%SZ")
-    
-    # Aggregate metrics for each organization
-    total_requests = 0
-    total_gb_seconds = 0.0
-    total_build_seconds = 0.0
-    total_vcpu_seconds = 0.0
-    total_memory_seconds = 0.0
-
-    for org_id, org_svcs in orgs_services.items():
-        org_requests = 0
-        org_gb_seconds = 0.0
-        org_build_seconds = 0.0
-        org_vcpu_seconds = 0.0
-        org_memory_seconds = 0.0
+    return window_seconds, _window_bucket_end(datetime.utcnow(), window_seconds)
 
-        for svc in org_svcs:
-            # Skip if service is not LIVE
+
+def usage_window_key(window_end: datetime) -> str:
+    """Deterministic window label used in Autumn idempotency keys."""
+    return window_end.strftime("%Y%m%dT%H%M%SZ")
+
+
+def pending_usage_windows(
+    window_seconds: int,
+    latest_end: datetime,
+    watermark: Optional[datetime],
+    max_windows: int,
+) -> List[datetime]:
+    """
+    Window ends after the watermark up to latest_end, oldest first.
+
+    Without a watermark (first run) only latest_end is pending. At most
+    max_windows are returned; the rest are picked up by the next run.
+    """
+    if watermark is None:
+        return [latest_end]
+
+    windows = []
+    window_end = _window_bucket_end(watermark, window_seconds) + timedelta(seconds=window_seconds)
+    while window_end <= latest_end and len(windows) < max_windows:
+        windows.append(window_end)
+        window_end += timedelta(seconds=window_seconds)
+    return windows
+
+
+def iter_usage_windows(window_seconds: int, start: datetime, end: datetime) -> List[datetime]:
+    """Window ends of every bucket fully inside [start, end]."""
+    windows = []
+    window_end = _window_bucket_end(start, window_seconds)
+    if window_end < start:
+        window_end += timedelta(seconds=window_seconds)
+    window_end += timedelta(seconds=window_seconds)
+    while window_end <= end:
+        windows.append(window_end)
+        window_end += timedelta(seconds=window_seconds)
+    return windows
+
+
+def aggregate_usage_metrics(max_windows: int = USAGE_MAX_CATCHUP_WINDOWS) -> List[dict]:
+    """
+    Main aggregation function - called by EventBridge hourly.
+
+    Bills every window between the stored watermark and the bucket that just
+    closed, so a failed, timed-out or skipped run is caught up by the next
+    one. The watermark only moves past a window once it was billed without
+    errors.
+
+    Aggregates every org in this invocation. For fleets too large for one
+    Lambda run, see api.usage_sharding (USAGE_SHARD_COUNT).
+    """
+    print(f"🔄 Starting usage metrics aggregation at {datetime.utcnow().isoformat()}")
+
+    window_seconds, latest_end = current_usage_window()
+    watermark = get_usage_watermark()
+    windows = pending_usage_windows(
+        window_seconds,
+        latest_end,
+        datetime.fromisoformat(watermark) if watermark else None,
+        max_windows,
+    )
+    if not windows:
+        print(f"✅ Usage is up to date (watermark {watermark})")
+        return []
+    print(f"🪟 {len(windows)} pending window(s) after watermark {watermark}")
+
+    services = get_all_services()
+    print(f"📊 Found {len(services)} services to aggregate")
+
+    if not services:
+        print("✅ No services to aggregate")
+        advance_usage_watermark(windows[-1].isoformat())
+        return []
+
+    results = process_usage_windows(
+        group_services_by_org(services),
+        window_seconds=window_seconds,
+        window_ends=windows,
+        on_window_done=lambda window_end: advance_usage_watermark(window_end.isoformat()),
+    )
+    print(f"💸 Autumn: {autumn.get_autumn_stats()}")
+    return results
+
+
+def process_usage_windows(
+    orgs_services: Dict[str, List[Dict]],
+    *,
+    window_seconds: int,
+    window_ends: List[datetime],
+    on_window_done: Optional[Callable[[datetime], object]] = None,
+) -> List[dict]:
+    """
+    Aggregate several windows in order with one batched CloudWatch fetch.
+
+    on_window_done(window_end) runs after each window billed cleanly; the
+    first window with errors stops the run so later windows are not marked
+    done ahead of it. Quota is enforced once, after the last window.
+    """
+    window_ends = sorted(window_ends)
+    _, function_names = _live_services(orgs_services)
+    metric_sums = get_lambda_metric_sums_by_window(
+        list(function_names.values()),
+        window_seconds=window_seconds,
+        window_ends=window_ends,
+        strict=True,
+    )
+
+    results = []
+    for i, window_end in enumerate(window_ends):
+        result = aggregate_orgs_usage(
+            orgs_services,
+            window_seconds=window_seconds,
+            window_end=window_end,
+            metric_sums=metric_sums[window_end],
+            enforce_quota=(i == len(window_ends) - 1),
+        )
+        results.append(result)
+        if result["errors"]:
+            print(f"⚠️ Window {result['window_key']} had {result['errors']} error(s); stopping before later windows")
+            break
+        if on_window_done:
+            on_window_done(window_end)
+    return results
+
+
+def _live_services(orgs_services: Dict[str, List[Dict]]) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+    """LIVE services by service_id, and Lambda function names for LIVE web-apps."""
+    live_services = {}
+    function_names = {}
+    for svc_list in orgs_services.values():
+        for svc in svc_list:
             if svc.get("status") != "LIVE":
                 continue
+            if svc.get("service_type", "web-app") == "web-app":
+                function_name = _resolve_function_name(svc)
+                if not function_name:
+                    continue
+                function_names[svc["service_id"]] = function_name
+            live_services[svc["service_id"]] = svc
+    return live_services, function_names
 
-            service_type = svc.get("service_type", "web-app")
-
-            if service_type == "web-app":
-                # ── Lambda: fetch CloudWatch metrics ──────────────────
-                # Get function name - prefer stored function_name, fallback to deriving from github_url
-                # for backwards compatibility with services that don't have function_name stored
-                stored_function_name = svc.get("function_name")
-                if stored_function_name:
-                    # Apply shorlabs- prefix to get full Lambda function name
-                    function_name = get_lambda_function_name(stored_function_name)
-                else:
-                    # Fallback: derive from github_url and apply prefix
-                    project_name = extract_project_name(svc.get("github_url", ""))
-                    if not project_name:
-                        continue
-                    function_name = get_lambda_function_name(project_name)
 
-                memory_mb = int(svc.get("memory", 1024))
-                # Fetch metrics from CloudWatch
-                try:
-                    invocations = get_invocations(
-                        function_name,
-                        window_seconds=window_seconds,
-                        window_end=window_end,
-                    )
-                    gb_seconds = get_gb_seconds(
-                        function_name,
-                        memory_mb,
-                        window_seconds=window_seconds,
-                        window_end=window_end,
-                    )
+def aggregate_orgs_usage(
+    orgs_services: Dict[str, List[Dict]],
+    *,
+    window_seconds: int,
+    window_end: datetime,
+    metric_sums: Optional[Dict[str, Dict[str, float]]] = None,
+    enforce_quota: bool = True,
+) -> dict:
+    """
+    Aggregate, bill and enforce quota for a set of orgs in one window.
 
-                    # Deployment/build time (seconds) from deployments table
-                    build_seconds = _get_build_seconds_for_service(
-                        svc.get("service_id"),
-                        window_seconds=window_seconds,
-                        window_end=window_end,
-                    )
+    Runs as a staged pipeline, each stage on a bounded worker pool with its
+    own timing and per-item error isolation:
 
-                    if invocations > 0 or gb_seconds > 0 or build_seconds > 0:
-                        print(
-                            f"  📈 {function_name}: "
-                            f"{invocations} invocations, "
-                            f"{gb_seconds:.2f} GB-s, "
-                            f"{build_seconds:.1f} build-s"
-                        )
-                        org_requests += invocations
-                        org_gb_seconds += gb_seconds
-                        org_build_seconds += build_seconds
+    1. fetch_metrics:   batched CloudWatch read + one windowed deployments query
+    2. compute_totals:  per-org sums of each billable feature
+    3. write_rollups:   hourly org + per-service rollups in the usage table
+       (served by GET /api/projects/usage without calling Autumn)
+    4. sync_billing:    one Autumn /track per org/feature
+    5. enforce_quota:   check_and_enforce_quota per org (after billing sync)
 
-                except Exception as e:
-                    print(f"  ❌ Error aggregating {function_name}: {e}")
-                    continue
+    Idempotency keys are derived from org, feature and window bucket only,
+    so re-running a window (or a shard of it) never double-counts.
 
-            elif service_type == "web-service":
-                # ── ECS: wall-clock uptime billing ────────────────────
-                svc_name = svc.get("function_name") or svc.get("name", "unknown")
-                try:
-                    vcpu_s, mem_s = _get_ecs_uptime_metrics(svc, window_seconds)
+    Args:
+        metric_sums: Prefetched CloudWatch sums for this window (see
+            get_lambda_metric_sums_by_window); fetched here when omitted.
+        enforce_quota: Run stage 5 (skipped for all but the last catch-up window)
 
-                    build_seconds = _get_build_seconds_for_service(
-                        svc.get("service_id"),
-                        window_seconds=window_seconds,
-                        window_end=window_end,
-                    )
+    Returns:
+        {"window_key", "totals" (by Autumn feature ID), "errors"}; errors counts
+        services, rollup writes and track calls that failed, i.e. usage not
+        billed or recorded yet.
+    """
+    pipeline_start = time.time()
+    print(f"🏢 Aggregating for {len(orgs_services)} organizations")
 
-                    if vcpu_s > 0 or mem_s > 0 or build_seconds > 0:
-                        print(
-                            f"  📈 ECS {svc_name}: "
-                            f"{vcpu_s:.0f} vCPU-s, "
-                            f"{mem_s:.2f} mem-GB-s, "
-                            f"{build_seconds:.1f} build-s"
-                        )
-                        org_vcpu_seconds += vcpu_s
-                        org_memory_seconds += mem_s
-                        org_build_seconds += build_seconds
+    window_key = usage_window_key(window_end)
 
-                except Exception as e:
-                    print(f"  ❌ Error aggregating ECS {svc_name}: {e}")
-                    continue
+    # ── Stage 1: fetch metrics ───────────────────────────────────
+    live_services, function_names = _live_services(orgs_services)
+
+    if metric_sums is None:
+        metric_sums = get_lambda_metric_sums(
+            list(function_names.values()),
+            window_seconds=window_seconds,
+            window_end=window_end,
+        )
+
+    build_seconds = get_build_seconds_by_service(
+        window_seconds=window_seconds,
+        window_end=window_end,
+    )
+
+    service_usage, usage_errors = _run_stage(
+        "fetch_metrics",
+        live_services,
+        lambda sid, svc: _service_usage(
+            svc,
+            function_name=function_names.get(sid),
+            metric_sums=metric_sums,
+            build_seconds=build_seconds.get(sid, 0.0),
+            window_seconds=window_seconds,
+        ),
+    )
+
+    # ── Stage 2: per-org totals ──────────────────────────────────
+    def org_totals(org_id: str, org_svcs: List[Dict]) -> Dict[str, float]:
+        totals = {feature: 0.0 for feature in USAGE_FEATURES}
+        for svc in org_svcs:
+            usage = service_usage.get(svc.get("service_id"))
+            if not usage:
+                continue
+            for feature in USAGE_FEATURES:
+                totals[feature] += usage[feature]
+        return totals
+
+    org_usage, _ = _run_stage("compute_totals", orgs_services, org_totals)
+
+    # ── Stage 3: hourly rollups (idempotent per window) ──────────
+    # A window is attributed to the hour it starts in.
+    rollup_hour = usage_rollup_hour(window_end - timedelta(seconds=window_seconds))
+    rollup_writes = {(org_id, None): totals for org_id, totals in org_usage.items()}
+    for sid, usage in service_usage.items():
+        org_id = live_services[sid].get("organization_id")
+        if org_id in org_usage:
+            rollup_writes[(org_id, sid)] = usage
+
+    def write_rollup(key: Tuple[str, Optional[str]], usage: Dict[str, float]) -> bool:
+        org_id, sid = key
+        return add_usage_rollup(org_id, rollup_hour, window_key, usage, service_id=sid)
+
+    _, rollup_errors = _run_stage("write_rollups", rollup_writes, write_rollup)
+    if rollup_writes:
+        mark_usage_rollups_since(rollup_hour)
+
+    # ── Stage 4: sync to Autumn (sole source of truth for billing) ─
+    # One idempotency key per org/feature/window so repeated runs don't
+    # double-count usage for the same bucket.
+    track_calls = {
+        (org_id, feature): value
+        for org_id, totals in org_usage.items()
+        for feature, value in totals.items()
+        if value > 0
+    }
+
+    def track(key: Tuple[str, str], value: float) -> None:
+        org_id, feature = key
+        synced = _autumn_track_usage(
+            customer_id=org_id,
+            feature_id=feature,
+            value=float(value),
+            idempotency_key=f"{org_id}:{feature}:{window_key}",
+        )
+        if not synced:
+            raise RuntimeError(f"Autumn did not record {feature}")
+
+    _, track_errors = _run_stage("sync_billing", track_calls, track)
+
+    errors = len(usage_errors) + len(rollup_errors) + len(track_errors)
+
+    # ── Stage 5: quota enforcement for hobby orgs ────────────────
+    if not enforce_quota:
+        return _window_result(window_key, org_usage, errors, pipeline_start)
 
-        # Sync usage to Autumn (sole source of truth for billing)
-        has_lambda_usage = org_requests > 0 or org_gb_seconds > 0
-        has_ecs_usage = org_vcpu_seconds > 0 or org_memory_seconds > 0
-        has_build_usage = org_build_seconds > 0
-
-        if has_lambda_usage or has_ecs_usage or has_build_usage:
-            total_requests += org_requests
-            total_gb_seconds += org_gb_seconds
-            total_build_seconds += org_build_seconds
-            total_vcpu_seconds += org_vcpu_seconds
-            total_memory_seconds += org_memory_seconds
-
-            # Sync to Autumn (feature IDs must match the dashboard) using an
-            # idempotency key per org/feature/window so repeated runs don't
-            # double-count usage for the same bucket.
-            if org_requests > 0:
-                _autumn_track_usage(
-                    customer_id=org_id,
-                    feature_id="invocations",
-                    value=float(org_requests),
-                    idempotency_key=f"{org_id}:invocations:{window_key}",
-                )
-            if org_gb_seconds > 0:
-                _autumn_track_usage(
-                    customer_id=org_id,
-                    feature_id="compute",
-                    value=float(org_gb_seconds),
-                    idempotency_key=f"{org_id}:compute:{window_key}",
-                )
-            if org_build_seconds > 0:
-                _autumn_track_usage(
-                    customer_id=org_id,
-                    feature_id="build_seconds",
-                    value=float(org_build_seconds),
-                    idempotency_key=f"{org_id}:build_seconds:{window_key}",
-                )
-            if org_vcpu_seconds > 0:
-                _autumn_track_usage(
-                    customer_id=org_id,
-                    feature_id="vcpu_time",
-                    value=float(org_vcpu_seconds),
-                    idempotency_key=f"{org_id}:vcpu_time:{window_key}",
-                )
-            if org_memory_seconds > 0:
-                _autumn_track_usage(
-                    customer_id=org_id,
-                    feature_id="memory_time",
-                    value=float(org_memory_seconds),
-                    idempotency_key=f"{org_id}:memory_time:{window_key}",
-                )
-    
-    # ── Quota enforcement for hobby orgs ─────────────────────────
     print("🛡️ Running quota enforcement pass...")
     from api.quota_enforcer import check_and_enforce_quota
 
-    for org_id in orgs_services.keys():
-        try:
-            result = check_and_enforce_quota(org_id)
-            if result == "throttled":
-                print(f"  🚫 ORG {org_id} throttled (quota exceeded)")
-            elif result == "already_throttled":
-                print(f"  🚫 ORG {org_id} already throttled")
-            elif result == "unthrottled":
-                print(f"  ✅ ORG {org_id} unthrottled (quota restored)")
-        except Exception as e:
-            print(f"  ❌ Quota enforcement error for {org_id}: {e}")
+    def enforce(org_id: str, _) -> Optional[str]:
+        result = check_and_enforce_quota(org_id)
+        if result == "throttled":
+            print(f"  🚫 ORG {org_id} throttled (quota exceeded)")
+        elif result == "already_throttled":
+            print(f"  🚫 ORG {org_id} already throttled")
+        elif result == "unthrottled":
+            print(f"  ✅ ORG {org_id} unthrottled (quota restored)")
+        return result
+
+    _run_stage("enforce_quota", {org_id: None for org_id in orgs_services}, enforce)
+
+    return _window_result(window_key, org_usage, errors, pipeline_start)
+
 
-    print(f"🎉 Aggregation + enforcement complete!")
+def _window_result(window_key: str, org_usage: Dict[str, Dict[str, float]], errors: int, started: float) -> dict:
+    """Log fleet totals for a window and build aggregate_orgs_usage's return value."""
+    totals = {feature: sum(t[feature] for t in org_usage.values()) for feature in USAGE_FEATURES}
+    print(f"🎉 Window {window_key} complete in {time.time() - started:.2f}s ({errors} error(s))")
     print(
-        f"   Total: {total_requests} requests, "
-        f"{total_gb_seconds:.2f} GB-Seconds, "
-        f"{total_build_seconds:.1f} build-seconds, "
-        f"{total_vcpu_seconds:.0f} vCPU-seconds, "
-        f"{total_memory_seconds:.2f} mem-GB-seconds"
+        f"   Total: {int(totals['invocations'])} requests, "
+        f"{totals['compute']:.2f} GB-Seconds, "
+        f"{totals['build_seconds']:.1f} build-seconds, "
+        f"{totals['vcpu_time']:.0f} vCPU-seconds, "
+        f"{totals['memory_time']:.2f} mem-GB-seconds"
     )
-    print(f"   Period: {period}")
-    print(f"   Window: {window_seconds}s ending {window_key}")
+    return {"window_key": window_key, "totals": totals, "errors": errors}
+
+
+def backfill_usage(
+    start: datetime,
+    end: datetime,
+    org_ids: Optional[List[str]] = None,
+) -> List[dict]:
+    """
+    Re-aggregate every window fully inside [start, end] (UTC).
+
+    Uses the same idempotency keys as the scheduled run, so windows Autumn
+    already has are no-ops. Does not move the watermark.
+    """
+    window_seconds = _get_aggregation_window_seconds()
+    windows = iter_usage_windows(window_seconds, start, end)
+    orgs_services = group_services_by_org(get_all_services())
+    if org_ids:
+        orgs_services = {org_id: svcs for org_id, svcs in orgs_services.items() if org_id in org_ids}
+
+    print(f"⏪ Backfilling {len(windows)} window(s) of {window_seconds}s for {len(orgs_services)} org(s)")
+
+    results = []
+    # Chunked so each GetMetricData query stays well under its datapoint limit
+    for offset in range(0, len(windows), USAGE_MAX_CATCHUP_WINDOWS):
+        chunk = windows[offset:offset + USAGE_MAX_CATCHUP_WINDOWS]
+        chunk_results = process_usage_windows(orgs_services, window_seconds=window_seconds, window_ends=chunk)
+        results.extend(chunk_results)
+        if len(chunk_results) < len(chunk) or chunk_results[-1]["errors"]:
+            print("❌ Backfill stopped at the first window with errors; re-run from there")
+            break
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backfill usage billing for a date range (UTC)")
+    parser.add_argument("--start", required=True, help="Range start, ISO format (e.g. 2026-10-01T00:00)")
+    parser.add_argument("--end", required=True, help="Range end, ISO format")
+    parser.add_argument("--org", action="append", dest="org_ids", help="Limit to an org (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="List the windows without billing")
+    args = parser.parse_args()
+
+    start = datetime.fromisoformat(args.start)
+    end = min(datetime.fromisoformat(args.end), current_usage_window()[1])
+    if args.dry_run:
+        for window_end in iter_usage_windows(_get_aggregation_window_seconds(), start, end):
+            print(f"  {usage_window_key(window_end)}")
+        return
+
+    results = backfill_usage(start, end, org_ids=args.org_ids)
+    print(f"✅ Backfilled {sum(1 for r in results if not r['errors'])} window(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""
+Sharded Usage Aggregation - fan the hourly run out across SQS workers
+
+A single aggregate_usage_metrics() invocation has to finish every org inside
+one Lambda run. With USAGE_SHARD_COUNT > 0 the EventBridge "aggregate_usage"
+action runs a coordinator instead:
+
+1. Coordinator: advance the watermark over windows already DONE, collect
+   the pending windows after it (same deterministic window_keys as the
+   inline run), split orgs into consistent-hash shards, record each window
+   in the tracker and enqueue one "usage_shard" message per shard carrying
+   every pending window.
+2. Worker (_handle_sqs_event): load the shard's services, run the normal
+   aggregation pipeline for each window (one batched CloudWatch fetch), and
+   report the shard per window. A window is DONE once every shard reported;
+   the next coordinator run moves the watermark past it.
+
+Orgs are never split across shards, so per-org quota enforcement stays
+correct. Autumn idempotency keys only depend on org/feature/window, so a
+redelivered shard message cannot double-count.
+
+Without a queue (local dev, DEPLOY_QUEUE_URL unset) the coordinator uses
+InMemoryShardQueue / InMemoryWindowTracker and drains shards in-process.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import boto3
+
+from api.db.dynamodb import (
+    USAGE_WINDOW_DONE,
+    USAGE_WINDOW_RUNNING,
+    advance_usage_watermark,
+    complete_usage_shard,
+    get_usage_watermark,
+    get_usage_window,
+    list_all_org_services,
+    mark_usage_window_done,
+    start_usage_window,
+)
+from api.usage_aggregator import (
+    USAGE_MAX_CATCHUP_WINDOWS,
+    _run_stage,
+    current_usage_window,
+    get_all_services,
+    pending_usage_windows,
+    process_usage_windows,
+    usage_window_key,
+)
+
+
+# Configuration
+USAGE_SHARD_COUNT = int(os.environ.get("USAGE_SHARD_COUNT", "0"))  # 0 = aggregate inline
+USAGE_SHARD_VNODES = 64  # Virtual nodes per shard on the hash ring
+USAGE_SHARD_MESSAGE_TYPE = "usage_shard"
+AGGREGATED_SERVICE_TYPES = ("web-app", "web-service")
+
+
+# ─────────────────────────────────────────────────────────────
+# CONSISTENT-HASH SHARDING
+# ─────────────────────────────────────────────────────────────
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class ShardRing:
+    """
+    Consistent-hash ring mapping org IDs to shard numbers.
+
+    Each shard owns USAGE_SHARD_VNODES points on the ring; an org belongs to
+    the first point at or after its hash. Changing the shard count only
+    moves the orgs that land on the added/removed points.
+    """
+
+    def __init__(self, shard_count: int, vnodes: int = USAGE_SHARD_VNODES):
+        if shard_count < 1:
+            raise ValueError("shard_count must be >= 1")
+        self.shard_count = shard_count
+        points = sorted(
+            (_ring_hash(f"shard-{shard}#{v}"), shard)
+            for shard in range(shard_count)
+            for v in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, org_id: str) -> int:
+        idx = bisect.bisect_left(self._hashes, _ring_hash(org_id))
+        if idx == len(self._hashes):
+            idx = 0
+        return self._shards[idx]
+
+    def assign(self, org_ids: List[str]) -> Dict[int, List[str]]:
+        """Group org IDs by shard (every shard present, possibly empty)."""
+        shards = {shard: [] for shard in range(self.shard_count)}
+        for org_id in sorted(set(org_ids)):
+            shards[self.shard_for(org_id)].append(org_id)
+        return shards
+
+
+# ─────────────────────────────────────────────────────────────
+# COMPLETION TRACKER
+# ─────────────────────────────────────────────────────────────
+
+class DynamoWindowTracker:
+    """Window completion tracker and watermark backed by the usage table (see api.db.dynamodb)."""
+
+    def start(self, window_key: str, shard_count: int) -> dict:
+        return start_usage_window(window_key, shard_count)
+
+    def get(self, window_key: str) -> Optional[dict]:
+        return get_usage_window(window_key)
+
+    def complete(self, window_key: str, shard: int) -> bool:
+        """Report a shard; True when this call completed the whole window."""
+        item = complete_usage_shard(window_key, shard)
+        if not item:
+            print(f"⚠️ Usage window {window_key} has no tracker item; shard {shard} not recorded")
+            return False
+        if len(item.get("completed_shards", ())) < int(item["shard_count"]):
+            return False
+        return mark_usage_window_done(window_key)
+
+    def get_watermark(self) -> Optional[str]:
+        return get_usage_watermark()
+
+    def advance_watermark(self, window_end: str) -> bool:
+        return advance_usage_watermark(window_end)
+
+
+class InMemoryWindowTracker:
+    """Process-local stand-in for DynamoWindowTracker (local runs and tests)."""
+
+    def __init__(self, watermark: Optional[str] = None):
+        self.windows: Dict[str, dict] = {}
+        self.watermark = watermark
+
+    def start(self, window_key: str, shard_count: int) -> dict:
+        return self.windows.setdefault(window_key, {
+            "window_key": window_key,
+            "shard_count": shard_count,
+            "completed_shards": set(),
+            "status": USAGE_WINDOW_RUNNING,
+        })
+
+    def get(self, window_key: str) -> Optional[dict]:
+        return self.windows.get(window_key)
+
+    def complete(self, window_key: str, shard: int) -> bool:
+        window = self.windows.get(window_key)
+        if not window:
+            return False
+        window["completed_shards"].add(shard)
+        if window["status"] == USAGE_WINDOW_DONE or len(window["completed_shards"]) < window["shard_count"]:
+            return False
+        window["status"] = USAGE_WINDOW_DONE
+        return True
+
+    def get_watermark(self) -> Optional[str]:
+        return self.watermark
+
+    def advance_watermark(self, window_end: str) -> bool:
+        if self.watermark and self.watermark >= window_end:
+            return False
+        self.watermark = window_end
+        return True
+
+
+# ─────────────────────────────────────────────────────────────
+# QUEUE
+# ─────────────────────────────────────────────────────────────
+
+class InMemoryShardQueue:
+    """
+    Process-local stand-in for the SQS client (send_message only).
+
+    Messages are kept in order and delivered by drain(), which calls the
+    handler with each decoded body, the same way _handle_sqs_event would.
+    """
+
+    def __init__(self):
+        self.messages: List[dict] = []
+
+    def send_message(self, QueueUrl: str = "", MessageBody: str = "", **kwargs) -> dict:
+        message_id = str(uuid.uuid4())
+        self.messages.append({"MessageId": message_id, "Body": MessageBody, **kwargs})
+        return {"MessageId": message_id}
+
+    def drain(self, handler: Callable[[dict], dict]) -> List[dict]:
+        results = []
+        while self.messages:
+            message = self.messages.pop(0)
+            results.append(handler(json.loads(message["Body"])))
+        return results
+
+
+def _use_local_queue() -> bool:
+    return not os.environ.get("AWS_LAMBDA_FUNCTION_NAME") or not os.environ.get("DEPLOY_QUEUE_URL")
+
+
+# ─────────────────────────────────────────────────────────────
+# COORDINATOR / WORKER
+# ─────────────────────────────────────────────────────────────
+
+def enqueue_usage_shards(
+    shard_count: Optional[int] = None,
+    queue=None,
+    tracker=None,
+    max_windows: int = USAGE_MAX_CATCHUP_WINDOWS,
+) -> dict:
+    """
+    Coordinator: enqueue one message per shard covering every pending window.
+
+    Args:
+        shard_count: Number of shards (defaults to USAGE_SHARD_COUNT)
+        queue: SQS client or InMemoryShardQueue. Defaults to SQS on Lambda
+            with DEPLOY_QUEUE_URL set, otherwise an in-memory queue that is
+            drained in-process before returning.
+        tracker: Completion tracker (defaults to match the queue)
+        max_windows: Most windows to catch up in one run
+    """
+    shard_count = shard_count or USAGE_SHARD_COUNT or 1
+    local = queue is None and _use_local_queue()
+    if queue is None:
+        queue = InMemoryShardQueue() if local else boto3.client("sqs")
+    if tracker is None:
+        tracker = InMemoryWindowTracker() if local else DynamoWindowTracker()
+
+    window_seconds, latest_end = current_usage_window()
+    watermark = tracker.get_watermark()
+    candidates = pending_usage_windows(
+        window_seconds,
+        latest_end,
+        datetime.fromisoformat(watermark) if watermark else None,
+        max_windows,
+    )
+
+    # Move the watermark over the leading run of finished windows; enqueue
+    # the rest. A re-run of the coordinator keeps each window's shard layout.
+    pending: Dict[int, List[datetime]] = {}
+    contiguous = True
+    for window_end in candidates:
+        window = tracker.get(usage_window_key(window_end))
+        if window and window.get("status") == USAGE_WINDOW_DONE:
+            if contiguous:
+                tracker.advance_watermark(window_end.isoformat())
+            continue
+        contiguous = False
+        window = window or tracker.start(usage_window_key(window_end), shard_count)
+        pending.setdefault(int(window["shard_count"]), []).append(window_end)
+
+    if not pending:
+        print(f"✅ Usage is up to date (watermark {tracker.get_watermark()})")
+        return {"windows": 0, "shards": 0}
+
+    org_ids = sorted({svc["organization_id"] for svc in get_all_services() if svc.get("organization_id")})
+    queue_url = os.environ.get("DEPLOY_QUEUE_URL", "")
+    messages = 0
+
+    for layout_shards, window_ends in pending.items():
+        window_keys = [usage_window_key(w) for w in window_ends]
+        for shard, shard_orgs in ShardRing(layout_shards).assign(org_ids).items():
+            message_body = {
+                "message_type": USAGE_SHARD_MESSAGE_TYPE,
+                "window_seconds": window_seconds,
+                "window_ends": [w.isoformat() for w in window_ends],
+                "window_keys": window_keys,
+                "shard": shard,
+                "shard_count": layout_shards,
+                "org_ids": shard_orgs,
+            }
+            queue.send_message(
+                QueueUrl=queue_url,
+                MessageBody=json.dumps(message_body),
+                # One FIFO lane per shard so shards run in parallel; the
+                # deterministic dedup ID makes coordinator retries harmless
+                MessageGroupId=f"usage-{shard}",
+                MessageDeduplicationId=f"usage-{window_keys[0]}-{window_keys[-1]}-{shard}-of-{layout_shards}",
+            )
+            messages += 1
+
+    window_count = sum(len(w) for w in pending.values())
+    print(
+        f"📤 {window_count} usage window(s): {len(org_ids)} orgs in {messages} shard message(s) enqueued"
+        + (" (in-memory)" if local else "")
+    )
+
+    if local:
+        queue.drain(lambda body: handle_usage_shard(body, tracker=tracker))
+        # In-process shards are already finished; advance now instead of next run
+        for window_end in sorted(w for windows in pending.values() for w in windows):
+            window = tracker.get(usage_window_key(window_end))
+            if not window or window.get("status") != USAGE_WINDOW_DONE:
+                break
+            tracker.advance_watermark(window_end.isoformat())
+
+    return {"windows": window_count, "shards": messages, "orgs": len(org_ids)}
+
+
+def handle_usage_shard(body: dict, tracker=None) -> dict:
+    """
+    Worker: aggregate one shard's orgs for the coordinator's windows.
+
+    Raises on failure so SQS redelivers the message; each window is reported
+    to the tracker only after it was billed without errors.
+    """
+    tracker = tracker or DynamoWindowTracker()
+    window_seconds = int(body["window_seconds"])
+    shard = int(body["shard"])
+    org_ids = body.get("org_ids", [])
+    # Single-window messages enqueued before catch-up windows were added
+    window_ends = [datetime.fromisoformat(w) for w in body.get("window_ends") or [body["window_end"]]]
+
+    print(
+        f"🧩 Usage shard {shard + 1}/{body.get('shard_count')}: {len(org_ids)} org(s), "
+        f"{len(window_ends)} window(s) ending {usage_window_key(window_ends[-1])}"
+    )
+
+    org_services, errors = _run_stage(
+        "load_services",
+        {org_id: None for org_id in org_ids},
+        lambda org_id, _: [
+            svc for svc in list_all_org_services(org_id)
+            if svc.get("service_type") in AGGREGATED_SERVICE_TYPES
+        ],
+    )
+    if errors:
+        # Let SQS retry the whole shard rather than bill a partial org set
+        raise RuntimeError(f"Failed to load services for {len(errors)} org(s) in shard {shard}")
+
+    def report(window_end: datetime) -> None:
+        window_key = usage_window_key(window_end)
+        if tracker.complete(window_key, shard):
+            print(f"🏁 Usage window {window_key} complete: all {body.get('shard_count')} shard(s) reported")
+
+    results = process_usage_windows(
+        {org_id: svcs for org_id, svcs in org_services.items() if svcs},
+        window_seconds=window_seconds,
+        window_ends=window_ends,
+        on_window_done=report,
+    )
+    if len(results) < len(window_ends) or (results and results[-1]["errors"]):
+        raise RuntimeError(f"Usage shard {shard} did not bill every window; retrying")
+
+    return {"shard": shard, "orgs": len(org_ids), "windows": [r["window_key"] for r in results]}
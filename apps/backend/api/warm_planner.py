@@ -0,0 +1,129 @@
+"""
+Warm Planner - how many simultaneous pings each paid function needs.
+
+One ping keeps at most one execution environment warm, so a function that
+usually runs 8 concurrent instances would still cold-start 7 of them on a
+burst. The planner sizes a warm pool per function from CloudWatch, read in
+batched GetMetricData calls (see usage_aggregator.get_lambda_metric_data):
+
+- need:  the 75th percentile of daily peak ConcurrentExecutions at this hour
+         of day and the next one, over the last WARM_PLAN_LOOKBACK_DAYS,
+         clamped to [1, WARM_MAX_POOL]
+- skip:  functions whose organic peak concurrency in the last warming
+         interval already reached that pool; those environments are warm
+
+The hourly history only changes once an hour, so it is cached per process
+for WARM_PLAN_HISTORY_TTL_SECONDS; each run only reads the last interval.
+Functions without history get a single ping, as before.
+"""
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from api.usage_aggregator import get_lambda_metric_data
+
+
+# Configuration
+WARM_PLAN_LOOKBACK_DAYS = int(os.environ.get("WARM_PLAN_LOOKBACK_DAYS", "7"))
+WARM_PLAN_HISTORY_TTL_SECONDS = 3600
+WARM_PLAN_PERCENTILE = 0.75
+WARM_INTERVAL_SECONDS = 300  # EventBridge warming schedule
+WARM_MAX_POOL = int(os.environ.get("WARM_MAX_POOL", "10"))
+
+_history: Dict[str, List[Tuple[datetime, float]]] = {}
+_history_fetched_at: Optional[float] = None
+_history_lock = threading.Lock()
+
+
+def _get_concurrency_history(function_names: List[str], now: datetime) -> Dict[str, List[Tuple[datetime, float]]]:
+    """Hourly Maximum ConcurrentExecutions per function, cached for an hour."""
+    global _history_fetched_at
+    with _history_lock:
+        if _history_fetched_at is None or time.monotonic() - _history_fetched_at > WARM_PLAN_HISTORY_TTL_SECONDS:
+            _history.clear()
+            _history_fetched_at = time.monotonic()
+
+        missing = [name for name in function_names if name not in _history]
+        if missing:
+            data = get_lambda_metric_data(
+                missing,
+                {"ConcurrentExecutions": "Maximum"},
+                period_seconds=3600,
+                start_time=now - timedelta(days=WARM_PLAN_LOOKBACK_DAYS),
+                end_time=now,
+            )
+            for name in missing:
+                _history[name] = data[name]["ConcurrentExecutions"]
+        return {name: _history[name] for name in function_names}
+
+
+def predict_warm_pool(history: List[Tuple[datetime, float]], at: datetime) -> int:
+    """
+    Environments to keep warm around `at` (UTC) from hourly concurrency peaks.
+
+    Takes each day's peak over this hour of day and the next, then the
+    WARM_PLAN_PERCENTILE of those daily peaks, so a single burst doesn't set
+    the pool for the whole week.
+    """
+    hours = {at.hour, (at + timedelta(hours=1)).hour}
+    daily_peaks: Dict[str, float] = {}
+    for timestamp, value in history:
+        if timestamp.hour not in hours:
+            continue
+        day = timestamp.strftime("%Y-%m-%d")
+        daily_peaks[day] = max(daily_peaks.get(day, 0.0), value)
+
+    if not daily_peaks:
+        return 1
+    peaks = sorted(daily_peaks.values())
+    need = peaks[min(len(peaks) - 1, int(len(peaks) * WARM_PLAN_PERCENTILE))]
+    return max(1, min(WARM_MAX_POOL, math.ceil(need)))
+
+
+def plan_warming(targets: List[Dict], now: Optional[datetime] = None) -> List[Dict]:
+    """
+    Decide how many simultaneous pings each warming target gets.
+
+    Args:
+        targets: Warm targets with 'function_url' and (optionally) 'function_name'
+
+    Returns:
+        The targets still worth pinging, each with a 'pings' count; functions
+        already kept warm by organic traffic are left out.
+    """
+    now = now or datetime.utcnow()
+    names = [t["function_name"] for t in targets if t.get("function_name")]
+
+    history = _get_concurrency_history(names, now)
+    recent = get_lambda_metric_data(
+        names,
+        {"ConcurrentExecutions": "Maximum"},
+        period_seconds=60,
+        start_time=now - timedelta(seconds=WARM_INTERVAL_SECONDS),
+        end_time=now,
+    )
+
+    plan = []
+    skipped_organic = 0
+    for target in targets:
+        name = target.get("function_name")
+        if not name:
+            plan.append({**target, "pings": 1})
+            continue
+
+        need = predict_warm_pool(history.get(name, []), now)
+        recent_peak = max((value for _, value in recent[name]["ConcurrentExecutions"]), default=0.0)
+        if recent_peak >= need:
+            skipped_organic += 1
+            continue
+        plan.append({**target, "pings": need})
+
+    pings = sum(t["pings"] for t in plan)
+    print(
+        f"   🧮 Warm plan: {len(plan)} function(s), {pings} ping(s); "
+        f"{skipped_organic} skipped (warm from organic traffic)"
+    )
+    return plan
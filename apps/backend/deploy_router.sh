@@ -124,6 +124,24 @@ else
     sleep 10
 fi
 
+# Allow the router to refresh the route snapshot from S3
+if [ -n "$ROUTE_SNAPSHOT_BUCKET" ]; then
+    aws iam put-role-policy \
+        --role-name $ROLE_NAME \
+        --policy-name "ReadRouteSnapshot" \
+        --policy-document '{
+          "Version": "2012-10-17",
+          "Statement": [
+            {
+              "Effect": "Allow",
+              "Action": "s3:GetObject",
+              "Resource": "arn:aws:s3:::'"$ROUTE_SNAPSHOT_BUCKET"'/*"
+            }
+          ]
+        }'
+    echo -e "${GREEN}✓ Route snapshot read access: s3://$ROUTE_SNAPSHOT_BUCKET${NC}"
+fi
+
 # ============================================================================
 # Step 2: Deploy Lambda@Edge Function
 # ============================================================================
@@ -143,6 +161,19 @@ fi
 # Copy router lambda
 cp "$SCRIPT_DIR/router/router_lambda.py" "$PACKAGE_DIR/lambda_function.py"
 
+# Bundle the route snapshot (hosts routed without a DynamoDB lookup).
+# Prefer the last published snapshot; otherwise compile one from the routes table.
+# The router works without it, falling back to DynamoDB for every host.
+SNAPSHOT_KEY="${ROUTE_SNAPSHOT_KEY:-router/routes_snapshot.json.gz}"
+if [ -n "$ROUTE_SNAPSHOT_BUCKET" ] && \
+    aws s3 cp "s3://$ROUTE_SNAPSHOT_BUCKET/$SNAPSHOT_KEY" "$PACKAGE_DIR/routes_snapshot.json.gz" --region $REGION --quiet; then
+    echo -e "${GREEN}✓ Bundled route snapshot from s3://$ROUTE_SNAPSHOT_BUCKET/$SNAPSHOT_KEY${NC}"
+elif (cd "$SCRIPT_DIR" && python3 -m api.route_snapshot --output "$PACKAGE_DIR/routes_snapshot.json.gz"); then
+    echo -e "${GREEN}✓ Bundled freshly compiled route snapshot${NC}"
+else
+    echo -e "${YELLOW}⚠ No route snapshot bundled — router will use DynamoDB for every host${NC}"
+fi
+
 # Lambda@Edge requires boto3 bundled (it's included in standard Lambda but not Edge)
 echo "Installing dependencies..."
 pip install boto3 -t "$PACKAGE_DIR" --quiet
@@ -14,17 +14,21 @@ Usage:
     )
 """
 
-from .orchestrator import deploy_project, delete_project_resources
+from .orchestrator import deploy_project, start_project_build, deploy_built_project, delete_project_resources
 from .database_orchestrator import provision_database, delete_database_resources
-from .ecs_orchestrator import deploy_ecs_project, delete_ecs_resources
+from .ecs_orchestrator import deploy_ecs_project, start_ecs_build, deploy_built_ecs_project, delete_ecs_resources
 from .utils import extract_project_name
 
 __all__ = [
     "deploy_project",
+    "start_project_build",
+    "deploy_built_project",
     "delete_project_resources",
     "provision_database",
     "delete_database_resources",
     "deploy_ecs_project",
+    "start_ecs_build",
+    "deploy_built_ecs_project",
     "delete_ecs_resources",
     "extract_project_name",
 ]
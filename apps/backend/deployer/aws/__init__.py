@@ -6,7 +6,14 @@ AWS service operations for deployment.
 
 from .ecr import create_ecr_repository, delete_ecr_repository
 from .iam import get_or_create_codebuild_role, get_or_create_lambda_role, get_or_create_ecs_task_execution_role, get_or_create_ecs_instance_role
-from .codebuild import create_or_update_codebuild_project, start_build, wait_for_build
+from .codebuild import (
+    create_or_update_codebuild_project,
+    start_build,
+    wait_for_build,
+    parse_build_state_event,
+    build_state_change_event,
+    emit_build_event_when_done,
+)
 from .lambda_service import create_or_update_lambda, delete_lambda
 from .cloudwatch import get_build_logs, get_lambda_logs, delete_lambda_logs, get_ecs_logs, delete_ecs_logs
 from .rds import (
@@ -65,6 +72,9 @@ __all__ = [
     "create_or_update_codebuild_project",
     "start_build",
     "wait_for_build",
+    "parse_build_state_event",
+    "build_state_change_event",
+    "emit_build_event_when_done",
     # Lambda
     "create_or_update_lambda",
     "delete_lambda",
@@ -4,6 +4,7 @@ CloudWatch Logs Operations
 Fetching logs from CodeBuild builds and Lambda functions.
 """
 
+import re
 from typing import Optional
 from datetime import datetime, timedelta
 
@@ -89,6 +90,56 @@ def get_build_logs(build_id: str, limit: int = 200) -> list[dict]:
         return [{"timestamp": datetime.utcnow().isoformat(), "message": f"Error fetching logs: {e}", "level": "ERROR"}]
 
 
+# Printed by the buildspecs after the docker build (see templates/buildspec*.yml)
+BUILD_CACHE_STATS_PATTERN = re.compile(r"SHORLABS_BUILD_CACHE steps=(\d+) cached=(\d+)")
+
+
+def get_build_cache_stats(build_id: str) -> Optional[dict]:
+    """
+    Layer cache statistics of a finished build.
+
+    Reads the SHORLABS_BUILD_CACHE line from the tail of the build log, and
+    the duration of the BUILD phase (the docker build itself) from CodeBuild.
+
+    Returns:
+        Dict with 'steps', 'cached' and 'build_seconds', or None if the build
+        reported no statistics (or its log isn't readable yet)
+    """
+    codebuild_client = get_codebuild_client()
+    logs_client = get_logs_client()
+
+    try:
+        builds = codebuild_client.batch_get_builds(ids=[build_id])["builds"]
+        if not builds:
+            return None
+        build = builds[0]
+        logs_info = build.get("logs", {})
+        if not logs_info.get("groupName") or not logs_info.get("streamName"):
+            return None
+        events = logs_client.get_log_events(
+            logGroupName=logs_info["groupName"],
+            logStreamName=logs_info["streamName"],
+            limit=200,
+            startFromHead=False,
+        ).get("events", [])
+    except Exception as e:
+        print(f"⚠️ Could not read build cache stats for {build_id}: {e}")
+        return None
+
+    for event in reversed(events):
+        match = BUILD_CACHE_STATS_PATTERN.search(event["message"])
+        if match:
+            break
+    else:
+        return None
+
+    stats = {"steps": int(match.group(1)), "cached": int(match.group(2))}
+    for phase in build.get("phases", []):
+        if phase.get("phaseType") == "BUILD" and "durationInSeconds" in phase:
+            stats["build_seconds"] = int(phase["durationInSeconds"])
+    return stats
+
+
 def get_build_logs_stream(build_id: str, next_token: str = None, limit: int = 50) -> dict:
     """
     Fetch logs from a CodeBuild build with pagination support for streaming.
@@ -4,11 +4,12 @@ CodeBuild Operations
 CodeBuild project and build management.
 """
 
+import threading
 import time
-from typing import Optional
+from typing import Callable, Optional
 
 from ..clients import get_codebuild_client
-from ..config import CODEBUILD_PROJECT_NAME
+from ..config import BUILDKIT_ECR_REPOSITORY, BUILDKIT_IMAGE_TAG, CODEBUILD_PROJECT_NAME
 from .lambda_service import filter_env_vars
 
 
@@ -74,6 +75,7 @@ def start_build(
     env_vars: Optional[dict] = None,
     compute_type_override: Optional[str] = None,
     arm_build: bool = False,
+    build_env: Optional[dict] = None,
 ) -> str:
     """
     Start a CodeBuild build and return the build ID.
@@ -89,6 +91,9 @@ def start_build(
         env_vars: Optional user environment variables for the build
         compute_type_override: Override CodeBuild compute type (e.g. BUILD_GENERAL1_SMALL for hobby plans)
         arm_build: If True, override build environment to ARM for t4g instances
+        build_env: Platform variables added to the build environment only (not the
+            image), e.g. SHORLABS_SERVICE_ID / SHORLABS_DEPLOY_ID so the build
+            state-change event can be routed back to its deployment
 
     Returns:
         The build ID
@@ -98,8 +103,9 @@ def start_build(
     codebuild_client = get_codebuild_client()
 
     # Get AWS credentials for ECR login
-    from ..clients import get_aws_account_id, get_aws_region
-    account_id = get_aws_account_id()
+    from ..clients import get_aws_region
+    from ..bootstrap_cache import account_id as cached_account_id
+    account_id = cached_account_id()
     region = get_aws_region()
 
     # Normalize root_directory: "./", "", "." → ".", "apps/frontend/" → "apps/frontend"
@@ -176,6 +182,10 @@ def start_build(
     buildspec = buildspec.replace('{{ECR_REPO_URI}}', ecr_repo_uri)
     buildspec = buildspec.replace('{{ROOT_DIRECTORY}}', root_directory)
     buildspec = buildspec.replace('{{REPO_PATH}}', repo_path)
+    buildspec = buildspec.replace(
+        '{{BUILDKIT_IMAGE}}',
+        f"{account_id}.dkr.ecr.{region}.amazonaws.com/{BUILDKIT_ECR_REPOSITORY}:{BUILDKIT_IMAGE_TAG}",
+    )
     # Note: GITHUB_TOKEN is passed as env var, not embedded in buildspec
 
     # Generate --build-arg flags for docker build command
@@ -196,6 +206,12 @@ def start_build(
             "value": str(value),
             "type": "PLAINTEXT"
         })
+    for key, value in (build_env or {}).items():
+        env_overrides.append({
+            "name": key,
+            "value": str(value),
+            "type": "PLAINTEXT"
+        })
 
     start_build_kwargs = {
         "projectName": CODEBUILD_PROJECT_NAME,
@@ -274,3 +290,112 @@ def get_build_status(build_id: str) -> dict:
         "phase": build.get("currentPhase", "UNKNOWN"),
         "logs_url": build.get("logs", {}).get("deepLink"),
     }
+
+
+
+# ─────────────────────────────────────────────────────────────
+# BUILD STATE-CHANGE EVENTS
+# ─────────────────────────────────────────────────────────────
+
+# EventBridge publishes these for every build; the API only acts on terminal ones
+BUILD_STATE_CHANGE_DETAIL_TYPE = "CodeBuild Build State Change"
+BUILD_TERMINAL_STATUSES = frozenset({"SUCCEEDED", "FAILED", "FAULT", "STOPPED", "TIMED_OUT"})
+# Field the EventBridge rule's input transformer adds to every build event it
+# delivers (schedule_build_events.sh), holding BUILD_EVENTS_TOKEN
+BUILD_EVENT_TOKEN_FIELD = "shorlabs-events-token"
+LOCAL_BUILD_POLL_SECONDS = 5
+
+
+def parse_build_state_event(event: dict) -> Optional[dict]:
+    """
+    Extract the build from a CodeBuild state-change event for our project.
+
+    Returns:
+        {"build_id", "status", "env"} where env maps the build's environment
+        variable names to values, or None for any other event
+    """
+    if not isinstance(event, dict):
+        return None
+    if event.get("source") != "aws.codebuild" or event.get("detail-type") != BUILD_STATE_CHANGE_DETAIL_TYPE:
+        return None
+
+    detail = event.get("detail") or {}
+    if detail.get("project-name") != CODEBUILD_PROJECT_NAME:
+        return None
+
+    environment = (detail.get("additional-information") or {}).get("environment") or {}
+    env = {
+        var["name"]: var.get("value")
+        for var in environment.get("environment-variables", [])
+        if var.get("name")
+    }
+    # build-id is the full build ARN; start_build returns "<project>:<uuid>"
+    build_id = detail.get("build-id", "").split(":build/")[-1]
+    return {"build_id": build_id, "status": detail.get("build-status"), "env": env}
+
+
+def build_state_change_event(build_id: str, status: str, build_env: Optional[dict] = None) -> dict:
+    """
+    A CodeBuild state-change event in the shape EventBridge delivers it.
+
+    Only the fields parse_build_state_event reads are filled in; used by the
+    local stand-in below and for replaying events by hand.
+    """
+    from ..clients import get_aws_region
+    from ..bootstrap_cache import account_id as cached_account_id
+    region = get_aws_region()
+    account_id = cached_account_id()
+    return {
+        "source": "aws.codebuild",
+        "detail-type": BUILD_STATE_CHANGE_DETAIL_TYPE,
+        "region": region,
+        "detail": {
+            "build-status": status,
+            "project-name": CODEBUILD_PROJECT_NAME,
+            "build-id": f"arn:aws:codebuild:{region}:{account_id}:build/{build_id}",
+            "additional-information": {
+                "environment": {
+                    "environment-variables": [
+                        {"name": key, "value": str(value), "type": "PLAINTEXT"}
+                        for key, value in (build_env or {}).items()
+                    ],
+                },
+            },
+        },
+    }
+
+
+def emit_build_event_when_done(
+    build_id: str,
+    build_env: Optional[dict],
+    on_event: Callable[[dict], object],
+) -> threading.Thread:
+    """
+    Local stand-in for the EventBridge rule: poll the build in a background
+    thread and pass its terminal state-change event to on_event.
+
+    Outside Lambda there is no rule delivering events to /events, so the
+    two-stage deploy flow uses this to resume exactly as it would on AWS.
+    """
+    def watch():
+        codebuild_client = get_codebuild_client()
+        while True:
+            try:
+                build = codebuild_client.batch_get_builds(ids=[build_id])["builds"][0]
+                status = build["buildStatus"]
+            except Exception as e:
+                print(f"⚠️ Local build watcher could not read {build_id}: {e}")
+                status = "IN_PROGRESS"
+            if status in BUILD_TERMINAL_STATUSES:
+                break
+            time.sleep(LOCAL_BUILD_POLL_SECONDS)
+
+        print(f"📨 Local build event: {build_id} {status}")
+        try:
+            on_event(build_state_change_event(build_id, status, build_env))
+        except Exception as e:
+            print(f"❌ Local build event handler failed for {build_id}: {e}")
+
+    thread = threading.Thread(target=watch, daemon=True)
+    thread.start()
+    return thread
@@ -4,6 +4,8 @@ ECR Operations
 ECR repository management.
 """
 
+from typing import Optional
+
 from ..clients import get_ecr_client
 from ..config import ECR_REPO_PREFIX
 
@@ -60,6 +62,30 @@ def delete_ecr_repository(repo_name: str) -> bool:
         return False
 
 
+def get_image_digest(repo_name: str, tag: str = "latest") -> Optional[str]:
+    """
+    Get the digest of a tagged image.
+
+    Args:
+        repo_name: Name of the repository
+        tag: Image tag
+
+    Returns:
+        The image digest ("sha256:..."), or None if the image is not found
+    """
+    ecr_client = get_ecr_client()
+
+    try:
+        response = ecr_client.describe_images(
+            repositoryName=repo_name,
+            imageIds=[{"imageTag": tag}],
+        )
+    except (ecr_client.exceptions.ImageNotFoundException, ecr_client.exceptions.RepositoryNotFoundException):
+        print(f"⚠️ Image not found: {repo_name}:{tag}")
+        return None
+    return response["imageDetails"][0]["imageDigest"]
+
+
 def get_ecr_repo_name(project_name: str) -> str:
     """
     Get the ECR repository name for a project.
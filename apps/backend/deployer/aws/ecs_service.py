@@ -903,6 +903,7 @@ def ensure_launch_template(
     instance_profile_arn: str,
     security_group_id: str,
     instance_type: str = None,
+    ami_id: str = None,
 ) -> tuple:
     """
     Create or update an EC2 launch template for ECS container instances.
@@ -919,6 +920,7 @@ def ensure_launch_template(
         instance_profile_arn: IAM instance profile ARN
         security_group_id: Security group ID for EC2 instances
         instance_type: EC2 instance type (default from config)
+        ami_id: ECS-optimized AMI (default: the current recommended one)
 
     Returns:
         Tuple of (launch_template_id, instance_type_changed: bool)
@@ -927,7 +929,7 @@ def ensure_launch_template(
     instance_type = instance_type or DEFAULT_INSTANCE_TYPE
     lt_name = f"{ECS_LAUNCH_TEMPLATE_PREFIX}-{project_name}"
 
-    ami_id = get_ecs_optimized_ami()
+    ami_id = ami_id or get_ecs_optimized_ami()
 
     # User data script to configure ECS agent to join the correct cluster
     user_data_script = f"""#!/bin/bash
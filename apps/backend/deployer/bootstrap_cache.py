@@ -0,0 +1,259 @@
+"""
+Bootstrap Cache
+
+Every deploy used to repeat the same account-wide setup: the STS account
+id, the CodeBuild/Lambda/ECS roles (re-attaching every policy), the
+CodeBuild project, the default VPC and subnets, the ALB/ECS/EC2 security
+groups, the ECS-optimized AMI and the shared ALB. Their results only change
+when the account changes, so they are cached:
+
+- in-process, for the lifetime of the container
+- in DynamoDB, one item (PK DEPLOYER#BOOTSTRAP) in the projects table, so a
+  cold container starts warm
+
+Entries expire after BOOTSTRAP_CACHE_TTL_SECONDS. The item carries
+BOOTSTRAP_CACHE_VERSION; bump it when what a cached resource must look like
+changes (new role policies, a different CodeBuild image), and every entry
+is re-resolved through its get-or-create call.
+
+Validation is lazy: a cached id is trusted until an AWS call using it
+reports a missing resource. refresh_on_failure then invalidates
+those entries and retries once with freshly resolved ones.
+
+A DynamoDB outage never fails a deploy; the cache just stays in-process.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Sequence
+
+from botocore.exceptions import ClientError
+
+from .clients import get_aws_account_id, get_dynamodb_resource
+from .config import CODEBUILD_PROJECT_NAME
+from .aws import (
+    get_or_create_codebuild_role,
+    get_or_create_lambda_role,
+    get_or_create_ecs_task_execution_role,
+    get_or_create_ecs_instance_role,
+    create_or_update_codebuild_project,
+    get_default_vpc_and_subnets,
+    ensure_alb_security_group,
+    ensure_ecs_security_group,
+    ensure_ec2_security_group,
+    get_ecs_optimized_ami,
+    ensure_shared_alb,
+)
+
+
+BOOTSTRAP_CACHE_VERSION = 1
+BOOTSTRAP_CACHE_TTL_SECONDS = int(os.environ.get("BOOTSTRAP_CACHE_TTL_SECONDS", "86400"))
+BOOTSTRAP_TABLE_NAME = os.environ.get("DYNAMODB_TABLE", "shorlabs-projects")
+BOOTSTRAP_ITEM_KEY = {"PK": "DEPLOYER#BOOTSTRAP", "SK": "BOOTSTRAP"}
+
+# Error codes meaning a cached identifier points at a resource that no longer
+# exists, besides the many "...NotFound..." codes (ResourceNotFoundException,
+# InvalidSubnetID.NotFound, ...). Generic validation codes are left out: user
+# input raises them too, and a retry would re-run the whole deploy step.
+STALE_RESOURCE_ERROR_CODES = {
+    "NoSuchEntity",
+}
+
+# Entries each deploy stage relies on, invalidated together on failure
+CODEBUILD_BOOTSTRAP_KEYS = ("account_id", "codebuild_role_arn", "codebuild_project")
+LAMBDA_BOOTSTRAP_KEYS = ("lambda_role_arn",)
+ECS_BOOTSTRAP_KEYS = (
+    "ecs_task_execution_role_arn",
+    "ecs_instance_profile_arn",
+    "default_vpc",
+    "alb_security_group",
+    "ecs_security_group",
+    "ec2_security_group",
+    "ecs_optimized_ami",
+    "shared_alb",
+)
+
+_entries: Dict[str, dict] = {}
+_loaded = False
+_lock = threading.Lock()
+
+
+# ─────────────────────────────────────────────────────────────
+# CACHE
+# ─────────────────────────────────────────────────────────────
+
+def _table():
+    return get_dynamodb_resource().Table(BOOTSTRAP_TABLE_NAME)
+
+
+def _load() -> None:
+    """Fill the in-process cache from DynamoDB, once per process. Call with _lock held."""
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        item = _table().get_item(Key=BOOTSTRAP_ITEM_KEY).get("Item")
+    except Exception as e:
+        print(f"⚠️ Bootstrap cache: could not load from DynamoDB: {e}")
+        return
+
+    if not item or int(item.get("version", 0)) != BOOTSTRAP_CACHE_VERSION:
+        return
+    for key, entry in item.get("entries", {}).items():
+        _entries[key] = {"value": entry["value"], "cached_at": int(entry["cached_at"])}
+    print(f"📦 Bootstrap cache: loaded {len(_entries)} entr{'y' if len(_entries) == 1 else 'ies'}")
+
+
+def _persist(key: str, entry: dict) -> None:
+    """Write one entry to the DynamoDB item, starting a fresh item if it's missing or outdated."""
+    try:
+        table = _table()
+        try:
+            table.update_item(
+                Key=BOOTSTRAP_ITEM_KEY,
+                UpdateExpression="SET #entries.#key = :entry",
+                ConditionExpression="#version = :version",
+                ExpressionAttributeNames={"#entries": "entries", "#key": key, "#version": "version"},
+                ExpressionAttributeValues={":entry": entry, ":version": BOOTSTRAP_CACHE_VERSION},
+            )
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            with _lock:
+                entries = dict(_entries)
+            table.put_item(Item={**BOOTSTRAP_ITEM_KEY, "version": BOOTSTRAP_CACHE_VERSION, "entries": entries})
+    except Exception as e:
+        print(f"⚠️ Bootstrap cache: could not persist {key}: {e}")
+
+
+def cached(key: str, resolve: Callable[[], Any]) -> Any:
+    """
+    Return the cached value for key, or resolve() it and cache the result.
+
+    resolve is the idempotent get-or-create call; it runs only on a miss or
+    after the entry expired or was invalidated.
+    """
+    with _lock:
+        _load()
+        entry = _entries.get(key)
+        if entry and time.time() - entry["cached_at"] < BOOTSTRAP_CACHE_TTL_SECONDS:
+            return entry["value"]
+
+    value = resolve()
+    entry = {"value": value, "cached_at": int(time.time())}
+    with _lock:
+        _entries[key] = entry
+    _persist(key, entry)
+    return value
+
+
+def invalidate(*keys: str) -> None:
+    """Drop entries (all of them if no keys are given) in-process and in DynamoDB."""
+    with _lock:
+        _load()
+        dropped = [key for key in (keys or list(_entries)) if _entries.pop(key, None) is not None]
+    if not dropped:
+        return
+    print(f"♻️ Bootstrap cache: invalidated {', '.join(dropped)}")
+
+    try:
+        if keys:
+            _table().update_item(
+                Key=BOOTSTRAP_ITEM_KEY,
+                UpdateExpression="REMOVE " + ", ".join(f"#entries.#k{i}" for i in range(len(dropped))),
+                ExpressionAttributeNames={"#entries": "entries", **{f"#k{i}": key for i, key in enumerate(dropped)}},
+            )
+        else:
+            _table().delete_item(Key=BOOTSTRAP_ITEM_KEY)
+    except Exception as e:
+        print(f"⚠️ Bootstrap cache: could not invalidate in DynamoDB: {e}")
+
+
+def _is_stale_resource_error(error: Exception) -> bool:
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get("Error", {}).get("Code", "")
+    return "NotFound" in code or code in STALE_RESOURCE_ERROR_CODES
+
+
+def refresh_on_failure(keys: Sequence[str], fn: Callable[[], Any]) -> Any:
+    """
+    Run fn(); if it fails on a missing resource while any of keys
+    was served from the cache, invalidate keys and run fn() once more.
+    """
+    with _lock:
+        _load()
+        had_cached = any(key in _entries for key in keys)
+
+    try:
+        return fn()
+    except Exception as e:
+        if not had_cached or not _is_stale_resource_error(e):
+            raise
+        print(f"♻️ Bootstrap cache: {e} - refreshing cached resources and retrying")
+        invalidate(*keys)
+        return fn()
+
+
+# ─────────────────────────────────────────────────────────────
+# CACHED RESOURCES
+# ─────────────────────────────────────────────────────────────
+
+def account_id() -> str:
+    return cached("account_id", get_aws_account_id)
+
+
+def codebuild_role_arn() -> str:
+    return cached("codebuild_role_arn", get_or_create_codebuild_role)
+
+
+def ensure_codebuild_project() -> str:
+    """Make sure the shared CodeBuild project exists; returns its name."""
+    def resolve():
+        create_or_update_codebuild_project(codebuild_role_arn())
+        return CODEBUILD_PROJECT_NAME
+
+    return cached("codebuild_project", resolve)
+
+
+def lambda_role_arn() -> str:
+    return cached("lambda_role_arn", get_or_create_lambda_role)
+
+
+def ecs_task_execution_role_arn() -> str:
+    return cached("ecs_task_execution_role_arn", get_or_create_ecs_task_execution_role)
+
+
+def ecs_instance_profile_arn() -> str:
+    return cached("ecs_instance_profile_arn", get_or_create_ecs_instance_role)
+
+
+def default_vpc() -> tuple:
+    """(vpc_id, subnet_ids) of the default VPC."""
+    def resolve():
+        vpc_id, subnet_ids = get_default_vpc_and_subnets()
+        return {"vpc_id": vpc_id, "subnet_ids": subnet_ids}
+
+    vpc = cached("default_vpc", resolve)
+    return vpc["vpc_id"], list(vpc["subnet_ids"])
+
+
+def alb_security_group(vpc_id: str) -> str:
+    return cached("alb_security_group", lambda: ensure_alb_security_group(vpc_id))
+
+
+def ecs_security_group(vpc_id: str, alb_sg_id: str) -> str:
+    return cached("ecs_security_group", lambda: ensure_ecs_security_group(vpc_id, alb_sg_id))
+
+
+def ec2_security_group(vpc_id: str, alb_sg_id: str) -> str:
+    return cached("ec2_security_group", lambda: ensure_ec2_security_group(vpc_id, alb_sg_id))
+
+
+def ecs_optimized_ami() -> str:
+    return cached("ecs_optimized_ami", get_ecs_optimized_ami)
+
+
+def shared_alb(subnet_ids: list, alb_sg_id: str) -> dict:
+    """alb_arn, alb_dns_name and https_listener_arn of the shared ALB."""
+    return dict(cached("shared_alb", lambda: ensure_shared_alb(subnet_ids, alb_sg_id)))
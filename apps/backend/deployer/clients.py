@@ -4,45 +4,55 @@ AWS Client Management
 Provides lazy-loaded AWS clients for better testing and resource management.
 """
 
-import boto3
+import threading
 from functools import lru_cache
 
+import boto3
+
+# boto3's default session isn't thread-safe while creating clients, and the
+# pre-build steps create theirs from concurrent threads
+_client_lock = threading.Lock()
+
+
+def _client(service_name: str):
+    with _client_lock:
+        return boto3.client(service_name)
 
 
 @lru_cache()
 def get_ecr_client():
     """Get the ECR client (cached)."""
-    return boto3.client("ecr")
+    return _client("ecr")
 
 
 @lru_cache()
 def get_lambda_client():
     """Get the Lambda client (cached)."""
-    return boto3.client("lambda")
+    return _client("lambda")
 
 
 @lru_cache()
 def get_iam_client():
     """Get the IAM client (cached)."""
-    return boto3.client("iam")
+    return _client("iam")
 
 
 @lru_cache()
 def get_sts_client():
     """Get the STS client (cached)."""
-    return boto3.client("sts")
+    return _client("sts")
 
 
 @lru_cache()
 def get_codebuild_client():
     """Get the CodeBuild client (cached)."""
-    return boto3.client("codebuild")
+    return _client("codebuild")
 
 
 @lru_cache()
 def get_logs_client():
     """Get the CloudWatch Logs client (cached)."""
-    return boto3.client("logs")
+    return _client("logs")
 
 
 def get_aws_account_id() -> str:
@@ -58,40 +68,47 @@ def get_aws_region() -> str:
 @lru_cache()
 def get_rds_client():
     """Get the RDS client (cached)."""
-    return boto3.client("rds")
+    return _client("rds")
 
 
 @lru_cache()
 def get_ec2_client():
     """Get the EC2 client (cached). Used for security group management."""
-    return boto3.client("ec2")
+    return _client("ec2")
 
 
 @lru_cache()
 def get_secretsmanager_client():
     """Get the Secrets Manager client (cached)."""
-    return boto3.client("secretsmanager")
+    return _client("secretsmanager")
 
 
 @lru_cache()
 def get_ecs_client():
     """Get the ECS client (cached)."""
-    return boto3.client("ecs")
+    return _client("ecs")
 
 
 @lru_cache()
 def get_elbv2_client():
     """Get the Elastic Load Balancing v2 client (cached)."""
-    return boto3.client("elbv2")
+    return _client("elbv2")
 
 
 @lru_cache()
 def get_autoscaling_client():
     """Get the Auto Scaling client (cached)."""
-    return boto3.client("autoscaling")
+    return _client("autoscaling")
+
+
+@lru_cache()
+def get_dynamodb_resource():
+    """Get the DynamoDB resource (cached). Used for the bootstrap cache."""
+    with _client_lock:
+        return boto3.resource("dynamodb")
 
 
 @lru_cache()
 def get_ssm_client():
     """Get the Systems Manager client (cached)."""
-    return boto3.client("ssm")
+    return _client("ssm")
@@ -9,6 +9,14 @@ CODEBUILD_PROJECT_NAME = "shorlabs-builder"
 LAMBDA_FUNCTION_PREFIX = "shorlabs"
 ECR_REPO_PREFIX = "shorlabs"
 
+# BuildKit builder image used by the build (docker buildx, docker-container
+# driver). Pinned, and pulled from an ECR mirror in the account instead of
+# anonymously from Docker Hub, whose pull rate limit CodeBuild's shared
+# egress IPs run into. Mirror a new tag with mirror_buildkit_image.sh
+# before changing this.
+BUILDKIT_IMAGE_TAG = "v0.16.0"
+BUILDKIT_ECR_REPOSITORY = "shorlabs-buildkit"
+
 # IAM Role Names
 CODEBUILD_ROLE_NAME = "shorlabs-codebuild-role"
 LAMBDA_ROLE_NAME = "shorlabs-lambda-execution-role"
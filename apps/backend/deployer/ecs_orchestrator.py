@@ -11,12 +11,7 @@ from .utils import extract_project_name
 from .utils import detect_runtime_from_github
 from .aws import (
     create_ecr_repository,
-    get_or_create_codebuild_role,
-    create_or_update_codebuild_project,
     start_build,
-    wait_for_build,
-    get_or_create_ecs_task_execution_role,
-    get_or_create_ecs_instance_role,
     get_cluster_name,
     ensure_ecs_cluster,
     register_task_definition,
@@ -25,17 +20,12 @@ from .aws import (
     delete_ecs_service,
     delete_ecs_log_group,
     delete_service_infra,
-    ensure_ecs_security_group,
-    ensure_ec2_security_group,
     ensure_launch_template,
     ensure_auto_scaling_group,
     wait_for_instance_refresh,
     wait_for_ecs_instance_ready,
     ensure_ec2_capacity_provider,
-    get_default_vpc_and_subnets,
     get_ecs_service_name,
-    ensure_shared_alb,
-    ensure_alb_security_group,
     create_target_group,
     create_listener_rule,
     delete_target_group,
@@ -46,9 +36,310 @@ from .aws import (
 from .clients import get_autoscaling_client
 from .config import ECS_ASG_PREFIX
 from .aws.ecr import get_ecr_repo_name
+from .bootstrap_cache import (
+    CODEBUILD_BOOTSTRAP_KEYS,
+    ECS_BOOTSTRAP_KEYS,
+    ensure_codebuild_project,
+    ecs_task_execution_role_arn,
+    ecs_instance_profile_arn,
+    default_vpc,
+    alb_security_group,
+    ecs_security_group,
+    ec2_security_group,
+    ecs_optimized_ami,
+    shared_alb,
+    refresh_on_failure,
+)
+from .steps import (
+    DeploySteps,
+    STEP_DETECT_RUNTIME,
+    STEP_ECR_REPOSITORY,
+    STEP_CODEBUILD_PROJECT,
+    STEP_START_BUILD,
+    STEP_DEPLOY,
+    PREBUILD_SETUP_STEPS,
+    complete_build,
+    built_image_uri,
+)
 from .config import DEFAULT_TASK_CPU, DEFAULT_TASK_MEMORY, DEFAULT_INSTANCE_TYPE, get_instance_type_from_memory, get_task_memory
 
 
+def start_ecs_build(
+    github_url: str,
+    github_token: Optional[str] = None,
+    root_directory: str = "./",
+    start_command: str = "uvicorn main:app --host 0.0.0.0 --port 8080",
+    env_vars: Optional[dict] = None,
+    on_status_change: Optional[callable] = None,
+    project_id: Optional[str] = None,
+    codebuild_compute_type: Optional[str] = None,
+    build_env: Optional[dict] = None,
+    steps: Optional[DeploySteps] = None,
+) -> dict:
+    """
+    Pre-build stage for ECS: detect the runtime, prepare ECR and CodeBuild,
+    start the ARM64 build. Steps completed by an earlier attempt are skipped
+    (see start_project_build).
+
+    Returns:
+        Dict with 'build_id', 'function_name', 'ecr_repo_uri' and 'runtime'
+    """
+    if not github_token:
+        raise ValueError("github_token is required for authentication")
+    steps = steps or DeploySteps()
+
+    # Use project_id for unique naming if provided
+    repo_name = extract_project_name(github_url)
+    if project_id:
+        project_name = f"{repo_name}-{project_id[:8]}"
+    else:
+        project_name = repo_name
+
+    print(f"\n🔧 Shorlabs Deployer (ECS EC2)")
+    print(f"   Repository: {github_url}")
+    print(f"   Project Name: {project_name}")
+    print(f"   Start Command: {start_command}\n")
+
+    # Steps 1-3 don't depend on each other: detect the runtime via the GitHub
+    # API, create the ECR repository and set up CodeBuild concurrently, under
+    # one deadline (see DeploySteps.run_concurrently)
+    def detect_runtime():
+        print("🔍 Detecting runtime...")
+        runtime = detect_runtime_from_github(github_url, github_token, root_directory)
+        print(f"✅ Detected runtime: {runtime}")
+        return {"runtime": runtime}
+
+    def ecr_repository():
+        ecr_repo_name = get_ecr_repo_name(project_name)
+        ecr_repo_uri = create_ecr_repository(ecr_repo_name)
+        print(f"✅ ECR repository ready: {ecr_repo_name}")
+        return {"ecr_repo_uri": ecr_repo_uri}
+
+    def codebuild_project():
+        print("🏗️ Setting up build environment...")
+        ensure_codebuild_project()
+
+    if on_status_change and not all(steps.done(step) for step in PREBUILD_SETUP_STEPS):
+        on_status_change("PREPARING")
+    setup = steps.run_concurrently({
+        STEP_DETECT_RUNTIME: detect_runtime,
+        STEP_ECR_REPOSITORY: ecr_repository,
+        STEP_CODEBUILD_PROJECT: codebuild_project,
+    })
+    runtime = setup[STEP_DETECT_RUNTIME]["runtime"]
+    ecr_repo_uri = setup[STEP_ECR_REPOSITORY]["ecr_repo_uri"]
+
+    # Step 4: Start the ARM64 build
+    def start():
+        if on_status_change:
+            on_status_change("UPLOADING")
+        print("🚀 Starting build from GitHub...")
+
+        def start_on_project():
+            # Cache hit unless the cached project turned out to be gone
+            ensure_codebuild_project()
+            return start_build(
+                github_url=github_url,
+                github_token=github_token,
+                ecr_repo_uri=ecr_repo_uri,
+                project_name=project_name,
+                start_command=start_command,
+                runtime=runtime,
+                root_directory=root_directory,
+                env_vars=env_vars,
+                compute_type_override=codebuild_compute_type,
+                arm_build=True,
+                build_env=build_env,
+            )
+
+        build_id = refresh_on_failure(CODEBUILD_BOOTSTRAP_KEYS, start_on_project)
+        print(f"🔨 Build started: {build_id}")
+        return {"build_id": build_id, "function_name": project_name}
+
+    build_id = steps.run(STEP_START_BUILD, start)["build_id"]
+
+    return {
+        "build_id": build_id,
+        "function_name": project_name,
+        "ecr_repo_uri": ecr_repo_uri,
+        "runtime": runtime,
+    }
+
+
+def deploy_built_ecs_project(
+    function_name: str,
+    ecr_repo_uri: str,
+    env_vars: Optional[dict] = None,
+    cpu: Optional[int] = None,
+    memory: Optional[int] = None,
+    on_status_change: Optional[callable] = None,
+    subdomain: Optional[str] = None,
+    org_id: Optional[str] = None,
+    instance_type: Optional[str] = None,
+    steps: Optional[DeploySteps] = None,
+) -> dict:
+    """
+    Post-build stage for ECS: run the image a successful build pushed on the
+    service's t4g capacity behind the shared ALB.
+
+    Args:
+        function_name: Project name returned by start_ecs_build
+        ecr_repo_uri: ECR repository URI returned by start_ecs_build
+        steps: Checkpointed steps of this deployment (see complete_build)
+
+    Returns:
+        Dict with service_url, ecs_service_name, task_definition_arn,
+        target_group_arn, listener_rule_arn
+    """
+    steps = steps or DeploySteps()
+    project_name = function_name
+    cpu = cpu or DEFAULT_TASK_CPU
+    memory = memory or DEFAULT_TASK_MEMORY
+
+    # Map memory to instance type if not explicitly provided
+    # All t4g instances have 2 vCPUs, so instance type is determined by memory
+    if not instance_type:
+        instance_type = get_instance_type_from_memory(memory)
+
+    # Task memory must be less than instance total RAM to leave room
+    # for ECS agent, Docker daemon, and OS overhead
+    task_memory = get_task_memory(memory)
+
+    def deploy():
+        # Step 5: Setup ECS EC2 infrastructure
+        if on_status_change:
+            on_status_change("DEPLOYING")
+        print(f"🚀 Deploying to ECS EC2 ({instance_type}, CPU: {cpu}, Memory: {memory}MB)...")
+
+        # 5a: IAM roles
+        execution_role_arn = ecs_task_execution_role_arn()
+        instance_profile_arn = ecs_instance_profile_arn()
+
+        # 5b: Get VPC and subnets (same default VPC as Aurora)
+        if not org_id:
+            raise ValueError("org_id is required for ECS EC2 deployment")
+        vpc_id, subnet_ids = default_vpc()
+
+        # 5c: Setup security groups
+        alb_sg_id = alb_security_group(vpc_id)
+        ecs_sg_id = ecs_security_group(vpc_id, alb_sg_id)
+        ec2_sg_id = ec2_security_group(vpc_id, alb_sg_id)
+
+        # 5d: Setup per-service EC2 infrastructure (launch template → ASG → capacity provider)
+        cluster_name = get_cluster_name(org_id)
+        launch_template_id, instance_type_changed = ensure_launch_template(
+            project_name=project_name,
+            cluster_name=cluster_name,
+            instance_profile_arn=instance_profile_arn,
+            security_group_id=ec2_sg_id,
+            instance_type=instance_type,
+            ami_id=ecs_optimized_ami(),
+        )
+        asg_name, instance_refresh_started = ensure_auto_scaling_group(
+            project_name=project_name,
+            launch_template_id=launch_template_id,
+            subnet_ids=subnet_ids,
+            instance_type_changed=instance_type_changed,
+        )
+
+        try:
+            # If instance type changed, wait for the new EC2 instance to be ready
+            # and registered with ECS before updating the service
+            if instance_refresh_started:
+                wait_for_instance_refresh(asg_name)
+                wait_for_ecs_instance_ready(cluster_name)
+
+            capacity_provider_name = ensure_ec2_capacity_provider(
+                project_name=project_name,
+                asg_name=asg_name,
+            )
+
+            # 5e: Ensure ECS cluster with capacity provider
+            cluster_arn = ensure_ecs_cluster(org_id, capacity_provider_name=capacity_provider_name)
+
+            # 5f: Register task definition
+            image_uri = built_image_uri(steps, ecr_repo_uri)
+            task_def_arn = register_task_definition(
+                project_name=project_name,
+                image_uri=image_uri,
+                cpu=cpu,
+                memory=task_memory,
+                execution_role_arn=execution_role_arn,
+                env_vars=env_vars,
+            )
+
+            # 5f: Create target group
+            target_group_arn = create_target_group(project_name, vpc_id)
+
+            # 5g: Setup ALB and listener rule
+            alb_info = shared_alb(subnet_ids, alb_sg_id)
+            host_header = f"{subdomain}.shorlabs.com" if subdomain else f"{project_name}.shorlabs.com"
+
+            # Get the old target group ARN before updating the listener rule (for cleanup)
+            old_target_group_arn = get_target_group_for_host(alb_info["https_listener_arn"], host_header)
+
+            listener_rule_arn = create_listener_rule(
+                listener_arn=alb_info["https_listener_arn"],
+                target_group_arn=target_group_arn,
+                host_header=host_header,
+            )
+
+            # Clean up old target group if this is a redeployment
+            if old_target_group_arn and old_target_group_arn != target_group_arn:
+                print(f"🧹 Cleaning up old target group from previous deployment...")
+                delete_target_group(old_target_group_arn)
+
+            # 5i: Create or update ECS service
+            service_arn = create_or_update_ecs_service(
+                project_name=project_name,
+                cluster_name=cluster_name,
+                task_definition_arn=task_def_arn,
+                target_group_arn=target_group_arn,
+                subnets=subnet_ids,
+                security_group_id=ecs_sg_id,
+                capacity_provider_name=capacity_provider_name,
+            )
+
+            # Step 6: Wait for service to stabilize
+            ecs_service_name = get_ecs_service_name(project_name)
+            wait_for_service_stable(cluster_name, ecs_service_name)
+
+        finally:
+            # Always restore ASG max_size if it was temporarily bumped for zero-downtime
+            # swap during instance refresh. MaxSize=1 is sufficient — AWS auto-adjusts
+            # DesiredCapacity down to match MaxSize. Without this, a failed deploy leaves
+            # the ASG at MaxSize=2 forever (double instance cost).
+            if instance_refresh_started:
+                try:
+                    asg_name_full = f"{ECS_ASG_PREFIX}-{project_name}"
+                    get_autoscaling_client().update_auto_scaling_group(
+                        AutoScalingGroupName=asg_name_full,
+                        MaxSize=1,
+                    )
+                    print(f"✅ ASG max_size restored to 1")
+                except Exception as e:
+                    print(f"⚠️ Could not restore ASG max_size: {e}")
+
+        service_url = f"https://{host_header}"
+
+        print(f"\n✅ ECS EC2 deployment successful!")
+        print(f"🌐 Your service is live at: {service_url}")
+
+        return {
+            "service_url": service_url,
+            "alb_dns_name": alb_info["alb_dns_name"],
+            "ecs_service_name": ecs_service_name,
+            "function_name": project_name,  # For ECR repo naming consistency
+            "task_definition_arn": task_def_arn,
+            "target_group_arn": target_group_arn,
+            "listener_rule_arn": listener_rule_arn,
+        }
+
+    # Cached roles, security groups, AMI or ALB that no longer exist fail the
+    # deploy; retry once with freshly resolved ones
+    return steps.run(STEP_DEPLOY, lambda: refresh_on_failure(ECS_BOOTSTRAP_KEYS, deploy))
+
+
 def deploy_ecs_project(
     github_url: str,
     github_token: Optional[str] = None,
@@ -64,12 +355,16 @@ def deploy_ecs_project(
     subdomain: Optional[str] = None,
     org_id: Optional[str] = None,
     instance_type: Optional[str] = None,
+    build_env: Optional[dict] = None,
+    checkpoints: Optional[dict] = None,
+    on_checkpoint: Optional[callable] = None,
 ) -> dict:
     """
     Deploy a project from GitHub to ECS backed by EC2 t4g (ARM64) instances.
 
     Uses the same CodeBuild→ECR pipeline as Lambda deployments,
-    but deploys the container to ECS EC2 instead of Lambda.
+    but deploys the container to ECS EC2 instead of Lambda. Both stages
+    run in one call, polling CodeBuild in between.
 
     Args:
         github_url: GitHub repository URL
@@ -84,214 +379,53 @@ def deploy_ecs_project(
         codebuild_compute_type: CodeBuild compute type override
         subdomain: Subdomain for ALB routing (e.g., "my-project-abc123")
         instance_type: EC2 instance type (auto-determined from memory if not provided)
+        build_env: Extra build-only variables (see start_build)
+        checkpoints: {step: outputs} from an earlier attempt of this deployment
+        on_checkpoint: Optional callback(step, outputs, duration_ms) called as each step completes
 
     Returns:
         Dict with service_url, build_id, ecs_service_name, task_definition_arn,
         target_group_arn, listener_rule_arn
     """
-    if not github_token:
-        raise ValueError("github_token is required for authentication")
-
-    cpu = cpu or DEFAULT_TASK_CPU
-    memory = memory or DEFAULT_TASK_MEMORY
-
-    # Map memory to instance type if not explicitly provided
-    # All t4g instances have 2 vCPUs, so instance type is determined by memory
-    if not instance_type:
-        instance_type = get_instance_type_from_memory(memory)
-
-    # Task memory must be less than instance total RAM to leave room
-    # for ECS agent, Docker daemon, and OS overhead
-    task_memory = get_task_memory(memory)
-    
-    # Use project_id for unique naming if provided
-    repo_name = extract_project_name(github_url)
-    if project_id:
-        project_name = f"{repo_name}-{project_id[:8]}"
-    else:
-        project_name = repo_name
+    if not org_id:
+        raise ValueError("org_id is required for ECS EC2 deployment")
 
-    print(f"\n🔧 Shorlabs Deployer (ECS EC2 / {instance_type})")
-    print(f"   Repository: {github_url}")
-    print(f"   Project Name: {project_name}")
-    print(f"   Start Command: {start_command}")
-    print(f"   CPU: {cpu}, Memory: {memory}MB")
-    print(f"   Instance Type: {instance_type}\n")
-
-    # Step 1: Detect runtime
-    if on_status_change:
-        on_status_change("CLONING")
-    print("🔍 Detecting runtime...")
-    runtime = detect_runtime_from_github(github_url, github_token, root_directory)
-    print(f"✅ Detected runtime: {runtime}")
-
-    # Step 2: Create ECR repository (reused from Lambda pipeline)
-    if on_status_change:
-        on_status_change("PREPARING")
-    ecr_repo_name = get_ecr_repo_name(project_name)
-    ecr_repo_uri = create_ecr_repository(ecr_repo_name)
-    print(f"✅ ECR repository ready: {ecr_repo_name}")
-
-    # Step 3: Build Docker image via CodeBuild (reused)
-    print("🏗️ Setting up build environment...")
-    codebuild_role = get_or_create_codebuild_role()
-    create_or_update_codebuild_project(codebuild_role)
-
-    if on_status_change:
-        on_status_change("UPLOADING")
-    print("🚀 Starting build from GitHub...")
-    build_id = start_build(
+    steps = DeploySteps(checkpoints, on_checkpoint)
+    build_started = steps.done(STEP_START_BUILD)
+    build = start_ecs_build(
         github_url=github_url,
         github_token=github_token,
-        ecr_repo_uri=ecr_repo_uri,
-        project_name=project_name,
-        start_command=start_command,
-        runtime=runtime,
         root_directory=root_directory,
+        start_command=start_command,
         env_vars=env_vars,
-        compute_type_override=codebuild_compute_type,
-        arm_build=True,
+        on_status_change=on_status_change,
+        project_id=project_id,
+        codebuild_compute_type=codebuild_compute_type,
+        build_env=build_env,
+        steps=steps,
     )
-    print(f"🔨 Build started: {build_id}")
+    build_id = build["build_id"]
 
-    if on_build_start:
+    if on_build_start and not build_started:
         on_build_start(build_id)
 
     # Step 4: Wait for build
-    if on_status_change:
-        on_status_change("BUILDING")
-    if not wait_for_build(build_id):
-        raise Exception("Build failed")
-    print("✅ Build completed")
-
-    # Step 5: Setup ECS EC2 infrastructure
-    if on_status_change:
-        on_status_change("DEPLOYING")
-    print("🚀 Deploying to ECS EC2...")
-
-    # 5a: IAM roles
-    execution_role_arn = get_or_create_ecs_task_execution_role()
-    instance_profile_arn = get_or_create_ecs_instance_role()
-
-    # 5b: Get VPC and subnets (same default VPC as Aurora)
-    if not org_id:
-        raise ValueError("org_id is required for ECS EC2 deployment")
-    vpc_id, subnet_ids = get_default_vpc_and_subnets()
-
-    # 5c: Setup security groups
-    alb_sg_id = ensure_alb_security_group(vpc_id)
-    ecs_sg_id = ensure_ecs_security_group(vpc_id, alb_sg_id)
-    ec2_sg_id = ensure_ec2_security_group(vpc_id, alb_sg_id)
-
-    # 5d: Setup per-service EC2 infrastructure (launch template → ASG → capacity provider)
-    cluster_name = get_cluster_name(org_id)
-    launch_template_id, instance_type_changed = ensure_launch_template(
-        project_name=project_name,
-        cluster_name=cluster_name,
-        instance_profile_arn=instance_profile_arn,
-        security_group_id=ec2_sg_id,
+    complete_build(steps, build_id, build["ecr_repo_uri"], on_status_change)
+
+    result = deploy_built_ecs_project(
+        function_name=build["function_name"],
+        ecr_repo_uri=build["ecr_repo_uri"],
+        env_vars=env_vars,
+        cpu=cpu,
+        memory=memory,
+        on_status_change=on_status_change,
+        subdomain=subdomain,
+        org_id=org_id,
         instance_type=instance_type,
+        steps=steps,
     )
-    asg_name, instance_refresh_started = ensure_auto_scaling_group(
-        project_name=project_name,
-        launch_template_id=launch_template_id,
-        subnet_ids=subnet_ids,
-        instance_type_changed=instance_type_changed,
-    )
-
-    try:
-        # If instance type changed, wait for the new EC2 instance to be ready
-        # and registered with ECS before updating the service
-        if instance_refresh_started:
-            wait_for_instance_refresh(asg_name)
-            wait_for_ecs_instance_ready(cluster_name)
-
-        capacity_provider_name = ensure_ec2_capacity_provider(
-            project_name=project_name,
-            asg_name=asg_name,
-        )
-
-        # 5e: Ensure ECS cluster with capacity provider
-        cluster_arn = ensure_ecs_cluster(org_id, capacity_provider_name=capacity_provider_name)
 
-        # 5f: Register task definition
-        image_uri = f"{ecr_repo_uri}:latest"
-        task_def_arn = register_task_definition(
-            project_name=project_name,
-            image_uri=image_uri,
-            cpu=cpu,
-            memory=task_memory,
-            execution_role_arn=execution_role_arn,
-            env_vars=env_vars,
-        )
-
-        # 5f: Create target group
-        target_group_arn = create_target_group(project_name, vpc_id)
-
-        # 5g: Setup ALB and listener rule
-        alb_info = ensure_shared_alb(subnet_ids, alb_sg_id)
-        host_header = f"{subdomain}.shorlabs.com" if subdomain else f"{project_name}.shorlabs.com"
-
-        # Get the old target group ARN before updating the listener rule (for cleanup)
-        old_target_group_arn = get_target_group_for_host(alb_info["https_listener_arn"], host_header)
-
-        listener_rule_arn = create_listener_rule(
-            listener_arn=alb_info["https_listener_arn"],
-            target_group_arn=target_group_arn,
-            host_header=host_header,
-        )
-
-        # Clean up old target group if this is a redeployment
-        if old_target_group_arn and old_target_group_arn != target_group_arn:
-            print(f"🧹 Cleaning up old target group from previous deployment...")
-            delete_target_group(old_target_group_arn)
-
-        # 5i: Create or update ECS service
-        service_arn = create_or_update_ecs_service(
-            project_name=project_name,
-            cluster_name=cluster_name,
-            task_definition_arn=task_def_arn,
-            target_group_arn=target_group_arn,
-            subnets=subnet_ids,
-            security_group_id=ecs_sg_id,
-            capacity_provider_name=capacity_provider_name,
-        )
-
-        # Step 6: Wait for service to stabilize
-        ecs_service_name = get_ecs_service_name(project_name)
-        wait_for_service_stable(cluster_name, ecs_service_name)
-
-    finally:
-        # Always restore ASG max_size if it was temporarily bumped for zero-downtime
-        # swap during instance refresh. MaxSize=1 is sufficient — AWS auto-adjusts
-        # DesiredCapacity down to match MaxSize. Without this, a failed deploy leaves
-        # the ASG at MaxSize=2 forever (double instance cost).
-        if instance_refresh_started:
-            try:
-                asg_name_full = f"{ECS_ASG_PREFIX}-{project_name}"
-                get_autoscaling_client().update_auto_scaling_group(
-                    AutoScalingGroupName=asg_name_full,
-                    MaxSize=1,
-                )
-                print(f"✅ ASG max_size restored to 1")
-            except Exception as e:
-                print(f"⚠️ Could not restore ASG max_size: {e}")
-
-    service_url = f"https://{host_header}"
-
-    print(f"\n✅ ECS EC2 deployment successful!")
-    print(f"🌐 Your service is live at: {service_url}")
-
-    return {
-        "service_url": service_url,
-        "alb_dns_name": alb_info["alb_dns_name"],
-        "build_id": build_id,
-        "ecs_service_name": ecs_service_name,
-        "function_name": project_name,  # For ECR repo naming consistency
-        "task_definition_arn": task_def_arn,
-        "target_group_arn": target_group_arn,
-        "listener_rule_arn": listener_rule_arn,
-    }
+    return {**result, "build_id": build_id}
 
 
 def delete_ecs_resources(
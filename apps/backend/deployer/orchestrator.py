@@ -10,19 +10,194 @@ from .utils import extract_project_name  # From utils.py file
 from .utils import detect_runtime_from_github  # From utils/ module
 from .aws import (
     create_ecr_repository,
-    get_or_create_codebuild_role,
-    create_or_update_codebuild_project,
     start_build,
-    wait_for_build,
-    get_or_create_lambda_role,
     create_or_update_lambda,
     delete_lambda,
     delete_ecr_repository,
     delete_lambda_logs,
 )
 from .aws.ecr import get_ecr_repo_name
+from .bootstrap_cache import (
+    CODEBUILD_BOOTSTRAP_KEYS,
+    LAMBDA_BOOTSTRAP_KEYS,
+    ensure_codebuild_project,
+    lambda_role_arn,
+    refresh_on_failure,
+)
+from .steps import (
+    DeploySteps,
+    STEP_DETECT_RUNTIME,
+    STEP_ECR_REPOSITORY,
+    STEP_CODEBUILD_PROJECT,
+    STEP_START_BUILD,
+    STEP_DEPLOY,
+    PREBUILD_SETUP_STEPS,
+    complete_build,
+    built_image_uri,
+)
+
+
+
+
+def start_project_build(
+    github_url: str,
+    github_token: Optional[str] = None,
+    root_directory: str = "./",
+    start_command: str = "uvicorn main:app --host 0.0.0.0 --port 8080",
+    env_vars: Optional[dict] = None,
+    on_status_change: Optional[callable] = None,
+    project_id: Optional[str] = None,
+    codebuild_compute_type: Optional[str] = None,
+    build_env: Optional[dict] = None,
+    steps: Optional[DeploySteps] = None,
+) -> dict:
+    """
+    Pre-build stage: detect the runtime, prepare ECR and CodeBuild, start the build.
+
+    Returns as soon as the build is started. The caller either waits for it
+    (deploy_project) or resumes with deploy_built_project when the CodeBuild
+    state-change event arrives.
+
+    Args:
+        build_env: Extra build-only variables (see start_build)
+        steps: Checkpointed steps of this deployment; steps completed by an
+            earlier attempt are skipped (a started build is never restarted)
+
+    Returns:
+        Dict with 'build_id', 'function_name', 'ecr_repo_uri' and 'runtime'
+    """
+    if not github_token:
+        raise ValueError("github_token is required for authentication")
+    steps = steps or DeploySteps()
+    
+    # Use project_id for unique naming if provided, otherwise fall back to repo name
+    repo_name = extract_project_name(github_url)
+    if project_id:
+        # Use project_id to ensure unique Lambda per deployment
+        project_name = f"{repo_name}-{project_id[:8]}"  # e.g., "fast-api-dockerfile-efe76c65"
+    else:
+        project_name = repo_name
+    
+    print(f"\n🔧 Shorlabs Deployer (Lambda Web Adapter)")
+    print(f"   Repository: {github_url}")
+    print(f"   Project Name: {project_name}")
+    print(f"   Start Command: {start_command}\n")
+    
+    # Steps 1-3 don't depend on each other: detect the runtime via the GitHub
+    # API, create the ECR repository and set up CodeBuild concurrently, under
+    # one deadline (see DeploySteps.run_concurrently)
+    def detect_runtime():
+        print("🔍 Detecting runtime...")
+        runtime = detect_runtime_from_github(github_url, github_token, root_directory)
+        print(f"✅ Detected runtime: {runtime}")
+        return {"runtime": runtime}
+
+    def ecr_repository():
+        ecr_repo_name = get_ecr_repo_name(project_name)
+        ecr_repo_uri = create_ecr_repository(ecr_repo_name)
+        print(f"✅ ECR repository ready: {ecr_repo_name}")
+        return {"ecr_repo_uri": ecr_repo_uri}
+
+    def codebuild_project():
+        print("🏗️ Setting up build environment...")
+        ensure_codebuild_project()
+
+    if on_status_change and not all(steps.done(step) for step in PREBUILD_SETUP_STEPS):
+        on_status_change("PREPARING")
+    setup = steps.run_concurrently({
+        STEP_DETECT_RUNTIME: detect_runtime,
+        STEP_ECR_REPOSITORY: ecr_repository,
+        STEP_CODEBUILD_PROJECT: codebuild_project,
+    })
+    runtime = setup[STEP_DETECT_RUNTIME]["runtime"]
+    ecr_repo_uri = setup[STEP_ECR_REPOSITORY]["ecr_repo_uri"]
+
+    # Step 4: Start build directly from GitHub with detected runtime
+    def start():
+        if on_status_change:
+            on_status_change("UPLOADING")
+        print("🚀 Starting build from GitHub...")
+
+        def start_on_project():
+            # Cache hit unless the cached project turned out to be gone
+            ensure_codebuild_project()
+            return start_build(
+                github_url=github_url,
+                github_token=github_token,
+                ecr_repo_uri=ecr_repo_uri,
+                project_name=project_name,
+                start_command=start_command,
+                runtime=runtime,
+                root_directory=root_directory,
+                env_vars=env_vars,
+                compute_type_override=codebuild_compute_type,
+                build_env=build_env,
+            )
+
+        build_id = refresh_on_failure(CODEBUILD_BOOTSTRAP_KEYS, start_on_project)
+        print(f"🔨 Build started: {build_id}")
+        return {"build_id": build_id, "function_name": project_name}
+
+    build_id = steps.run(STEP_START_BUILD, start)["build_id"]
+
+    return {
+        "build_id": build_id,
+        "function_name": project_name,
+        "ecr_repo_uri": ecr_repo_uri,
+        "runtime": runtime,
+    }
+
+
+def deploy_built_project(
+    function_name: str,
+    ecr_repo_uri: str,
+    env_vars: Optional[dict] = None,
+    memory: Optional[int] = None,
+    timeout: Optional[int] = None,
+    ephemeral_storage: Optional[int] = None,
+    on_status_change: Optional[callable] = None,
+    steps: Optional[DeploySteps] = None,
+) -> dict:
+    """
+    Post-build stage: deploy the image a successful build pushed to Lambda.
+
+    Args:
+        function_name: Project name returned by start_project_build
+        ecr_repo_uri: ECR repository URI returned by start_project_build
+        steps: Checkpointed steps of this deployment (see complete_build)
+
+    Returns:
+        Dict with 'function_url' and 'function_name'
+    """
+    steps = steps or DeploySteps()
 
+    def deploy():
+        if on_status_change:
+            on_status_change("DEPLOYING")
+        print("🚀 Deploying to Lambda...")
+        lambda_role = lambda_role_arn()
+        image_uri = built_image_uri(steps, ecr_repo_uri)
+        
+        function_url = create_or_update_lambda(
+            function_name=function_name,
+            image_uri=image_uri,
+            role_arn=lambda_role,
+            env_vars=env_vars,
+            memory=memory,
+            timeout=timeout,
+            ephemeral_storage=ephemeral_storage,
+        )
+        
+        print(f"\n✅ Deployment successful!")
+        print(f"🌐 Your API is live at: {function_url}")
+        
+        return {
+            "function_url": function_url,
+            "function_name": function_name,  # Return function name for storage
+        }
 
+    # A cached role that no longer exists fails the update; retry with a fresh one
+    return steps.run(STEP_DEPLOY, lambda: refresh_on_failure(LAMBDA_BOOTSTRAP_KEYS, deploy))
 
 
 def deploy_project(
@@ -38,11 +213,15 @@ def deploy_project(
     on_status_change: Optional[callable] = None,
     project_id: Optional[str] = None,
     codebuild_compute_type: Optional[str] = None,
+    build_env: Optional[dict] = None,
+    checkpoints: Optional[dict] = None,
+    on_checkpoint: Optional[callable] = None,
 ) -> str:
     """
     Deploy a project from GitHub to AWS Lambda using Lambda Web Adapter.
 
-    This is the main entry point for deployments.
+    This is the main entry point for blocking deployments: both stages run
+    in one call, polling CodeBuild in between.
 
     Args:
         github_url: GitHub repository URL
@@ -56,6 +235,9 @@ def deploy_project(
         on_build_start: Optional callback(build_id) called immediately when build starts
         project_id: Unique project identifier for Lambda naming (ensures unique per deployment)
         codebuild_compute_type: CodeBuild compute type override (e.g. BUILD_GENERAL1_SMALL for hobby)
+        build_env: Extra build-only variables (see start_build)
+        checkpoints: {step: outputs} from an earlier attempt of this deployment
+        on_checkpoint: Optional callback(step, outputs, duration_ms) called as each step completes
         
     Returns:
         Dict with 'function_url', 'build_id', and 'function_name'
@@ -63,94 +245,42 @@ def deploy_project(
     Raises:
         Exception: If deployment fails
     """
-    if not github_token:
-        raise ValueError("github_token is required for authentication")
-    
-    # Use project_id for unique naming if provided, otherwise fall back to repo name
-    repo_name = extract_project_name(github_url)
-    if project_id:
-        # Use project_id to ensure unique Lambda per deployment
-        project_name = f"{repo_name}-{project_id[:8]}"  # e.g., "fast-api-dockerfile-efe76c65"
-    else:
-        project_name = repo_name
-    
-    print(f"\n🔧 Shorlabs Deployer (Lambda Web Adapter)")
-    print(f"   Repository: {github_url}")
-    print(f"   Project Name: {project_name}")
-    print(f"   Start Command: {start_command}\n")
-    
-    # Step 1: Detect runtime via GitHub API
-    if on_status_change:
-        on_status_change("CLONING")
-    print("🔍 Detecting runtime...")
-    runtime = detect_runtime_from_github(github_url, github_token, root_directory)
-    print(f"✅ Detected runtime: {runtime}")
-    
-    # Step 2: Create ECR repository
-    if on_status_change:
-        on_status_change("PREPARING")
-    ecr_repo_name = get_ecr_repo_name(project_name)
-    ecr_repo_uri = create_ecr_repository(ecr_repo_name)
-    print(f"✅ ECR repository ready: {ecr_repo_name}")
-    
-    # Step 3: Setup CodeBuild
-    print("🏗️ Setting up build environment...")
-    codebuild_role = get_or_create_codebuild_role()
-    create_or_update_codebuild_project(codebuild_role)
-    
-    # Step 4: Start build directly from GitHub with detected runtime
-    if on_status_change:
-        on_status_change("UPLOADING")
-    print("🚀 Starting build from GitHub...")
-    build_id = start_build(
+    steps = DeploySteps(checkpoints, on_checkpoint)
+    build_started = steps.done(STEP_START_BUILD)
+    build = start_project_build(
         github_url=github_url,
         github_token=github_token,
-        ecr_repo_uri=ecr_repo_uri,
-        project_name=project_name,
-        start_command=start_command,
-        runtime=runtime,
         root_directory=root_directory,
+        start_command=start_command,
         env_vars=env_vars,
-        compute_type_override=codebuild_compute_type,
+        on_status_change=on_status_change,
+        project_id=project_id,
+        codebuild_compute_type=codebuild_compute_type,
+        build_env=build_env,
+        steps=steps,
     )
-    print(f"🔨 Build started: {build_id}")
+    build_id = build["build_id"]
     
     # Call the callback immediately so deployment record can be created
-    if on_build_start:
+    if on_build_start and not build_started:
         on_build_start(build_id)
     
     # Step 5: Wait for build
-    if on_status_change:
-        on_status_change("BUILDING")
-    if not wait_for_build(build_id):
-        raise Exception("Build failed")
-    print("✅ Build completed")
+    complete_build(steps, build_id, build["ecr_repo_uri"], on_status_change)
     
     # Step 6: Deploy to Lambda
-    if on_status_change:
-        on_status_change("DEPLOYING")
-    print("🚀 Deploying to Lambda...")
-    lambda_role = get_or_create_lambda_role()
-    image_uri = f"{ecr_repo_uri}:latest"
-    
-    function_url = create_or_update_lambda(
-        function_name=project_name,
-        image_uri=image_uri,
-        role_arn=lambda_role,
+    result = deploy_built_project(
+        function_name=build["function_name"],
+        ecr_repo_uri=build["ecr_repo_uri"],
         env_vars=env_vars,
         memory=memory,
         timeout=timeout,
         ephemeral_storage=ephemeral_storage,
+        on_status_change=on_status_change,
+        steps=steps,
     )
     
-    print(f"\n✅ Deployment successful!")
-    print(f"🌐 Your API is live at: {function_url}")
-    
-    return {
-        "function_url": function_url,
-        "build_id": build_id,
-        "function_name": project_name,  # Return function name for storage
-    }
+    return {**result, "build_id": build_id}
 
 
 def delete_project_resources(github_url: str, function_name: Optional[str] = None) -> dict:
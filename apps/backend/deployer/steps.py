@@ -0,0 +1,204 @@
+"""
+Deploy Steps
+
+Checkpointed steps shared by the Lambda and ECS orchestrators.
+
+A deploy is a fixed sequence of steps, each idempotent on its own:
+
+    detect_runtime → ecr_repository → codebuild_project → start_build → build → deploy
+
+Every completed step's outputs (runtime, ECR URI, build id, image digest,
+function/service URL) go to on_checkpoint along with its duration, which
+the API persists on the deployment record. A retried deploy passes them
+back in as checkpoints: completed steps are skipped and their outputs
+reused, so a redelivered message picks up after the last completed step
+instead of rebuilding.
+
+The first three steps don't depend on each other; run_concurrently runs
+them in parallel under one deadline, so time-to-build-start is the slowest
+of them rather than their sum.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+from .aws import wait_for_build
+from .aws.cloudwatch import get_build_cache_stats
+from .aws.ecr import get_image_digest
+
+
+STEP_DETECT_RUNTIME = "detect_runtime"
+STEP_ECR_REPOSITORY = "ecr_repository"
+STEP_CODEBUILD_PROJECT = "codebuild_project"
+STEP_START_BUILD = "start_build"
+STEP_BUILD = "build"
+STEP_DEPLOY = "deploy"
+
+DEPLOY_STEPS = (
+    STEP_DETECT_RUNTIME,
+    STEP_ECR_REPOSITORY,
+    STEP_CODEBUILD_PROJECT,
+    STEP_START_BUILD,
+    STEP_BUILD,
+    STEP_DEPLOY,
+)
+
+# Independent setup before the build starts (runtime detection, ECR, CodeBuild)
+PREBUILD_SETUP_STEPS = (STEP_DETECT_RUNTIME, STEP_ECR_REPOSITORY, STEP_CODEBUILD_PROJECT)
+PREBUILD_DEADLINE_SECONDS = float(os.environ.get("PREBUILD_DEADLINE_SECONDS", "60"))
+
+# Shared across deploys in this process; a step that misses the deadline
+# keeps its worker until it returns, so the pool is sized for a few of those
+_prebuild_executor = ThreadPoolExecutor(max_workers=12, thread_name_prefix="deploy-prebuild")
+
+
+class PrebuildError(Exception):
+    """One or more concurrent pre-build steps failed or missed the deadline."""
+
+    def __init__(self, errors: Dict[str, str]):
+        self.errors = errors
+        details = "; ".join(f"{step}: {error}" for step, error in errors.items())
+        super().__init__(f"Pre-build setup failed ({details})")
+
+
+class DeploySteps:
+    """
+    Runs each named step at most once per deployment.
+
+    Args:
+        checkpoints: {step: outputs} of steps completed by an earlier attempt
+        on_checkpoint: Optional callback(step, outputs, duration_ms) after each
+            step completes
+    """
+
+    def __init__(
+        self,
+        checkpoints: Optional[Dict[str, dict]] = None,
+        on_checkpoint: Optional[Callable[[str, dict, int], None]] = None,
+    ):
+        self.outputs = {step: dict(out) for step, out in (checkpoints or {}).items()}
+        self.timings: Dict[str, int] = {}
+        self.on_checkpoint = on_checkpoint
+
+    def done(self, step: str) -> bool:
+        return step in self.outputs
+
+    def _complete(self, step: str, outputs: Optional[dict], duration_ms: int) -> dict:
+        outputs = outputs or {}
+        self.outputs[step] = outputs
+        self.timings[step] = duration_ms
+        if self.on_checkpoint:
+            self.on_checkpoint(step, outputs, duration_ms)
+        return outputs
+
+    def run(self, step: str, fn: Callable[[], Optional[dict]]) -> dict:
+        """Run fn() unless step is already checkpointed; return the step's outputs."""
+        if step in self.outputs:
+            print(f"⏭️ Step {step}: already completed, reusing checkpoint")
+            return self.outputs[step]
+
+        start = time.monotonic()
+        outputs = fn()
+        return self._complete(step, outputs, int((time.monotonic() - start) * 1000))
+
+    def run_concurrently(
+        self,
+        fns: Dict[str, Callable[[], Optional[dict]]],
+        deadline_seconds: float = PREBUILD_DEADLINE_SECONDS,
+    ) -> Dict[str, dict]:
+        """
+        Run independent steps in parallel under one shared deadline.
+
+        Steps that succeed are checkpointed even if others fail, so a retry
+        only reruns the failures.
+
+        Raises:
+            PrebuildError: with every failed or timed-out step and its error
+        """
+        pending = {}
+        for step, fn in fns.items():
+            if step in self.outputs:
+                print(f"⏭️ Step {step}: already completed, reusing checkpoint")
+            else:
+                pending[step] = fn
+
+        def timed(fn):
+            start = time.monotonic()
+            outputs = fn()
+            return outputs, int((time.monotonic() - start) * 1000)
+
+        start = time.monotonic()
+        futures = {_prebuild_executor.submit(timed, fn): step for step, fn in pending.items()}
+        done, _ = wait(futures, timeout=deadline_seconds)
+
+        errors = {}
+        for future, step in futures.items():
+            if future not in done:
+                future.cancel()  # Stop waiting; a running call finishes on its own
+                errors[step] = f"timed out after {deadline_seconds:g}s"
+            elif future.exception() is not None:
+                error = future.exception()
+                errors[step] = f"{type(error).__name__}: {error}"
+            else:
+                self._complete(step, *future.result())
+
+        if pending:
+            elapsed = time.monotonic() - start
+            breakdown = ", ".join(
+                f"{step} {self.timings[step] / 1000:.1f}s" if step in self.timings else f"{step} failed"
+                for step in pending
+            )
+            print(f"⏱️ Pre-build setup took {elapsed:.1f}s ({breakdown})")
+        if errors:
+            raise PrebuildError(errors)
+        return {step: self.outputs[step] for step in fns}
+
+
+def complete_build(
+    steps: DeploySteps,
+    build_id: str,
+    ecr_repo_uri: str,
+    on_status_change: Optional[callable] = None,
+    build_status: Optional[str] = None,
+) -> dict:
+    """
+    The build step: wait for the build (or take the status reported by its
+    state-change event) and record the digest of the image it pushed, with
+    the build's layer cache statistics when it reported them.
+
+    A failed build raises and is not checkpointed; a retry re-reads the
+    build's status rather than starting a new one.
+    """
+    def build():
+        if build_status is None:
+            if on_status_change:
+                on_status_change("BUILDING")
+            succeeded = wait_for_build(build_id)
+        else:
+            succeeded = build_status == "SUCCEEDED"
+        if not succeeded:
+            raise Exception(f"Build failed with status: {build_status}" if build_status else "Build failed")
+        print("✅ Build completed")
+        outputs = {"image_digest": get_image_digest(ecr_repo_uri.split("/", 1)[-1])}
+
+        cache = get_build_cache_stats(build_id)
+        if cache:
+            print(
+                f"🧱 Layer cache: {cache['cached']}/{cache['steps']} build steps cached"
+                + (f", docker build took {cache['build_seconds']}s" if "build_seconds" in cache else "")
+            )
+            outputs["build_cache"] = cache
+        return outputs
+
+    return steps.run(STEP_BUILD, build)
+
+
+def built_image_uri(steps: DeploySteps, ecr_repo_uri: str) -> str:
+    """
+    The image to deploy: pinned to the digest the build step recorded, so a
+    resumed deploy ships exactly the image its own build produced.
+    """
+    digest = steps.outputs.get(STEP_BUILD, {}).get("image_digest")
+    return f"{ecr_repo_uri}@{digest}" if digest else f"{ecr_repo_uri}:latest"
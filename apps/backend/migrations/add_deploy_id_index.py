@@ -0,0 +1,127 @@
+"""
+Migration script: Add the deploy-id-index GSI to the deployments table.
+
+get_deployment() and update_deployment() resolve a deploy_id with a Query
+on deploy-id-index instead of listing a service's whole deployment history.
+New tables get the index from get_or_create_deployments_table(); this
+script adds it to an existing table.
+
+Every deployment item already carries a string deploy_id (create_deployment
+writes it), so DynamoDB backfills the index from existing items and no
+deployment items are rewritten. Items with a missing or non-string deploy_id
+are reported; they stay out of the index and cannot be looked up by ID.
+
+Run modes:
+- DRY_RUN=true (default): Print what would happen, no writes
+- DRY_RUN=false: Create the index and wait for ACTIVE
+
+Usage:
+    python migrations/add_deploy_id_index.py                # dry run
+    DRY_RUN=false python migrations/add_deploy_id_index.py  # real migration
+"""
+import os
+import time
+
+import boto3
+
+DRY_RUN = os.environ.get("DRY_RUN", "true").lower() in ("true", "1", "yes")
+DEPLOYMENTS_TABLE_NAME = os.environ.get("DEPLOYMENTS_TABLE", "shorlabs-deployments")
+DEPLOY_ID_INDEX_NAME = "deploy-id-index"
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(DEPLOYMENTS_TABLE_NAME)
+
+
+def index_exists() -> bool:
+    """Check whether deploy-id-index is already defined on the table."""
+    description = dynamodb.meta.client.describe_table(TableName=DEPLOYMENTS_TABLE_NAME)["Table"]
+    indexes = description.get("GlobalSecondaryIndexes", [])
+    return any(i["IndexName"] == DEPLOY_ID_INDEX_NAME for i in indexes)
+
+
+def get_items_without_deploy_id():
+    """Find deployment items whose deploy_id is missing or not a string."""
+    items = []
+    last_key = None
+
+    while True:
+        scan_kwargs = {
+            "FilterExpression": "NOT attribute_type(deploy_id, :s)",
+            "ExpressionAttributeValues": {":s": "S"},
+            "ProjectionExpression": "project_id, SK",
+        }
+        if last_key:
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+        response = table.scan(**scan_kwargs)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+
+    return items
+
+
+def create_index():
+    """Add deploy-id-index to the table and wait until DynamoDB finishes the backfill."""
+    dynamodb.meta.client.update_table(
+        TableName=DEPLOYMENTS_TABLE_NAME,
+        AttributeDefinitions=[
+            {"AttributeName": "deploy_id", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexUpdates=[
+            {
+                "Create": {
+                    "IndexName": DEPLOY_ID_INDEX_NAME,
+                    "KeySchema": [
+                        {"AttributeName": "deploy_id", "KeyType": "HASH"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            },
+        ],
+    )
+    print(f"  + Requested index creation: {DEPLOY_ID_INDEX_NAME}")
+
+    while True:
+        description = dynamodb.meta.client.describe_table(TableName=DEPLOYMENTS_TABLE_NAME)["Table"]
+        index = next(
+            i for i in description.get("GlobalSecondaryIndexes", [])
+            if i["IndexName"] == DEPLOY_ID_INDEX_NAME
+        )
+        status = index["IndexStatus"]
+        if status == "ACTIVE":
+            print(f"  + Index is ACTIVE")
+            return
+        print(f"  ... index status: {status} (backfilling={index.get('Backfilling', False)})")
+        time.sleep(15)
+
+
+def main():
+    print(f"{'='*62}")
+    print(f"  Shorlabs Migration: deploy-id-index on deployments table")
+    print(f"  Mode:  {'DRY RUN' if DRY_RUN else 'LIVE MIGRATION'}")
+    print(f"  Table: {DEPLOYMENTS_TABLE_NAME}")
+    print(f"{'='*62}")
+
+    if index_exists():
+        print(f"\n{DEPLOY_ID_INDEX_NAME} already exists. Nothing to migrate!")
+        return
+
+    unindexable = get_items_without_deploy_id()
+    print(f"\nFound {len(unindexable)} deployment(s) without a string deploy_id (left unindexed).")
+    for item in unindexable:
+        print(f"  {item['project_id']} / {item['SK']}")
+
+    if DRY_RUN:
+        print(f"\n[DRY RUN] would create {DEPLOY_ID_INDEX_NAME} on {DEPLOYMENTS_TABLE_NAME}")
+        print(f"\nThis was a DRY RUN. To apply changes, run:")
+        print(f"  DRY_RUN=false python {__file__}")
+        return
+
+    create_index()
+    print(f"\nMigration complete.")
+
+
+if __name__ == "__main__":
+    main()
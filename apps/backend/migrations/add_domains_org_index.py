@@ -0,0 +1,153 @@
+"""
+Migration script: Add the organization_id-index GSI to the domains table.
+
+GET /api/projects loads every custom domain of an org with one Query on
+organization_id-index (load_org_snapshot) instead of one project_id-index
+Query per service. New tables get the index from
+get_or_create_domains_table(); this script adds it to an existing table.
+
+DynamoDB backfills a new GSI from existing items, but only items that carry
+the key attribute are indexed. Domain items written by add_custom_domain()
+always have organization_id; older items without it are backfilled from
+their service (domain items store the service_id in project_id).
+
+Run modes:
+- DRY_RUN=true (default): Print what would happen, no writes
+- DRY_RUN=false: Backfill organization_id, create the index and wait for ACTIVE
+
+Usage:
+    python migrations/add_domains_org_index.py                # dry run
+    DRY_RUN=false python migrations/add_domains_org_index.py  # real migration
+"""
+import os
+import time
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+DRY_RUN = os.environ.get("DRY_RUN", "true").lower() in ("true", "1", "yes")
+DOMAINS_TABLE_NAME = os.environ.get("DOMAINS_TABLE", "shorlabs-domains")
+SERVICES_TABLE_NAME = os.environ.get("SERVICES_TABLE", "shorlabs-services")
+DOMAINS_ORG_INDEX_NAME = "organization_id-index"
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(DOMAINS_TABLE_NAME)
+services_table = dynamodb.Table(SERVICES_TABLE_NAME)
+
+
+def index_exists() -> bool:
+    """Check whether organization_id-index is already defined on the table."""
+    description = dynamodb.meta.client.describe_table(TableName=DOMAINS_TABLE_NAME)["Table"]
+    indexes = description.get("GlobalSecondaryIndexes", [])
+    return any(i["IndexName"] == DOMAINS_ORG_INDEX_NAME for i in indexes)
+
+
+def get_domains_without_org():
+    """Find domain items missing a string organization_id."""
+    items = []
+    last_key = None
+
+    while True:
+        scan_kwargs = {
+            "FilterExpression": "NOT attribute_type(organization_id, :s)",
+            "ExpressionAttributeValues": {":s": "S"},
+            "ProjectionExpression": "#d, SK, project_id",
+            "ExpressionAttributeNames": {"#d": "domain"},
+        }
+        if last_key:
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+        response = table.scan(**scan_kwargs)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+
+    return items
+
+
+def backfill_org_ids(items: list):
+    """Copy organization_id from the owning service onto each domain item."""
+    for item in items:
+        response = services_table.query(
+            IndexName="service-id-index",
+            KeyConditionExpression=Key("service_id").eq(item.get("project_id", "")),
+        )
+        services = response.get("Items", [])
+        if not services:
+            print(f"  ⚠️ {item['domain']}: service {item.get('project_id')} not found, skipping")
+            continue
+
+        org_id = services[0]["organization_id"]
+        print(f"  {item['domain']}: organization_id -> {org_id}")
+        if DRY_RUN:
+            continue
+        table.update_item(
+            Key={"domain": item["domain"], "SK": item["SK"]},
+            UpdateExpression="SET organization_id = :o",
+            ExpressionAttributeValues={":o": org_id},
+        )
+
+
+def create_index():
+    """Add organization_id-index to the table and wait until DynamoDB finishes the backfill."""
+    dynamodb.meta.client.update_table(
+        TableName=DOMAINS_TABLE_NAME,
+        AttributeDefinitions=[
+            {"AttributeName": "organization_id", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexUpdates=[
+            {
+                "Create": {
+                    "IndexName": DOMAINS_ORG_INDEX_NAME,
+                    "KeySchema": [
+                        {"AttributeName": "organization_id", "KeyType": "HASH"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            },
+        ],
+    )
+    print(f"  + Requested index creation: {DOMAINS_ORG_INDEX_NAME}")
+
+    while True:
+        description = dynamodb.meta.client.describe_table(TableName=DOMAINS_TABLE_NAME)["Table"]
+        index = next(
+            i for i in description.get("GlobalSecondaryIndexes", [])
+            if i["IndexName"] == DOMAINS_ORG_INDEX_NAME
+        )
+        status = index["IndexStatus"]
+        if status == "ACTIVE":
+            print(f"  + Index is ACTIVE")
+            return
+        print(f"  ... index status: {status} (backfilling={index.get('Backfilling', False)})")
+        time.sleep(15)
+
+
+def main():
+    print(f"{'='*62}")
+    print(f"  Shorlabs Migration: organization_id-index on domains table")
+    print(f"  Mode:  {'DRY RUN' if DRY_RUN else 'LIVE MIGRATION'}")
+    print(f"  Table: {DOMAINS_TABLE_NAME}")
+    print(f"{'='*62}")
+
+    missing = get_domains_without_org()
+    print(f"\nFound {len(missing)} domain(s) without organization_id.\n")
+    backfill_org_ids(missing)
+
+    if index_exists():
+        print(f"\n{DOMAINS_ORG_INDEX_NAME} already exists. Nothing else to migrate!")
+        return
+
+    if DRY_RUN:
+        print(f"\n[DRY RUN] would create {DOMAINS_ORG_INDEX_NAME} on {DOMAINS_TABLE_NAME}")
+        print(f"\nThis was a DRY RUN. To apply changes, run:")
+        print(f"  DRY_RUN=false python {__file__}")
+        return
+
+    create_index()
+    print(f"\nMigration complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Migration script: Add the started-hour-index GSI to the deployments table.
+
+The usage aggregator computes build seconds from the deployments that
+started inside the aggregation window. It reads them with one range query
+on started-hour-index (started_hour = "YYYY-MM-DDTHH", sorted by started_at)
+instead of listing every LIVE service's deployment history each hour.
+New tables get the index from get_or_create_deployments_table(); this
+script adds it to an existing table.
+
+create_deployment() writes started_hour for new deployments. Existing items
+only have started_at, so this script backfills started_hour from it before
+creating the index (items without a string started_at stay unindexed).
+
+Run modes:
+- DRY_RUN=true (default): Print what would happen, no writes
+- DRY_RUN=false: Backfill started_hour, create the index and wait for ACTIVE
+
+Usage:
+    python migrations/add_started_hour_index.py                # dry run
+    DRY_RUN=false python migrations/add_started_hour_index.py  # real migration
+"""
+import os
+import time
+
+import boto3
+
+DRY_RUN = os.environ.get("DRY_RUN", "true").lower() in ("true", "1", "yes")
+DEPLOYMENTS_TABLE_NAME = os.environ.get("DEPLOYMENTS_TABLE", "shorlabs-deployments")
+DEPLOY_STARTED_INDEX_NAME = "started-hour-index"
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(DEPLOYMENTS_TABLE_NAME)
+
+
+def index_exists() -> bool:
+    """Check whether started-hour-index is already defined on the table."""
+    description = dynamodb.meta.client.describe_table(TableName=DEPLOYMENTS_TABLE_NAME)["Table"]
+    indexes = description.get("GlobalSecondaryIndexes", [])
+    return any(i["IndexName"] == DEPLOY_STARTED_INDEX_NAME for i in indexes)
+
+
+def get_items_without_started_hour():
+    """Find deployment items with a string started_at but no started_hour."""
+    items = []
+    last_key = None
+
+    while True:
+        scan_kwargs = {
+            "FilterExpression": "attribute_type(started_at, :s) AND attribute_not_exists(started_hour)",
+            "ExpressionAttributeValues": {":s": "S"},
+            "ProjectionExpression": "project_id, SK, started_at",
+        }
+        if last_key:
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+        response = table.scan(**scan_kwargs)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+
+    return items
+
+
+def backfill_started_hour(items: list):
+    """Set started_hour = started_at[:13] (same bucket create_deployment writes)."""
+    for item in items:
+        started_hour = item["started_at"][:13]
+        if DRY_RUN:
+            continue
+        table.update_item(
+            Key={"project_id": item["project_id"], "SK": item["SK"]},
+            UpdateExpression="SET started_hour = :h",
+            ConditionExpression="attribute_exists(SK)",
+            ExpressionAttributeValues={":h": started_hour},
+        )
+    print(f"  {'[DRY RUN] would backfill' if DRY_RUN else 'Backfilled'} started_hour on {len(items)} deployment(s)")
+
+
+def create_index():
+    """Add started-hour-index to the table and wait until DynamoDB finishes the backfill."""
+    dynamodb.meta.client.update_table(
+        TableName=DEPLOYMENTS_TABLE_NAME,
+        AttributeDefinitions=[
+            {"AttributeName": "started_hour", "AttributeType": "S"},
+            {"AttributeName": "started_at", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexUpdates=[
+            {
+                "Create": {
+                    "IndexName": DEPLOY_STARTED_INDEX_NAME,
+                    "KeySchema": [
+                        {"AttributeName": "started_hour", "KeyType": "HASH"},
+                        {"AttributeName": "started_at", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {
+                        "ProjectionType": "INCLUDE",
+                        "NonKeyAttributes": ["deploy_id", "finished_at", "status"],
+                    },
+                },
+            },
+        ],
+    )
+    print(f"  + Requested index creation: {DEPLOY_STARTED_INDEX_NAME}")
+
+    while True:
+        description = dynamodb.meta.client.describe_table(TableName=DEPLOYMENTS_TABLE_NAME)["Table"]
+        index = next(
+            i for i in description.get("GlobalSecondaryIndexes", [])
+            if i["IndexName"] == DEPLOY_STARTED_INDEX_NAME
+        )
+        status = index["IndexStatus"]
+        if status == "ACTIVE":
+            print(f"  + Index is ACTIVE")
+            return
+        print(f"  ... index status: {status} (backfilling={index.get('Backfilling', False)})")
+        time.sleep(15)
+
+
+def main():
+    print(f"{'='*62}")
+    print(f"  Shorlabs Migration: started-hour-index on deployments table")
+    print(f"  Mode:  {'DRY RUN' if DRY_RUN else 'LIVE MIGRATION'}")
+    print(f"  Table: {DEPLOYMENTS_TABLE_NAME}")
+    print(f"{'='*62}")
+
+    # Backfill even if the index exists: items written by an older API
+    # version after the index was created still need started_hour
+    missing = get_items_without_started_hour()
+    print(f"\nFound {len(missing)} deployment(s) without started_hour.\n")
+    backfill_started_hour(missing)
+
+    if index_exists():
+        print(f"\n{DEPLOY_STARTED_INDEX_NAME} already exists.")
+        return
+
+    if DRY_RUN:
+        print(f"\n[DRY RUN] would create {DEPLOY_STARTED_INDEX_NAME} on {DEPLOYMENTS_TABLE_NAME}")
+        print(f"\nThis was a DRY RUN. To apply changes, run:")
+        print(f"  DRY_RUN=false python {__file__}")
+        return
+
+    create_index()
+    print(f"\nMigration complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Migration script: Add the subdomain-index GSI to the services table.
+
+The Lambda@Edge router and generate_unique_subdomain() resolve a subdomain
+with a Query on subdomain-index instead of scanning shorlabs-services.
+New tables get the index from get_or_create_services_table(); this script
+adds it to an existing table.
+
+DynamoDB backfills a new GSI from the items already in the table, so no
+service items are rewritten. The only cleanup needed is removing
+`subdomain` attributes that are not strings (e.g. NULL), because DynamoDB
+rejects index keys of the wrong type.
+
+Run modes:
+- DRY_RUN=true (default): Print what would happen, no writes
+- DRY_RUN=false: Clean up bad items, create the index and wait for ACTIVE
+
+Usage:
+    python migrations/add_subdomain_index.py                # dry run
+    DRY_RUN=false python migrations/add_subdomain_index.py  # real migration
+"""
+import os
+import time
+
+import boto3
+
+DRY_RUN = os.environ.get("DRY_RUN", "true").lower() in ("true", "1", "yes")
+SERVICES_TABLE_NAME = os.environ.get("SERVICES_TABLE", "shorlabs-services")
+SUBDOMAIN_INDEX_NAME = "subdomain-index"
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(SERVICES_TABLE_NAME)
+
+
+def index_exists() -> bool:
+    """Check whether subdomain-index is already defined on the table."""
+    description = dynamodb.meta.client.describe_table(TableName=SERVICES_TABLE_NAME)["Table"]
+    indexes = description.get("GlobalSecondaryIndexes", [])
+    return any(i["IndexName"] == SUBDOMAIN_INDEX_NAME for i in indexes)
+
+
+def get_items_with_invalid_subdomain():
+    """Find service items whose subdomain attribute exists but is not a string."""
+    items = []
+    last_key = None
+
+    while True:
+        scan_kwargs = {
+            "FilterExpression": "attribute_exists(subdomain) AND NOT attribute_type(subdomain, :s)",
+            "ExpressionAttributeValues": {":s": "S"},
+            "ProjectionExpression": "PK, SK, service_id, subdomain",
+        }
+        if last_key:
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+        response = table.scan(**scan_kwargs)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+
+    return items
+
+
+def remove_invalid_subdomains(items: list):
+    """Drop non-string subdomain attributes so the GSI backfill can index the table."""
+    for item in items:
+        print(f"  Service {item.get('service_id')}: subdomain={item.get('subdomain')!r} -> REMOVE")
+        if DRY_RUN:
+            continue
+        table.update_item(
+            Key={"PK": item["PK"], "SK": item["SK"]},
+            UpdateExpression="REMOVE subdomain",
+        )
+
+
+def create_index():
+    """Add subdomain-index to the table and wait until DynamoDB finishes the backfill."""
+    dynamodb.meta.client.update_table(
+        TableName=SERVICES_TABLE_NAME,
+        AttributeDefinitions=[
+            {"AttributeName": "subdomain", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexUpdates=[
+            {
+                "Create": {
+                    "IndexName": SUBDOMAIN_INDEX_NAME,
+                    "KeySchema": [
+                        {"AttributeName": "subdomain", "KeyType": "HASH"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+            },
+        ],
+    )
+    print(f"  + Requested index creation: {SUBDOMAIN_INDEX_NAME}")
+
+    while True:
+        description = dynamodb.meta.client.describe_table(TableName=SERVICES_TABLE_NAME)["Table"]
+        index = next(
+            i for i in description.get("GlobalSecondaryIndexes", [])
+            if i["IndexName"] == SUBDOMAIN_INDEX_NAME
+        )
+        status = index["IndexStatus"]
+        if status == "ACTIVE":
+            print(f"  + Index is ACTIVE")
+            return
+        print(f"  ... index status: {status} (backfilling={index.get('Backfilling', False)})")
+        time.sleep(15)
+
+
+def main():
+    print(f"{'='*62}")
+    print(f"  Shorlabs Migration: subdomain-index on services table")
+    print(f"  Mode:  {'DRY RUN' if DRY_RUN else 'LIVE MIGRATION'}")
+    print(f"  Table: {SERVICES_TABLE_NAME}")
+    print(f"{'='*62}")
+
+    if index_exists():
+        print(f"\n{SUBDOMAIN_INDEX_NAME} already exists. Nothing to migrate!")
+        return
+
+    invalid = get_items_with_invalid_subdomain()
+    print(f"\nFound {len(invalid)} service(s) with a non-string subdomain.\n")
+    remove_invalid_subdomains(invalid)
+
+    if DRY_RUN:
+        print(f"\n[DRY RUN] would create {SUBDOMAIN_INDEX_NAME} on {SERVICES_TABLE_NAME}")
+        print(f"\nThis was a DRY RUN. To apply changes, run:")
+        print(f"  DRY_RUN=false python {__file__}")
+        return
+
+    create_index()
+    print(f"\nMigration complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Migration script: Backfill the shorlabs-routes table used by the edge router.
+
+The Lambda@Edge router resolves every host with one GetItem on
+shorlabs-routes. The API keeps that table in sync on deploy, domain and
+delete changes, but services and domains created before the table existed
+have no route items yet. This script writes them:
+
+1. One "subdomain" route per web-app / web-service (PENDING if not deployed)
+2. One "custom_domain" route per ACTIVE custom domain
+
+Route items are built with the same helper the API uses
+(build_route_item), so they match what a redeploy would write.
+
+Run this BEFORE deploying the router that reads shorlabs-routes.
+
+Run modes:
+- DRY_RUN=true (default): Print what would happen, no writes
+- DRY_RUN=false: Create the table if needed and write route items
+
+Usage:
+    python migrations/backfill_routes.py                # dry run
+    DRY_RUN=false python migrations/backfill_routes.py  # real migration
+"""
+import os
+import sys
+
+import boto3
+
+# Add parent to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.db.dynamodb import (  # noqa: E402
+    build_route_item,
+    get_or_create_routes_table,
+    subdomain_host,
+    ROUTES_TABLE_NAME,
+)
+
+DRY_RUN = os.environ.get("DRY_RUN", "true").lower() in ("true", "1", "yes")
+SERVICES_TABLE_NAME = os.environ.get("SERVICES_TABLE", "shorlabs-services")
+DOMAINS_TABLE_NAME = os.environ.get("DOMAINS_TABLE", "shorlabs-domains")
+
+dynamodb = boto3.resource("dynamodb")
+
+
+def scan_all(table_name: str, **scan_kwargs) -> list:
+    """Paginated scan of a whole table."""
+    table = dynamodb.Table(table_name)
+    items = []
+    last_key = None
+
+    while True:
+        if last_key:
+            scan_kwargs["ExclusiveStartKey"] = last_key
+        response = table.scan(**scan_kwargs)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+
+    return items
+
+
+def collect_routes() -> list:
+    """Build route items for every routable service subdomain and ACTIVE custom domain."""
+    services = scan_all(
+        SERVICES_TABLE_NAME,
+        FilterExpression="attribute_exists(subdomain)",
+    )
+    services_by_id = {s["service_id"]: s for s in services}
+
+    routes = []
+    for svc in services:
+        if svc.get("service_type") == "database" or not svc.get("subdomain"):
+            continue
+        routes.append(build_route_item(subdomain_host(svc["subdomain"]), svc, "subdomain"))
+
+    domains = scan_all(
+        DOMAINS_TABLE_NAME,
+        FilterExpression="#st = :active",
+        ExpressionAttributeNames={"#st": "status"},
+        ExpressionAttributeValues={":active": "ACTIVE"},
+    )
+    for d in domains:
+        # Domain items store the service_id in project_id
+        svc = services_by_id.get(d.get("project_id"))
+        if not svc:
+            print(f"  ⚠️ Domain {d['domain']}: service {d.get('project_id')} not found, skipping")
+            continue
+        routes.append(build_route_item(d["domain"], svc, "custom_domain"))
+
+    return routes
+
+
+def main():
+    print(f"{'='*62}")
+    print(f"  Shorlabs Migration: backfill host → origin routes")
+    print(f"  Mode:  {'DRY RUN' if DRY_RUN else 'LIVE MIGRATION'}")
+    print(f"  Table: {ROUTES_TABLE_NAME}")
+    print(f"{'='*62}")
+
+    routes = collect_routes()
+    print(f"\nFound {len(routes)} route(s) to write.\n")
+
+    for route in routes:
+        target = route.get("origin_domain", "-")
+        print(f"  {route['host']} [{route['host_kind']}] -> {route['origin_kind']}:{target} ({route['status']})")
+
+    if DRY_RUN:
+        print(f"\nThis was a DRY RUN. To apply changes, run:")
+        print(f"  DRY_RUN=false python {__file__}")
+        return
+
+    table = get_or_create_routes_table()
+    with table.batch_writer() as batch:
+        for route in routes:
+            batch.put_item(Item=route)
+
+    print(f"\nMigration complete. Wrote {len(routes)} route(s).")
+
+
+if __name__ == "__main__":
+    main()
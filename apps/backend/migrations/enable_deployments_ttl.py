@@ -0,0 +1,159 @@
+"""
+Migration script: Enable DynamoDB TTL on the deployments table.
+
+With DEPLOYMENT_RETENTION_DAYS set on the API, update_deployment() stamps
+the deployments a newly SUCCEEDED one supersedes (and a FAILED one itself)
+with expires_at (epoch seconds) and DynamoDB deletes them once that time
+passes, keeping per-service history queries small. New tables get TTL
+enabled by get_or_create_deployments_table(); this script enables it on an
+existing table and can optionally stamp existing deployments.
+
+Existing deployments are only stamped when RETENTION_DAYS is set here; their
+expiry is computed from started_at. Only deployments older than a service's
+newest SUCCEEDED one are stamped, so the deployment serving traffic (and
+anything newer) is kept. Earlier API versions stamped the previous
+deployment as soon as a new one was created; if that one is still the live
+deployment, its expires_at is removed.
+
+Run modes:
+- DRY_RUN=true (default): Print what would happen, no writes
+- DRY_RUN=false: Enable TTL (and stamp existing items if RETENTION_DAYS is set)
+
+Usage:
+    python migrations/enable_deployments_ttl.py                                   # dry run
+    DRY_RUN=false python migrations/enable_deployments_ttl.py                     # enable TTL only
+    DRY_RUN=false RETENTION_DAYS=90 python migrations/enable_deployments_ttl.py   # enable + stamp
+"""
+import os
+from datetime import datetime, timezone
+
+import boto3
+
+DRY_RUN = os.environ.get("DRY_RUN", "true").lower() in ("true", "1", "yes")
+DEPLOYMENTS_TABLE_NAME = os.environ.get("DEPLOYMENTS_TABLE", "shorlabs-deployments")
+RETENTION_DAYS = int(os.environ.get("RETENTION_DAYS", "0"))
+TTL_ATTRIBUTE = "expires_at"
+
+dynamodb = boto3.resource("dynamodb")
+table = dynamodb.Table(DEPLOYMENTS_TABLE_NAME)
+
+
+def ttl_enabled() -> bool:
+    """Check whether TTL is already enabled on expires_at."""
+    description = dynamodb.meta.client.describe_time_to_live(TableName=DEPLOYMENTS_TABLE_NAME)
+    spec = description.get("TimeToLiveDescription", {})
+    return spec.get("TimeToLiveStatus") in ("ENABLED", "ENABLING") and spec.get("AttributeName") == TTL_ATTRIBUTE
+
+
+def get_deployments():
+    """Scan all deployments, grouped by service (newest first)."""
+    by_service = {}
+    last_key = None
+
+    while True:
+        scan_kwargs = {
+            "ProjectionExpression": "project_id, SK, started_at, #st, expires_at",
+            "ExpressionAttributeNames": {"#st": "status"},
+        }
+        if last_key:
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+        response = table.scan(**scan_kwargs)
+        for item in response.get("Items", []):
+            by_service.setdefault(item["project_id"], []).append(item)
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+
+    for items in by_service.values():
+        items.sort(key=lambda i: i["SK"], reverse=True)
+    return by_service
+
+
+def _live_index(items: list) -> int:
+    """Index of the newest SUCCEEDED deployment (the live one), else of the newest."""
+    for i, item in enumerate(items):
+        if item.get("status") == "SUCCEEDED":
+            return i
+    return 0
+
+
+def unstamp_live(by_service: dict):
+    """Remove expires_at from each service's live deployment if it was stamped."""
+    unstamped = 0
+    for service_id, items in by_service.items():
+        live = items[_live_index(items)]
+        if "expires_at" not in live:
+            continue
+        unstamped += 1
+        print(f"  ↺ {service_id} / {live['SK']}: live deployment was stamped, removing expires_at")
+        if DRY_RUN:
+            continue
+        table.update_item(
+            Key={"project_id": live["project_id"], "SK": live["SK"]},
+            UpdateExpression="REMOVE expires_at",
+        )
+    return unstamped
+
+
+def stamp_expiry(by_service: dict):
+    """Set expires_at = started_at + RETENTION_DAYS on unstamped deployments older than the live one."""
+    stamped = 0
+    for service_id, items in by_service.items():
+        for item in items[_live_index(items) + 1:]:
+            if "expires_at" in item:
+                continue
+            try:
+                started = datetime.fromisoformat(item["started_at"]).replace(tzinfo=timezone.utc)
+            except (KeyError, TypeError, ValueError):
+                print(f"  ⚠️ {service_id} / {item['SK']}: no usable started_at, skipping")
+                continue
+            expires_at = int(started.timestamp()) + RETENTION_DAYS * 86400
+            stamped += 1
+            if DRY_RUN:
+                continue
+            table.update_item(
+                Key={"project_id": item["project_id"], "SK": item["SK"]},
+                UpdateExpression="SET expires_at = :e",
+                ExpressionAttributeValues={":e": expires_at},
+            )
+    return stamped
+
+
+def main():
+    print(f"{'='*62}")
+    print(f"  Shorlabs Migration: TTL on deployments table")
+    print(f"  Mode:  {'DRY RUN' if DRY_RUN else 'LIVE MIGRATION'}")
+    print(f"  Table: {DEPLOYMENTS_TABLE_NAME}")
+    print(f"{'='*62}")
+
+    if ttl_enabled():
+        print(f"\nTTL already enabled on {TTL_ATTRIBUTE}.")
+    elif DRY_RUN:
+        print(f"\n[DRY RUN] would enable TTL on {TTL_ATTRIBUTE}")
+    else:
+        dynamodb.meta.client.update_time_to_live(
+            TableName=DEPLOYMENTS_TABLE_NAME,
+            TimeToLiveSpecification={"Enabled": True, "AttributeName": TTL_ATTRIBUTE},
+        )
+        print(f"\n  + Enabled TTL on {TTL_ATTRIBUTE}")
+
+    by_service = get_deployments()
+    unstamped = unstamp_live(by_service)
+    print(f"\n{'Would unstamp' if DRY_RUN else 'Unstamped'} {unstamped} live deployment(s).")
+
+    if RETENTION_DAYS > 0:
+        stamped = stamp_expiry(by_service)
+        print(f"\n{'Would stamp' if DRY_RUN else 'Stamped'} {stamped} deployment(s) "
+              f"across {len(by_service)} service(s) with a {RETENTION_DAYS}-day expiry.")
+
+    if DRY_RUN:
+        print(f"\nThis was a DRY RUN. To apply changes, run:")
+        print(f"  DRY_RUN=false python {__file__}")
+        return
+
+    print(f"\nMigration complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Migration script: Rebuild the WARM_TARGETS set in the projects table.
+
+The Lambda warmer reads its targets with one Query on the WARM_TARGETS
+partition instead of scanning every service and checking plan and throttle
+state per org. The API keeps that set current on deploy, delete, throttle
+changes and Autumn plan webhooks; this script builds it from scratch:
+
+1. One item per LIVE web-app with a function_url (plan tier from Autumn,
+   throttle flag from THROTTLE_STATE)
+2. Items for services that no longer qualify are removed
+3. The META item is written last; until it exists the warmer keeps
+   falling back to the full scan
+
+Safe to re-run at any time (e.g. after an outage of the incremental updates).
+
+Run modes:
+- DRY_RUN=true (default): Print what would happen, no writes
+- DRY_RUN=false: Write the set and the META item
+
+Usage:
+    python migrations/rebuild_warm_targets.py                # dry run
+    DRY_RUN=false python migrations/rebuild_warm_targets.py  # real migration
+"""
+import os
+import sys
+
+import boto3
+
+# Add parent to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.db.dynamodb import (  # noqa: E402
+    TABLE_NAME,
+    build_warm_target,
+    get_or_create_table,
+    get_throttle_state,
+    list_warm_targets,
+    mark_warm_targets_built,
+)
+from api.lambda_warmer import _is_paid_org  # noqa: E402
+from api.usage_aggregator import _resolve_function_name  # noqa: E402
+
+DRY_RUN = os.environ.get("DRY_RUN", "true").lower() in ("true", "1", "yes")
+SERVICES_TABLE_NAME = os.environ.get("SERVICES_TABLE", "shorlabs-services")
+
+dynamodb = boto3.resource("dynamodb")
+
+
+def scan_all(table_name: str, **scan_kwargs) -> list:
+    """Paginated scan of a whole table."""
+    table = dynamodb.Table(table_name)
+    items = []
+    last_key = None
+
+    while True:
+        if last_key:
+            scan_kwargs["ExclusiveStartKey"] = last_key
+        response = table.scan(**scan_kwargs)
+        items.extend(response.get("Items", []))
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            break
+
+    return items
+
+
+def collect_warm_targets() -> list:
+    """Build warm-target items for every LIVE web-app with a function_url."""
+    services = scan_all(
+        SERVICES_TABLE_NAME,
+        FilterExpression="#st = :live AND attribute_exists(function_url)",
+        ExpressionAttributeNames={"#st": "status"},
+        ExpressionAttributeValues={":live": "LIVE"},
+    )
+
+    paid_by_org = {}
+    throttled_by_org = {}
+    targets = []
+    for svc in services:
+        if svc.get("service_type", "web-app") != "web-app":
+            continue
+        org_id = svc.get("organization_id")
+        if not org_id:
+            continue
+
+        if org_id not in paid_by_org:
+            paid_by_org[org_id] = _is_paid_org(org_id)
+            state = get_throttle_state(org_id)
+            throttled_by_org[org_id] = bool(state and state.get("is_throttled"))
+
+        targets.append(build_warm_target(
+            svc,
+            function_name=_resolve_function_name(svc),
+            is_paid=paid_by_org[org_id],
+            is_throttled=throttled_by_org[org_id],
+        ))
+
+    return targets
+
+
+def main():
+    print(f"{'='*62}")
+    print(f"  Shorlabs Migration: rebuild warm targets")
+    print(f"  Mode:  {'DRY RUN' if DRY_RUN else 'LIVE MIGRATION'}")
+    print(f"  Table: {TABLE_NAME}")
+    print(f"{'='*62}")
+
+    targets = collect_warm_targets()
+    wanted = {t["SK"] for t in targets}
+    stale = [t for t in list_warm_targets() if t["SK"] not in wanted]
+
+    paid = sum(1 for t in targets if t["plan"] == "paid")
+    throttled = sum(1 for t in targets if t["is_throttled"])
+    print(f"\nFound {len(targets)} warm target(s): {paid} paid, {throttled} throttled.")
+    print(f"{len(stale)} stale target(s) to remove.\n")
+
+    for target in targets:
+        flags = [target["plan"]] + (["throttled"] if target["is_throttled"] else [])
+        print(f"  {target['organization_id']} / {target['name']}: {target['function_url']} ({', '.join(flags)})")
+
+    if DRY_RUN:
+        print(f"\nThis was a DRY RUN. To apply changes, run:")
+        print(f"  DRY_RUN=false python {__file__}")
+        return
+
+    table = get_or_create_table()
+    with table.batch_writer() as batch:
+        for target in targets:
+            batch.put_item(Item=target)
+        for target in stale:
+            batch.delete_item(Key={"PK": target["PK"], "SK": target["SK"]})
+
+    mark_warm_targets_built(len(targets))
+    print(f"\nMigration complete. Wrote {len(targets)} target(s), removed {len(stale)}.")
+
+
+if __name__ == "__main__":
+    main()
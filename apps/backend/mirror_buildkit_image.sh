@@ -0,0 +1,73 @@
+#!/bin/bash
+#
+# Mirror the pinned BuildKit image into ECR for the CodeBuild builds
+#
+# The buildspecs create their buildx builder from
+# <account>.dkr.ecr.<region>.amazonaws.com/shorlabs-buildkit:<tag>
+# (BUILDKIT_ECR_REPOSITORY / BUILDKIT_IMAGE_TAG in deployer/config.py)
+# instead of pulling moby/buildkit anonymously from Docker Hub, which
+# rate-limits CodeBuild's shared egress IPs. Run this once per account and
+# region, and again before bumping BUILDKIT_IMAGE_TAG.
+#
+# The copy is registry to registry (docker buildx imagetools), so every
+# platform of the image is mirrored and nothing is pulled locally.
+#
+
+set -e
+
+# Load environment variables from .env file
+if [ -f .env ]; then
+    set -a
+    source .env
+    set +a
+    echo "✅ Loaded AWS credentials from .env"
+else
+    echo "❌ .env file not found!"
+    exit 1
+fi
+
+REGION="${AWS_DEFAULT_REGION:-us-east-1}"
+AWS_ACCOUNT_ID=$(aws sts get-caller-identity --query Account --output text)
+REPOSITORY=$(python3 -c "from deployer.config import BUILDKIT_ECR_REPOSITORY; print(BUILDKIT_ECR_REPOSITORY)")
+TAG=$(python3 -c "from deployer.config import BUILDKIT_IMAGE_TAG; print(BUILDKIT_IMAGE_TAG)")
+SOURCE_IMAGE="docker.io/moby/buildkit:$TAG"
+REGISTRY="$AWS_ACCOUNT_ID.dkr.ecr.$REGION.amazonaws.com"
+TARGET_IMAGE="$REGISTRY/$REPOSITORY:$TAG"
+
+echo "🔧 Mirroring BuildKit image..."
+echo "   Region: $REGION"
+echo "   Source: $SOURCE_IMAGE"
+echo "   Target: $TARGET_IMAGE"
+
+# Step 1: Create the mirror repository (tags are immutable: a pinned tag never changes)
+echo "📦 Setting up ECR repository..."
+aws ecr describe-repositories --repository-names "$REPOSITORY" --region "$REGION" > /dev/null 2>&1 || \
+aws ecr create-repository \
+  --repository-name "$REPOSITORY" \
+  --image-tag-mutability IMMUTABLE \
+  --region "$REGION" \
+  > /dev/null
+
+echo "✅ Repository ready: $REPOSITORY"
+
+# Step 2: Copy the image unless this tag is already mirrored
+if aws ecr describe-images \
+    --repository-name "$REPOSITORY" \
+    --image-ids imageTag="$TAG" \
+    --region "$REGION" > /dev/null 2>&1; then
+  echo "✅ $TAG already mirrored, nothing to do"
+  exit 0
+fi
+
+echo "🔐 Logging in to ECR..."
+aws ecr get-login-password --region "$REGION" | docker login --username AWS --password-stdin "$REGISTRY"
+
+echo "📤 Copying $SOURCE_IMAGE → $TARGET_IMAGE..."
+docker buildx imagetools create --tag "$TARGET_IMAGE" "$SOURCE_IMAGE"
+
+echo ""
+echo "✅ BuildKit image mirrored successfully!"
+echo ""
+echo "   Image: $TARGET_IMAGE"
+echo ""
+echo "Builds pick it up through BUILDKIT_IMAGE_TAG in deployer/config.py"
@@ -4,37 +4,59 @@ Lambda@Edge Router for Shorlabs Wildcard Subdomains + Custom Domains
 This function runs at CloudFront edge locations and routes requests
 based on the subdomain or custom domain to the correct user's Lambda function.
 
-Routing priority:
-1. *.shorlabs.com → subdomain lookup (existing flow)
-2. Any other domain → custom domain lookup via shorlabs-domains table (O(1) GetItem)
+Routing:
+1. Reserved / external *.shorlabs.com subdomains are handled in code
+2. Hosts in the route snapshot, unchanged since it was compiled → routed
+   from memory (no per-host DynamoDB call)
+3. Every other host → one GetItem on the shorlabs-routes table, keyed by host.
+   Route items are written by the API on deploy, domain and delete changes and
+   already hold the origin domain, kind and timeouts.
 
 Deployed to us-east-1 (required for Lambda@Edge).
 
+The route snapshot (see _RouteSnapshot) is a sorted, versioned compilation of
+the routes table published by the API (EventBridge action "publish_routes")
+and bundled into the package by deploy_router.sh; newer snapshots are fetched
+from S3 in the background, never on a request. Snapshot age alone does not
+decide staleness: the API stamps every route write and delete in a change
+log item (see _RouteChanges), and a host changed after the snapshot's
+version is looked up in DynamoDB instead. DynamoDB lookups are cached per
+container (see _HostCache).
+
 Note: Lambda@Edge has limitations:
 - Max 5 seconds timeout for origin-request
 - Max 10KB response body for viewer-request
 - Limited SDK access (we use DynamoDB directly)
+- No environment variables (cache tuning lives in constants below)
 """
 
+import bisect
+import gzip
 import json
 import os
+import threading
+import time
+from collections import OrderedDict
+
 import boto3
 from botocore.config import Config
 
 
 # Configure DynamoDB client for edge
-# Note: Lambda@Edge runs in multiple regions, but we always query us-east-1
+# Note: Lambda@Edge runs in multiple regions, but we always query us-east-1.
+# A single attempt with tight timeouts keeps a failed lookup at ~3s, leaving
+# room inside the 5s origin-request budget to fall back to a stale cache entry.
 dynamodb_config = Config(
     region_name='us-east-1',
-    connect_timeout=2,
-    read_timeout=3,
+    connect_timeout=1,
+    read_timeout=2,
+    retries={'total_max_attempts': 1},
 )
 dynamodb = boto3.resource('dynamodb', config=dynamodb_config)
 
-# Services table for subdomain lookup; domains table for custom domain lookup
-SERVICES_TABLE_NAME = os.environ.get('SERVICES_TABLE', 'shorlabs-services')
-DOMAINS_TABLE_NAME = os.environ.get('DOMAINS_TABLE', 'shorlabs-domains')
-DOMAIN_ITEM_SK = 'META'
+# Host → origin routing table (subdomains and custom domains)
+ROUTES_TABLE_NAME = os.environ.get('ROUTES_TABLE', 'shorlabs-routes')
+ROUTE_STATUS_ACTIVE = 'ACTIVE'
 SHORLABS_DOMAIN = 'shorlabs.com'
 RESERVED_SUBDOMAINS = {'www', 'api', 'app', 'admin', 'dashboard', 'docs'}
 
@@ -44,21 +66,310 @@ EXTERNAL_SUBDOMAINS = {
     'clerk': 'frontend-api.clerk.services',
 }
 
+# Host resolution cache (per warm container)
+HOST_CACHE_MAX_ENTRIES = 2048
+HOST_CACHE_HIT_TTL = 60        # seconds an ACTIVE route stays cached
+HOST_CACHE_MISS_TTL = 10       # seconds a 404 / not-ready result stays cached
+HOST_CACHE_STALE_TTL = 3600    # max age of an entry served when DynamoDB is failing
+HOST_CACHE_WAIT_SECONDS = 3.5  # how long a coalesced caller waits for the in-flight lookup
+
+
+class HostLookupError(Exception):
+    """DynamoDB lookup failed and no stale entry was available."""
+
+
+class _HostCache:
+    """
+    Bounded LRU cache for host → route lookups.
+
+    - Hits and misses have separate TTLs, so a newly deployed service or an
+      activated custom domain becomes routable within HOST_CACHE_MISS_TTL.
+    - Concurrent misses for the same key are coalesced: one caller queries
+      DynamoDB, the others wait for its result (single-flight).
+    - If the lookup raises, the last known value is served for up to
+      HOST_CACHE_STALE_TTL (stale-if-error) instead of failing the request.
+    """
+
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at, stored_at)
+        self._inflight = {}  # key -> threading.Event
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, loader) -> dict | None:
+        """Return the cached value for key, calling loader() on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(key)
+                return entry[0]
+            event = self._inflight.get(key)
+            is_leader = event is None
+            if is_leader:
+                event = threading.Event()
+                self._inflight[key] = event
+
+        if not is_leader:
+            event.wait(HOST_CACHE_WAIT_SECONDS)
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry:
+                return entry[0]
+            raise HostLookupError(f"Concurrent lookup for {key[1]} did not complete")
+
+        try:
+            try:
+                value = loader()
+            except Exception as e:
+                stale = self._stale_value(key)
+                if stale is _NO_ENTRY:
+                    raise HostLookupError(str(e)) from e
+                print(f"Serving stale route for {key[1]} after lookup error: {e}")
+                return stale
+            self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _stale_value(self, key: tuple):
+        """Return a stale value still inside HOST_CACHE_STALE_TTL, extending its life briefly."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry or now - entry[2] > HOST_CACHE_STALE_TTL:
+                return _NO_ENTRY
+            # Back off for a miss-TTL before hitting DynamoDB again
+            self._entries[key] = (entry[0], now + HOST_CACHE_MISS_TTL, entry[2])
+            return entry[0]
+
+    def _store(self, key: tuple, value: dict | None) -> None:
+        now = time.monotonic()
+        ttl = HOST_CACHE_HIT_TTL if _is_routable(value) else HOST_CACHE_MISS_TTL
+        with self._lock:
+            self._entries[key] = (value, now + ttl, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+_NO_ENTRY = object()
+_host_cache = _HostCache(HOST_CACHE_MAX_ENTRIES)
+
+
+def _is_routable(route: dict | None) -> bool:
+    """True when a route has an origin to send traffic to (cached with the hit TTL)."""
+    return bool(route) and route.get('status') == ROUTE_STATUS_ACTIVE and bool(route.get('origin_domain'))
+
+
+# ─────────────────────────────────────────────────────────────
+# ROUTE SNAPSHOT
+# ─────────────────────────────────────────────────────────────
+
+# Snapshot bundled next to lambda_function.py by deploy_router.sh
+ROUTE_SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routes_snapshot.json.gz')
+ROUTE_SNAPSHOT_FORMAT = 1
+# A snapshot older than this is ignored: the API prunes change log entries
+# after an hour (ROUTE_CHANGES_RETENTION_SECONDS), so it could no longer
+# tell which of the snapshot's hosts changed.
+ROUTE_SNAPSHOT_MAX_AGE = 3000
+ROUTE_SNAPSHOT_REFRESH_INTERVAL = 300  # seconds between background S3 refreshes per container
+
+# Route change log (host → epoch ms of its last write or delete), written by the API
+ROUTE_CHANGES_HOST = '#changes'
+ROUTE_CHANGES_TTL = 10               # seconds a container reuses its copy of the change log
+ROUTE_CHANGES_MARGIN_MS = 5000       # clock skew allowance between the API and the publisher
+
+s3_config = Config(
+    region_name='us-east-1',
+    connect_timeout=1,
+    read_timeout=2,
+    retries={'total_max_attempts': 1},
+)
+
+
+class _RouteSnapshot:
+    """Sorted host list + parallel route rows, searched with bisect."""
+
+    def __init__(self, doc: dict, etag: str | None = None):
+        if doc.get('format') != ROUTE_SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported route snapshot format: {doc.get('format')}")
+        self.version = doc['version']
+        self.generated_at = float(doc['generated_at'])
+        self.source = doc.get('source') or {}
+        self.etag = etag
+        self._fields = doc['fields']
+        self._hosts = doc['hosts']
+        self._routes = doc['routes']
+
+    def is_fresh(self, now: float) -> bool:
+        return now - self.generated_at <= ROUTE_SNAPSHOT_MAX_AGE
+
+    def lookup(self, host: str) -> dict | None:
+        i = bisect.bisect_left(self._hosts, host)
+        if i < len(self._hosts) and self._hosts[i] == host:
+            return dict(zip(self._fields, self._routes[i]))
+        return None
+
+    @classmethod
+    def from_bytes(cls, payload: bytes, etag: str | None = None) -> '_RouteSnapshot':
+        return cls(json.loads(gzip.decompress(payload)), etag=etag)
+
+
+class _RouteChanges:
+    """
+    Per-container copy of the route change log item.
+
+    Re-read with one GetItem at most every ROUTE_CHANGES_TTL seconds, by
+    whichever request finds it expired; if that read fails the previous
+    copy is kept. Until a first copy is loaded no snapshot host is trusted.
+    """
+
+    def __init__(self):
+        self._hosts = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def changed_since(self, host: str, version: int) -> bool:
+        """True if host was written or deleted after (or close to) snapshot version."""
+        hosts = self._current()
+        if hosts is None:
+            return True
+        changed_at = hosts.get(host)
+        return changed_at is not None and int(changed_at) >= version - ROUTE_CHANGES_MARGIN_MS
+
+    def _current(self) -> dict | None:
+        now = time.monotonic()
+        if now >= self._expires_at and self._lock.acquire(blocking=False):
+            try:
+                if now >= self._expires_at:
+                    self._expires_at = now + ROUTE_CHANGES_TTL
+                    try:
+                        item = dynamodb.Table(ROUTES_TABLE_NAME).get_item(
+                            Key={'host': ROUTE_CHANGES_HOST},
+                        ).get('Item') or {}
+                        item.pop('host', None)
+                        self._hosts = item
+                    except Exception as e:
+                        print(f"Route change log read failed: {e}")
+            finally:
+                self._lock.release()
+        return self._hosts
+
+
+_route_changes = _RouteChanges()
+
+_snapshot = None
+_snapshot_bundle_checked = False
+_snapshot_next_refresh = 0.0
+_snapshot_lock = threading.Lock()
+_s3 = None
+
+
+def _load_bundled_snapshot() -> '_RouteSnapshot | None':
+    """Parse the snapshot shipped in the deployment package, if any."""
+    if not os.path.exists(ROUTE_SNAPSHOT_FILE):
+        return None
+    try:
+        with open(ROUTE_SNAPSHOT_FILE, 'rb') as f:
+            snapshot = _RouteSnapshot.from_bytes(f.read())
+        print(f"Loaded bundled route snapshot v{snapshot.version}")
+        return snapshot
+    except Exception as e:
+        print(f"Bundled route snapshot unreadable: {e}")
+        return None
+
+
+def _fetch_snapshot_from_s3(current: '_RouteSnapshot') -> '_RouteSnapshot | None':
+    """Fetch the latest published snapshot from the location recorded in the current one."""
+    global _s3
+    bucket = current.source.get('bucket')
+    key = current.source.get('key')
+    if not bucket or not key:
+        return None
+
+    if _s3 is None:
+        _s3 = boto3.client('s3', config=s3_config)
+
+    kwargs = {'Bucket': bucket, 'Key': key}
+    if current.etag:
+        kwargs['IfNoneMatch'] = current.etag
+    try:
+        response = _s3.get_object(**kwargs)
+    except Exception as e:
+        # 304 Not Modified surfaces as a ClientError; either way keep what we have
+        if '304' not in str(e):
+            print(f"Route snapshot refresh failed: {e}")
+        return None
+
+    snapshot = _RouteSnapshot.from_bytes(response['Body'].read(), etag=response.get('ETag'))
+    print(f"Refreshed route snapshot v{snapshot.version}")
+    return snapshot
+
+
+def _refresh_snapshot(current: '_RouteSnapshot') -> None:
+    """Background thread: replace the snapshot with the latest published one, if newer."""
+    global _snapshot
+    try:
+        refreshed = _fetch_snapshot_from_s3(current)
+    except Exception as e:
+        print(f"Route snapshot refresh failed: {e}")
+        return
+    if refreshed is not None:
+        _snapshot = refreshed
+
+
+def _get_snapshot() -> '_RouteSnapshot | None':
+    """
+    Return a snapshot young enough to check against the change log, or None
+    to fall back to DynamoDB.
+
+    The bundled file is parsed once per container. Every
+    ROUTE_SNAPSHOT_REFRESH_INTERVAL a background thread fetches the latest
+    published snapshot (a conditional GET, usually a 304); requests keep
+    using the current one meanwhile and never wait on S3.
+    """
+    global _snapshot, _snapshot_bundle_checked, _snapshot_next_refresh
+    now = time.time()
+
+    if not _snapshot_bundle_checked:
+        with _snapshot_lock:
+            if not _snapshot_bundle_checked:
+                _snapshot = _load_bundled_snapshot()
+                _snapshot_bundle_checked = True
+
+    snapshot = _snapshot
+    if snapshot is None:
+        return None
+
+    if now >= _snapshot_next_refresh and _snapshot_lock.acquire(blocking=False):
+        try:
+            if now >= _snapshot_next_refresh:
+                _snapshot_next_refresh = now + ROUTE_SNAPSHOT_REFRESH_INTERVAL
+                threading.Thread(target=_refresh_snapshot, args=(snapshot,), daemon=True).start()
+        finally:
+            _snapshot_lock.release()
+
+    return snapshot if snapshot.is_fresh(now) else None
+
 
 def handler(event, context):
     """
     Origin Request handler for CloudFront.
 
     Routes requests by:
-    1. If Host is *.shorlabs.com → extract subdomain → lookup project
-    2. Otherwise → treat as custom domain → lookup DOMAIN# item
+    1. Reserved / external *.shorlabs.com subdomains → handled in code
+    2. Hosts in the route snapshot, unchanged since → forward to the snapshot origin
+    3. Anything else → look up the host in the routes table and forward to its origin
     """
     request = event['Records'][0]['cf']['request']
     headers = request['headers']
 
     host = headers.get('host', [{'value': ''}])[0]['value'].lower().strip()
 
-    # ── Route 1: Shorlabs subdomain routing ──────────────────────
+    # ── Shorlabs subdomains handled without a lookup ─────────────
     if host.endswith(f'.{SHORLABS_DOMAIN}'):
         parts = host.split('.')
         if len(parts) < 3:
@@ -74,68 +385,48 @@ def handler(event, context):
         if subdomain in EXTERNAL_SUBDOMAINS:
             return _proxy_to_external(request, EXTERNAL_SUBDOMAINS[subdomain])
 
-        # Look up project by subdomain
-        project = _lookup_project_by_subdomain(subdomain)
-        if not project:
-            return _error_response(404, "Not Found", f"No project found for subdomain: {subdomain}")
-
-        return _route_to_origin(request, project, host)
-
-    # ── Route 2: Custom domain routing ───────────────────────────
-    project = _lookup_project_by_custom_domain(host)
-    if project:
-        return _route_to_origin(request, project, host)
-
-    return _error_response(404, "Not Found", f"No project found for domain: {host}")
-
-
-def _route_to_origin(request: dict, project: dict, original_host: str) -> dict:
-    """Route request to the correct origin based on service type (Lambda or ECS ALB)."""
-    service_type = project.get('service_type', 'web-app')
-
-    if service_type == 'web-service':
-        # ECS: route to the ALB using its DNS name
-        alb_domain = project.get('alb_dns_name')
-        if not alb_domain:
-            return _error_response(503, "Not Ready", "Web service deployment not complete")
-
-        request['origin'] = {
-            'custom': {
-                'domainName': alb_domain,
-                'port': 443,
-                'protocol': 'https',
-                'sslProtocols': ['TLSv1.2'],
-                'readTimeout': 60,
-                'keepaliveTimeout': 60,
-                'customHeaders': {}
-            }
-        }
-        # ALB uses host-based routing, so keep the original host header
-        request['headers']['host'] = [{'key': 'Host', 'value': original_host}]
-        request['headers']['x-forwarded-host'] = [{'key': 'X-Forwarded-Host', 'value': original_host}]
-        return request
-
-    # Lambda (web-app): existing flow
-    lambda_url = project.get('function_url')
-    if not lambda_url:
+    # ── Snapshot: hosts known at publish time and not changed since ──
+    snapshot = _get_snapshot()
+    if snapshot is not None:
+        route = snapshot.lookup(host)
+        if route and not _route_changes.changed_since(host, snapshot.version):
+            return _route_to_origin(request, route, host)
+
+    # ── Subdomain + custom domain routing: one keyed read ────────
+    try:
+        route = _host_cache.get(('host', host), lambda: _lookup_route(host))
+    except HostLookupError as e:
+        print(f"DynamoDB route lookup error: {e}")
+        return _error_response(503, "Unavailable", "Routing lookup failed, please retry")
+
+    if not route:
+        return _error_response(404, "Not Found", f"No project found for host: {host}")
+    if not _is_routable(route):
         return _error_response(503, "Not Ready", "Project deployment not complete")
 
-    lambda_domain = lambda_url.replace('https://', '').replace('http://', '').rstrip('/')
+    return _route_to_origin(request, route, host)
+
+
+def _route_to_origin(request: dict, route: dict, original_host: str) -> dict:
+    """Point the request at the route's precomputed origin (Lambda URL or ECS ALB)."""
+    origin_domain = route['origin_domain']
 
     request['origin'] = {
         'custom': {
-            'domainName': lambda_domain,
+            'domainName': origin_domain,
             'port': 443,
             'protocol': 'https',
             'sslProtocols': ['TLSv1.2'],
-            'readTimeout': 30,
-            'keepaliveTimeout': 5,
+            'readTimeout': int(route.get('read_timeout', 30)),
+            'keepaliveTimeout': int(route.get('keepalive_timeout', 5)),
             'customHeaders': {}
         }
     }
-    request['headers']['host'] = [{'key': 'Host', 'value': lambda_domain}]
+    # ALB uses host-based routing and keeps the original host;
+    # Lambda Function URLs require Host to be the function URL domain
+    host_header = original_host if route.get('preserve_host') else origin_domain
+    request['headers']['host'] = [{'key': 'Host', 'value': host_header}]
     request['headers']['x-forwarded-host'] = [{'key': 'X-Forwarded-Host', 'value': original_host}]
-
     return request
 
 
@@ -156,62 +447,22 @@ def _proxy_to_external(request: dict, external_domain: str) -> dict:
     return request
 
 
-def _lookup_project_by_subdomain(subdomain: str) -> dict | None:
-    """
-    Look up service by subdomain in the shorlabs-services table.
-
-    Uses a table scan with filter - for production scale, add a GSI on subdomain.
-    """
-    try:
-        table = dynamodb.Table(SERVICES_TABLE_NAME)
-
-        response = table.scan(
-            FilterExpression="subdomain = :sd",
-            ExpressionAttributeValues={
-                ":sd": subdomain,
-            },
-            ProjectionExpression="function_url, subdomain, #st, service_type, alb_dns_name",
-            ExpressionAttributeNames={"#st": "status"},
-        )
-
-        items = response.get('Items', [])
-        if items:
-            return items[0]
-        return None
-
-    except Exception as e:
-        print(f"DynamoDB subdomain lookup error: {e}")
-        return None
-
-
-def _lookup_project_by_custom_domain(domain: str) -> dict | None:
+def _lookup_route(host: str) -> dict | None:
     """
-    Look up project by custom domain in DynamoDB.
+    Look up the routing item for a host in the shorlabs-routes table.
 
-    Uses the shorlabs-domains table: GetItem on domain (PK) + SK — O(1).
-    Only returns projects with ACTIVE status.
+    Single GetItem on the host (PK). Returns the item whatever its status;
+    the handler answers 503 for routes that are not ACTIVE yet.
+    DynamoDB errors propagate so the cache can fall back to a stale entry.
     """
-    try:
-        table = dynamodb.Table(DOMAINS_TABLE_NAME)
-        domain_lower = domain.lower()
-
-        response = table.get_item(
-            Key={
-                'domain': domain_lower,
-                'SK': DOMAIN_ITEM_SK,
-            },
-            ProjectionExpression="function_url, #st, project_id, service_type, alb_dns_name",
-            ExpressionAttributeNames={"#st": "status"},
-        )
-
-        item = response.get('Item')
-        if item and item.get('status') == 'ACTIVE':
-            return item
-        return None
-
-    except Exception as e:
-        print(f"DynamoDB custom domain lookup error: {e}")
-        return None
+    table = dynamodb.Table(ROUTES_TABLE_NAME)
+
+    response = table.get_item(
+        Key={'host': host},
+        ProjectionExpression="origin_domain, origin_kind, read_timeout, keepalive_timeout, preserve_host, #st",
+        ExpressionAttributeNames={"#st": "status"},
+    )
+    return response.get('Item')
 
 
 def _error_response(status_code: int, status_text: str, message: str) -> dict:
@@ -0,0 +1,194 @@
+#!/bin/bash
+#
+# Setup the EventBridge rule that delivers CodeBuild build state changes
+# to the API Lambda (event-driven deployments, EVENT_DRIVEN_BUILDS=true)
+#
+# CodeBuild state changes are only published on the default event bus, so
+# this is a classic EventBridge rule rather than a Scheduler schedule.
+# Enable EVENT_DRIVEN_BUILDS on the Lambda only after this rule exists,
+# otherwise deployments wait at BUILDING forever.
+#
+# Events that cannot be delivered (rule retry policy) or whose handling
+# fails (/events answers 599, Lambda's async retries) end up in the
+# shorlabs-build-events-dlq queue. Deployments whose event was lost are
+# settled by the sweeper (schedule_deployment_sweeper.sh).
+#
+# /events is reachable over HTTP as well, so the rule adds BUILD_EVENTS_TOKEN
+# (from .env) to every event it delivers and the API ignores build events
+# without it. Generate one with `openssl rand -hex 32`, put it in .env and
+# redeploy the API (deploy-lambda.sh) so both sides share it.
+#
+
+set -e
+
+# Load environment variables from .env file
+if [ -f .env ]; then
+    set -a
+    source .env
+    set +a
+    echo "✅ Loaded AWS credentials from .env"
+else
+    echo "❌ .env file not found!"
+    exit 1
+fi
+
+REGION="${AWS_DEFAULT_REGION:-us-east-1}"
+FUNCTION_NAME="shorlabs-api"
+RULE_NAME="shorlabs-build-state-change"
+CODEBUILD_PROJECT_NAME="shorlabs-builder"
+DLQ_NAME="shorlabs-build-events-dlq"
+# Retry delivery for up to an hour; a build event older than that is left to the sweeper
+MAX_EVENT_AGE_SECONDS=3600
+MAX_RETRY_ATTEMPTS=2
+
+if [[ ! "${BUILD_EVENTS_TOKEN:-}" =~ ^[A-Za-z0-9_-]+$ ]]; then
+    echo "❌ BUILD_EVENTS_TOKEN is missing from .env (letters, digits, - and _ only)"
+    echo "   Generate one with: openssl rand -hex 32"
+    exit 1
+fi
+
+echo "🔧 Setting up EventBridge rule for CodeBuild state changes..."
+echo "   Region: $REGION"
+echo "   Function: $FUNCTION_NAME"
+
+# Get Lambda function ARN
+FUNCTION_ARN=$(aws lambda get-function \
+  --function-name "$FUNCTION_NAME" \
+  --region "$REGION" \
+  --query 'Configuration.FunctionArn' \
+  --output text)
+
+echo "✅ Found Lambda: $FUNCTION_ARN"
+
+# Step 1: Create or update the rule (terminal build states of our project only)
+echo "📅 Creating EventBridge rule..."
+RULE_ARN=$(aws events put-rule \
+  --name "$RULE_NAME" \
+  --event-pattern '{
+    "source": ["aws.codebuild"],
+    "detail-type": ["CodeBuild Build State Change"],
+    "detail": {
+      "project-name": ["'"$CODEBUILD_PROJECT_NAME"'"],
+      "build-status": ["SUCCEEDED", "FAILED", "FAULT", "STOPPED", "TIMED_OUT"]
+    }
+  }' \
+  --state ENABLED \
+  --region "$REGION" \
+  --query 'RuleArn' \
+  --output text)
+
+echo "✅ Rule ready: $RULE_ARN"
+
+# Step 2: Allow EventBridge to invoke the Lambda from this rule
+echo "🔐 Granting invoke permission..."
+aws lambda add-permission \
+  --function-name "$FUNCTION_NAME" \
+  --statement-id "${RULE_NAME}-invoke" \
+  --action "lambda:InvokeFunction" \
+  --principal events.amazonaws.com \
+  --source-arn "$RULE_ARN" \
+  --region "$REGION" \
+  > /dev/null 2>&1 && echo "✅ Permission added" || echo "   Permission already exists"
+
+# Step 3: Dead-letter queue for build events that could not be handled
+echo "📭 Setting up dead-letter queue..."
+DLQ_URL=$(aws sqs create-queue \
+  --queue-name "$DLQ_NAME" \
+  --attributes MessageRetentionPeriod=1209600 \
+  --region "$REGION" \
+  --query 'QueueUrl' \
+  --output text)
+DLQ_ARN=$(aws sqs get-queue-attributes \
+  --queue-url "$DLQ_URL" \
+  --attribute-names QueueArn \
+  --region "$REGION" \
+  --query 'Attributes.QueueArn' \
+  --output text)
+
+# EventBridge sends undeliverable events from this rule to the queue
+DLQ_POLICY='{
+  "Version": "2012-10-17",
+  "Statement": [
+    {
+      "Effect": "Allow",
+      "Principal": {"Service": "events.amazonaws.com"},
+      "Action": "sqs:SendMessage",
+      "Resource": "'"$DLQ_ARN"'",
+      "Condition": {"ArnEquals": {"aws:SourceArn": "'"$RULE_ARN"'"}}
+    }
+  ]
+}'
+aws sqs set-queue-attributes \
+  --queue-url "$DLQ_URL" \
+  --attributes "$(jq -n --arg policy "$DLQ_POLICY" '{Policy: $policy}')" \
+  --region "$REGION"
+
+echo "✅ DLQ ready: $DLQ_ARN"
+
+# Step 4: Point the rule at the Lambda. The input transformer passes the
+# fields the handler reads through unchanged and adds the shared token
+# (BUILD_EVENT_TOKEN_FIELD in deployer/aws/codebuild.py).
+TOKEN_FIELD=$(python3 -c "from deployer.aws.codebuild import BUILD_EVENT_TOKEN_FIELD; print(BUILD_EVENT_TOKEN_FIELD)")
+INPUT_TEMPLATE='{"source": "aws.codebuild", "detail-type": "<detailType>", "region": "<region>", "detail": <detail>, "'"$TOKEN_FIELD"'": "'"$BUILD_EVENTS_TOKEN"'"}'
+aws events put-targets \
+  --rule "$RULE_NAME" \
+  --targets "$(jq -n \
+    --arg arn "$FUNCTION_ARN" \
+    --arg dlq "$DLQ_ARN" \
+    --arg template "$INPUT_TEMPLATE" \
+    --argjson max_age "$MAX_EVENT_AGE_SECONDS" \
+    '[{
+      Id: "shorlabs-api",
+      Arn: $arn,
+      RetryPolicy: {MaximumRetryAttempts: 185, MaximumEventAgeInSeconds: $max_age},
+      DeadLetterConfig: {Arn: $dlq},
+      InputTransformer: {
+        InputPathsMap: {detailType: "$.detail-type", region: "$.region", detail: "$.detail"},
+        InputTemplate: $template
+      }
+    }]')" \
+  --region "$REGION" \
+  > /dev/null
+
+# Step 5: Retry failed invocations (the handler answers 599) and dead-letter them.
+# This applies to every asynchronous invocation of the function; the scheduled
+# actions always answer 200, so only build events are retried.
+echo "🔁 Configuring async invoke retries..."
+aws lambda put-function-event-invoke-config \
+  --function-name "$FUNCTION_NAME" \
+  --maximum-retry-attempts "$MAX_RETRY_ATTEMPTS" \
+  --maximum-event-age-in-seconds "$MAX_EVENT_AGE_SECONDS" \
+  --destination-config '{"OnFailure": {"Destination": "'"$DLQ_ARN"'"}}' \
+  --region "$REGION" \
+  > /dev/null
+
+# The function's execution role must be allowed to send to the queue
+ROLE_NAME=$(aws lambda get-function-configuration \
+  --function-name "$FUNCTION_NAME" \
+  --region "$REGION" \
+  --query 'Role' \
+  --output text | awk -F/ '{print $NF}')
+aws iam put-role-policy \
+  --role-name "$ROLE_NAME" \
+  --policy-name "BuildEventsDLQ" \
+  --policy-document '{
+    "Version": "2012-10-17",
+    "Statement": [
+      {
+        "Effect": "Allow",
+        "Action": "sqs:SendMessage",
+        "Resource": "'"$DLQ_ARN"'"
+      }
+    ]
+  }'
+
+echo ""
+echo "✅ EventBridge rule configured successfully!"
+echo ""
+echo "   Rule:    $RULE_NAME"
+echo "   Events:  CodeBuild Build State Change ($CODEBUILD_PROJECT_NAME, terminal states)"
+echo "   Target:  $FUNCTION_NAME (async retries: $MAX_RETRY_ATTEMPTS, max age: ${MAX_EVENT_AGE_SECONDS}s)"
+echo "   DLQ:     $DLQ_NAME"
+echo ""
+echo "Next: redeploy $FUNCTION_NAME with BUILD_EVENTS_TOKEN in .env, run schedule_deployment_sweeper.sh,"
+echo "      then set EVENT_DRIVEN_BUILDS=true on $FUNCTION_NAME"
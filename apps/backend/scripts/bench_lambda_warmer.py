@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Lambda Warmer Benchmark
+
+Measures warming throughput against a local HTTP stand-in for Lambda
+function URLs (no AWS calls). Every target gets its own loopback host
+(127.x.y.z), so connection setup and keep-alive behave as they would across
+distinct function URLs.
+
+  - legacy:      10-thread pool, a fresh connection per ping (previous warmer)
+  - async cold:  asyncio engine, first run (new connection per target)
+  - async warm:  second run on the same clients; only as many hosts as the
+                 pools hold (WARM_CONCURRENCY) keep a live connection, so
+                 beyond that nearly every ping still opens a new one
+
+--check-overlap gives every target several pings (as the warm planner
+does) and checks that each target's pings were all in flight at the same
+time on the stand-in, i.e. none queued behind another for a connection.
+It exits non-zero if any target's pings did not fully overlap.
+
+Usage:
+  python scripts/bench_lambda_warmer.py                        # 1k, 5k, 10k targets
+  python scripts/bench_lambda_warmer.py --targets 1000 --latency-ms 20 --skip-legacy
+  python scripts/bench_lambda_warmer.py --check-overlap --targets 500 --pings 8
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# The warmer imports the usage aggregator, which builds boto3 clients at import
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from api import lambda_warmer  # noqa: E402
+
+LEGACY_CONCURRENCY = 10
+
+
+class StandInServer:
+    """Minimal HTTP/1.1 keep-alive server that answers every request after a fixed delay."""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000
+        self.connections = 0
+        self.requests = 0
+        self.in_flight = {}      # loopback host -> requests being answered
+        self.peak_in_flight = {}  # loopback host -> most requests answered at once
+        self.port = None
+        self._ready = threading.Event()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        host = writer.get_extra_info("sockname")[0]
+        try:
+            while True:
+                try:
+                    await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                self.requests += 1
+                self.in_flight[host] = self.in_flight.get(host, 0) + 1
+                self.peak_in_flight[host] = max(self.peak_in_flight.get(host, 0), self.in_flight[host])
+                await asyncio.sleep(self.latency)
+                self.in_flight[host] -= 1
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\nok")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _serve(self) -> None:
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(asyncio.start_server(self._handle, "0.0.0.0", 0, backlog=4096))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        loop.run_forever()
+
+    def start(self) -> None:
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._ready.wait()
+
+    def reset(self) -> None:
+        self.connections = 0
+        self.requests = 0
+        self.in_flight = {}
+        self.peak_in_flight = {}
+
+
+def synthetic_targets(count: int, port: int) -> list:
+    """One distinct loopback host per target (all of 127.0.0.0/8 routes to lo)."""
+    return [
+        {
+            "service_id": f"svc-{i}",
+            "function_url": f"http://127.0.{i // 250}.{i % 250 + 1}:{port}/",
+            "organization_id": "org_bench",
+            "name": f"bench-{i}",
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_warm(targets: list) -> list:
+    """The previous warmer: ThreadPoolExecutor(10) with a new httpx.get per ping."""
+
+    def ping(url: str) -> dict:
+        start = time.monotonic()
+        try:
+            resp = httpx.get(url, timeout=lambda_warmer.WARM_TIMEOUT_SECONDS, follow_redirects=True)
+            return {"latency_ms": (time.monotonic() - start) * 1000, "error": None, "status_code": resp.status_code}
+        except Exception as e:
+            return {"latency_ms": (time.monotonic() - start) * 1000, "error": str(e), "status_code": None}
+
+    with ThreadPoolExecutor(max_workers=LEGACY_CONCURRENCY) as executor:
+        return list(executor.map(ping, [t["function_url"] for t in targets]))
+
+
+def async_warm(targets: list, concurrency: int) -> list:
+    # No jitter: it would only add a fixed delay to every measured run
+    return lambda_warmer._run(lambda_warmer._warm_targets(targets, concurrency=concurrency, jitter_seconds=0))
+
+
+def measure(label: str, server: StandInServer, fn) -> None:
+    server.reset()
+    start = time.perf_counter()
+    results = fn()
+    elapsed = time.perf_counter() - start
+
+    done = [r for r in results if r is not None]
+    failed = sum(1 for r in done if r["error"])
+    latencies = sorted(r["latency_ms"] for r in done)
+    p50 = statistics.median(latencies) if latencies else 0
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(
+        f"  {label:<12} {elapsed:7.2f} s  {len(results) / elapsed:8.0f} targets/s  "
+        f"p50 {p50:6.1f} ms  p95 {p95:6.1f} ms  "
+        f"{failed} failed  {server.connections} new connections"
+    )
+
+
+def check_overlap(server: StandInServer, count: int, pings: int, concurrency: int) -> bool:
+    """Warm `count` targets with `pings` pings each; True if every target's pings overlapped."""
+    targets = [{**t, "pings": pings} for t in synthetic_targets(count, server.port)]
+    server.reset()
+    start = time.perf_counter()
+    results = async_warm(targets, concurrency)
+    elapsed = time.perf_counter() - start
+
+    expected = min(pings, concurrency, lambda_warmer.WARM_CONNECTIONS_PER_CLIENT)
+    peaks = [server.peak_in_flight.get(t["function_url"].split("//")[1].split(":")[0], 0) for t in targets]
+    serialized = sum(1 for peak in peaks if peak < expected)
+    failed = sum(1 for r in results if r is None or r["error"])
+    print(
+        f"  overlap      {elapsed:7.2f} s  {count} targets x {expected} pings  "
+        f"peak in flight per target: min {min(peaks)}, max {max(peaks)}  "
+        f"{serialized} serialized  {failed} failed"
+    )
+    return serialized == 0 and failed == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Lambda warming throughput against a local stand-in")
+    parser.add_argument("--targets", type=int, action="append", help="Target count (repeatable; default 1k, 5k, 10k)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated function response time")
+    parser.add_argument("--concurrency", type=int, default=lambda_warmer.WARM_CONCURRENCY, help="Async engine concurrency")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only run the async engine")
+    parser.add_argument("--check-overlap", action="store_true", help="Check that each target's pings run simultaneously")
+    parser.add_argument("--pings", type=int, default=8, help="Pings per target with --check-overlap")
+    args = parser.parse_args()
+
+    server = StandInServer(args.latency_ms)
+    server.start()
+
+    if args.check_overlap:
+        ok = True
+        for count in args.targets or [500]:
+            print(f"Warm ping overlap check ({count:,} targets, {args.pings} pings each, concurrency {args.concurrency})")
+            ok = check_overlap(server, count, args.pings, args.concurrency) and ok
+        sys.exit(0 if ok else 1)
+
+    for count in args.targets or [1000, 5000, 10000]:
+        targets = synthetic_targets(count, server.port)
+        print(f"Lambda warmer benchmark ({count:,} targets, {args.latency_ms:.0f} ms stand-in latency, concurrency {args.concurrency})")
+        if not args.skip_legacy:
+            measure("legacy", server, lambda: legacy_warm(targets))
+        measure("async cold", server, lambda: async_warm(targets, args.concurrency))
+        measure("async warm", server, lambda: async_warm(targets, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
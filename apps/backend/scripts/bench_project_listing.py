@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Project Listing Benchmark
+
+Counts DynamoDB calls made by GET /api/projects for a synthetic org, and
+compares them with the previous per-project / per-service query pattern.
+Runs against a local DynamoDB stand-in (DynamoDB Local or LocalStack) —
+it refuses to run without AWS_ENDPOINT_URL_DYNAMODB so it never touches
+real tables.
+
+Usage:
+  docker run -p 8000:8000 amazon/dynamodb-local
+  AWS_ENDPOINT_URL_DYNAMODB=http://localhost:8000 AWS_DEFAULT_REGION=us-east-1 \\
+  AWS_ACCESS_KEY_ID=local AWS_SECRET_ACCESS_KEY=local \\
+      python scripts/bench_project_listing.py --projects 30 --services 2
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+if not os.environ.get("AWS_ENDPOINT_URL_DYNAMODB"):
+    print("❌ Set AWS_ENDPOINT_URL_DYNAMODB to a local DynamoDB endpoint (e.g. http://localhost:8000)")
+    sys.exit(1)
+
+# Isolated table names so the benchmark never mixes with dev data
+for env_name, default in (
+    ("DYNAMODB_TABLE", "bench-shorlabs-projects"),
+    ("SERVICES_TABLE", "bench-shorlabs-services"),
+    ("DEPLOYMENTS_TABLE", "bench-shorlabs-deployments"),
+    ("DOMAINS_TABLE", "bench-shorlabs-domains"),
+    ("ROUTES_TABLE", "bench-shorlabs-routes"),
+):
+    os.environ.setdefault(env_name, default)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.db import dynamodb as db  # noqa: E402
+from api.routes.projects import get_projects  # noqa: E402
+
+_calls = Counter()
+
+
+def _count_call(model, **kwargs):
+    _calls[model.name] += 1
+
+
+def seed_org(org_id: str, project_count: int, services_per_project: int) -> None:
+    """Write project containers, services (every third a database) and one domain per web service."""
+    now = datetime.utcnow().isoformat()
+    projects_table = db.get_or_create_table()
+    services_table = db.get_or_create_services_table()
+    domains_table = db.get_or_create_domains_table()
+
+    with projects_table.batch_writer() as projects, \
+            services_table.batch_writer() as services, \
+            domains_table.batch_writer() as domains:
+        for p in range(project_count):
+            project_id = uuid.uuid4().hex
+            projects.put_item(Item={
+                "PK": f"ORG#{org_id}",
+                "SK": f"PROJECT#{project_id}",
+                "project_id": project_id,
+                "organization_id": org_id,
+                "entity_type": "project",
+                "name": f"project-{p}",
+                "created_at": now,
+                "updated_at": now,
+            })
+            for s in range(services_per_project):
+                service_id = uuid.uuid4().hex
+                service_type = "database" if s % 3 == 2 else "web-app"
+                item = {
+                    "PK": f"ORG#{org_id}",
+                    "SK": f"PROJECT#{project_id}#SERVICE#{service_id}",
+                    "project_id": project_id,
+                    "service_id": service_id,
+                    "organization_id": org_id,
+                    "entity_type": "service",
+                    "name": f"service-{p}-{s}",
+                    "service_type": service_type,
+                    "status": "LIVE",
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                if service_type == "web-app":
+                    subdomain = f"bench-{project_id[:8]}-{s}"
+                    item.update({
+                        "subdomain": subdomain,
+                        "custom_url": f"https://{subdomain}.{db.SHORLABS_DOMAIN}",
+                        "function_url": f"https://{service_id}.lambda-url.us-east-1.on.aws/",
+                    })
+                    domains.put_item(Item={
+                        "domain": f"{subdomain}.example.com",
+                        "SK": db.DOMAIN_ITEM_SK,
+                        "project_id": service_id,
+                        "organization_id": org_id,
+                        "status": "ACTIVE",
+                        "created_at": now,
+                        "updated_at": now,
+                    })
+                services.put_item(Item=item)
+
+
+def legacy_listing(org_id: str) -> int:
+    """The previous GET /api/projects access pattern: N+1 queries."""
+    projects = db.list_projects(org_id)
+    db.get_throttle_state(org_id)
+    service_count = 0
+    for p in projects:
+        for svc in db.list_services(p["project_id"], org_id=org_id):
+            service_count += 1
+            if svc.get("service_type") != "database":
+                db.list_project_domains(svc["service_id"])
+    return service_count
+
+
+def measure(label: str, fn) -> None:
+    _calls.clear()
+    start = time.perf_counter()
+    fn()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    total = sum(_calls.values())
+    breakdown = ", ".join(f"{op}={n}" for op, n in sorted(_calls.items()))
+    print(f"  {label:<22} {total:4d} calls  {elapsed_ms:8.1f} ms   ({breakdown})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count DynamoDB calls for the org project listing")
+    parser.add_argument("--projects", type=int, default=30, help="Projects in the synthetic org")
+    parser.add_argument("--services", type=int, default=2, help="Services per project")
+    args = parser.parse_args()
+
+    db.bootstrap_tables()
+    org_id = f"org_bench_{uuid.uuid4().hex[:8]}"
+    seed_org(org_id, args.projects, args.services)
+
+    db.dynamodb.meta.client.meta.events.register("before-call.dynamodb", _count_call)
+
+    print(f"Project listing benchmark ({args.projects} projects × {args.services} services, org {org_id})")
+    measure("legacy N+1 pattern", lambda: legacy_listing(org_id))
+    measure("GET /api/projects", lambda: asyncio.run(get_projects(user_id="bench", org_id=org_id)))
+
+
+if __name__ == "__main__":
+    main()
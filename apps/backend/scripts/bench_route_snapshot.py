@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Route Snapshot Benchmark
+
+Measures the cost of building and consuming the router's route snapshot
+with synthetic hosts (no AWS calls):
+
+  - compile:   sort + encode routing items (api.route_snapshot)
+  - serialize: compact JSON + gzip
+  - load:      gunzip + parse, as the router does once per container
+  - lookup:    bisect lookups for hits and misses
+
+Usage:
+  python scripts/bench_route_snapshot.py                  # 100k hosts
+  python scripts/bench_route_snapshot.py --hosts 250000
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import string
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.route_snapshot import compile_route_snapshot, serialize_route_snapshot  # noqa: E402
+
+ROUTER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "router", "router_lambda.py")
+
+
+def _load_router():
+    """Import router/router_lambda.py the way Lambda@Edge does (as a standalone module)."""
+    spec = importlib.util.spec_from_file_location("lambda_function", ROUTER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _random_label(n: int = 10) -> str:
+    return "".join(random.choices(string.ascii_lowercase + string.digits, k=n))
+
+
+def synthetic_routes(count: int) -> list:
+    """Routing items shaped like DynamoDB returns them (numbers as Decimal)."""
+    items = []
+    for i in range(count):
+        if i % 5 == 0:
+            host = f"www.{_random_label()}.com"
+        else:
+            host = f"{_random_label()}-{i}.shorlabs.com"
+        if i % 10 == 0:
+            items.append({
+                "host": host,
+                "origin_kind": "alb",
+                "origin_domain": f"shorlabs-org-{_random_label(6)}.us-east-1.elb.amazonaws.com",
+                "read_timeout": Decimal("60"),
+                "keepalive_timeout": Decimal("60"),
+                "preserve_host": True,
+            })
+        else:
+            items.append({
+                "host": host,
+                "origin_kind": "lambda",
+                "origin_domain": f"{_random_label(32)}.lambda-url.us-east-1.on.aws",
+                "read_timeout": Decimal("30"),
+                "keepalive_timeout": Decimal("5"),
+                "preserve_host": False,
+            })
+    return items
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark route snapshot build and lookup")
+    parser.add_argument("--hosts", type=int, default=100_000, help="Number of synthetic hosts")
+    parser.add_argument("--lookups", type=int, default=100_000, help="Number of lookups to time")
+    args = parser.parse_args()
+
+    random.seed(42)
+    items = synthetic_routes(args.hosts)
+    router = _load_router()
+
+    snapshot, compile_ms = _timed(compile_route_snapshot, items)
+    payload, serialize_ms = _timed(serialize_route_snapshot, snapshot)
+    loaded, load_ms = _timed(router._RouteSnapshot.from_bytes, payload)
+
+    hit_hosts = [random.choice(items)["host"] for _ in range(args.lookups // 2)]
+    miss_hosts = [f"missing-{_random_label()}.shorlabs.com" for _ in range(args.lookups - len(hit_hosts))]
+    probe = hit_hosts + miss_hosts
+    random.shuffle(probe)
+
+    start = time.perf_counter()
+    hits = sum(1 for host in probe if loaded.lookup(host) is not None)
+    lookup_us = (time.perf_counter() - start) * 1_000_000 / len(probe)
+
+    print(f"Route snapshot benchmark ({args.hosts:,} hosts)")
+    print(f"  compile:    {compile_ms:8.1f} ms")
+    print(f"  serialize:  {serialize_ms:8.1f} ms  ({len(payload) / 1024 / 1024:.2f} MiB gzipped)")
+    print(f"  load:       {load_ms:8.1f} ms  (router cold start, once per container)")
+    print(f"  lookup:     {lookup_us:8.2f} µs  avg over {len(probe):,} ({hits:,} hits)")
+
+    if hits != len(hit_hosts):
+        print(f"❌ Expected {len(hit_hosts):,} hits, got {hits:,}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
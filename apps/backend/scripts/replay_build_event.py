@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Replay a CodeBuild Build State Change event
+
+Posts a synthetic "CodeBuild Build State Change" event, in the shape the
+EventBridge rule delivers it (see schedule_build_events.sh), to the API's
+/events endpoint. Resumes an event-driven deployment (EVENT_DRIVEN_BUILDS)
+parked at AWAITING_BUILD: for local end-to-end runs of the two-stage flow,
+or after a lost event in production.
+
+Locally the API also watches its own builds and emits this event by
+itself; replaying an event for a deployment that already resumed is a
+no-op (the stage claim only succeeds once). If the post-build stage died
+mid-way, a replay after DEPLOY_STAGE_LEASE_SECONDS takes it over and
+resumes from its last step checkpoint.
+
+/events only acts on build events carrying the API's BUILD_EVENTS_TOKEN
+(the rule adds it to every event); pass it with --token or the
+BUILD_EVENTS_TOKEN environment variable.
+
+Usage:
+  python scripts/replay_build_event.py --service-id abc123 --deploy-id Xy7kQ2mNp \
+      --build-id shorlabs-builder:1234-...                   # SUCCEEDED
+  python scripts/replay_build_event.py ... --status FAILED --url https://api.example.com/events
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from deployer.aws.codebuild import (  # noqa: E402
+    BUILD_EVENT_TOKEN_FIELD,
+    BUILD_TERMINAL_STATUSES,
+    build_state_change_event,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Post a CodeBuild state-change event to /events")
+    parser.add_argument("--service-id", required=True, help="Service the deployment belongs to")
+    parser.add_argument("--deploy-id", required=True, help="Deployment to resume")
+    parser.add_argument("--build-id", required=True, help="CodeBuild build id (<project>:<uuid>)")
+    parser.add_argument("--status", default="SUCCEEDED", choices=sorted(BUILD_TERMINAL_STATUSES))
+    parser.add_argument("--url", default="http://localhost:8000/events", help="Events endpoint")
+    parser.add_argument(
+        "--token",
+        default=os.environ.get("BUILD_EVENTS_TOKEN", ""),
+        help="The API's BUILD_EVENTS_TOKEN (default: $BUILD_EVENTS_TOKEN)",
+    )
+    args = parser.parse_args()
+    if not args.token:
+        parser.error("--token or BUILD_EVENTS_TOKEN is required")
+
+    event = build_state_change_event(
+        args.build_id,
+        args.status,
+        {"SHORLABS_SERVICE_ID": args.service_id, "SHORLABS_DEPLOY_ID": args.deploy_id},
+    )
+    event[BUILD_EVENT_TOKEN_FIELD] = args.token
+    print(f"📨 Posting {args.status} for build {args.build_id} to {args.url}")
+    # The post-build stage runs inside the request (Lambda/ECS deploy), so allow it time
+    response = httpx.post(args.url, json=event, timeout=900)
+    print(f"   HTTP {response.status_code}")
+    print(json.dumps(response.json(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
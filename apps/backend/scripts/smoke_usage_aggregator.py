@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Usage Aggregator Smoke Check
+
+Imports the usage aggregator and computes one web-app's and one
+web-service's usage from stubbed metrics (no AWS calls), so a missing name
+or a broken conversion fails here instead of in the billing run. Exits
+non-zero on failure.
+
+Usage:
+  python scripts/smoke_usage_aggregator.py
+"""
+
+import os
+import sys
+
+# The aggregator builds boto3 clients at import
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import usage_aggregator  # noqa: E402
+
+
+def check(label: str, actual, expected) -> bool:
+    ok = actual == expected
+    print(f"  {'✅' if ok else '❌'} {label}: {actual!r}" + ("" if ok else f" (expected {expected!r})"))
+    return ok
+
+
+def main():
+    print("Usage aggregator smoke check")
+    ok = True
+
+    # 2,048,000 ms at 512 MB = 2048 s * 0.5 GB = 1024 GB-s
+    usage = usage_aggregator._service_usage(
+        {"service_type": "web-app", "memory": 512},
+        function_name="shorlabs-smoke",
+        metric_sums={"shorlabs-smoke": {"Invocations": 42.0, "Duration": 2_048_000.0}},
+        build_seconds=12.5,
+        window_seconds=3600,
+    )
+    ok = check("web-app invocations", usage["invocations"], 42.0) and ok
+    ok = check("web-app compute (GB-s)", usage["compute"], 1024.0) and ok
+    ok = check("web-app build_seconds", usage["build_seconds"], 12.5) and ok
+
+    idle = usage_aggregator._service_usage(
+        {"service_type": "web-app"},
+        function_name="shorlabs-idle",
+        metric_sums={},
+        build_seconds=0.0,
+        window_seconds=3600,
+    )
+    ok = check("idle web-app usage", sorted(set(idle.values())), [0.0]) and ok
+
+    usage_aggregator._get_ecs_uptime_metrics = lambda svc, window_seconds: (7200.0, 1800.0)
+    ecs = usage_aggregator._service_usage(
+        {"service_type": "web-service", "name": "smoke"},
+        function_name=None,
+        metric_sums={},
+        build_seconds=0.0,
+        window_seconds=3600,
+    )
+    ok = check("web-service vcpu_time", ecs["vcpu_time"], 7200.0) and ok
+    ok = check("web-service memory_time", ecs["memory_time"], 1800.0) and ok
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -79,7 +79,8 @@ export function SettingsTab({
                 onChange={onEnvVarsChange}
                 showImport={true}
                 readOnly={!editingEnvVars}
-                existingEnvVars={project.env_vars}
+                existingEnvVars={project.env_vars ?? undefined}
+                unavailable={project.env_vars == null || (project.unavailable_fields?.includes("env_vars") ?? false)}
                 onStartEdit={onStartEditEnvVars}
                 isEditing={editingEnvVars}
                 onCancelEdit={onCancelEnvVars}
@@ -23,7 +23,8 @@ export interface Service {
     custom_url?: string | null
     subdomain?: string | null
     ecr_repo?: string | null
-    env_vars?: Record<string, string>
+    // null when the read didn't finish (see unavailable_fields)
+    env_vars?: Record<string, string> | null
     start_command?: string
     root_directory?: string
     memory?: number
@@ -45,6 +46,8 @@ export interface Service {
     // Nested data (populated on detail view)
     deployments?: Deployment[]
     custom_domains?: CustomDomain[]
+    // Fields whose read failed or timed out; their values are empty or null
+    unavailable_fields?: string[]
 }
 
 export interface Deployment {
@@ -278,9 +278,18 @@ export function useProjectDetail(id: string) {
         return data.services[0]
     }
 
+    // Env vars are saved as a full set: editing a list that failed to load
+    // would save it empty and delete every variable
+    const _envVarsUnavailable = (svc: Service) =>
+        svc.env_vars == null || (svc.unavailable_fields?.includes("env_vars") ?? false)
+
     const startEditingEnvVars = () => {
         const svc = _getActiveService()
         if (!svc) return
+        if (_envVarsUnavailable(svc)) {
+            fetchProject()
+            return
+        }
         const vars = Object.entries(svc.env_vars || {}).map(([key, value]) => ({ key, value, visible: false }))
         setEnvVarsList(vars.length > 0 ? vars : [{ key: "", value: "", visible: true }])
         setEditingEnvVars(true)
@@ -288,7 +297,7 @@ export function useProjectDetail(id: string) {
 
     const saveEnvVars = async () => {
         const svc = _getActiveService()
-        if (!svc) return
+        if (!svc || _envVarsUnavailable(svc)) return
         setSavingEnvVars(true)
         try {
             const token = await getToken()
@@ -37,6 +37,8 @@ interface EnvironmentVariablesEditorProps {
     readOnly?: boolean
     /** Existing env vars to display in read-only mode (key-value pairs) */
     existingEnvVars?: Record<string, string>
+    /** Existing env vars couldn't be loaded: show a notice instead, with retry instead of edit */
+    unavailable?: boolean
     /** Callback to start editing (for read-only mode) */
     onStartEdit?: () => void
     /** Whether currently in edit mode (for project details page) */
@@ -55,6 +57,7 @@ export function EnvironmentVariablesEditor({
     showImport = true,
     readOnly = false,
     existingEnvVars = {},
+    unavailable = false,
     onStartEdit,
     isEditing = false,
     onCancelEdit,
@@ -140,13 +143,17 @@ export function EnvironmentVariablesEditor({
                             onClick={onStartEdit}
                             className="text-zinc-500 hover:text-zinc-900"
                         >
-                            Edit
+                            {unavailable ? "Retry" : "Edit"}
                         </Button>
                     )}
                 </div>
 
                 <div className="p-4 sm:p-6">
-                    {envKeys.length > 0 ? (
+                    {unavailable ? (
+                        <div className="text-center py-8">
+                            <p className="text-sm text-zinc-500">Environment variables couldn&apos;t be loaded right now</p>
+                        </div>
+                    ) : envKeys.length > 0 ? (
                         <div className="space-y-2">
                             {envKeys.map((key) => (
                                 <div key={key} className="flex items-center gap-3 px-4 py-3 bg-zinc-50 rounded-xl font-mono text-sm border border-zinc-100">